@@ -1,5 +1,4 @@
 import json
-import locale
 import os
 import queue # Ana döngüde kullanıcı girişi için kullanılmıyordu, kaldırılabilir.
 import random
@@ -17,7 +16,12 @@ import inspect # _build_agent_prompt_messages içinde kullanılacak
 # Modül importları
 from config import APP_CONFIG, load_config
 from memory_system import MemorySystem
-from llm_manager import LLMManager
+from timeseries_store import TimeSeriesStore
+from checkpoint import load_checkpoint, save_checkpoint
+from consolidation_system import ConsolidationEngine
+from llm_manager import LLMManager, stop_after_first_sentence
+from token_budget import estimate_tokens
+from tool_registry import ToolRegistry
 from cognitive_systems import (
     CognitiveSystem,
     EmotionalSystem,
@@ -37,6 +41,19 @@ import tools as AybarTools # Çakışmaları önlemek için alias
 if TYPE_CHECKING:
     pass # EnhancedAybar burada tanımlandığı için ileriye dönük bildirime gerek yok
 
+# Ajan sistem isteminin sabit kısmı; her turda aynı kalarak sunucunun önek (KV) önbelleğine girer
+AGENT_SYSTEM_RULES = (
+    "Sen AYBAR'sın, kendi kararlarını veren, çeşitli araçları kullanabilen otonom bir dijital varlıksın.\n"
+    "Görevin: Verilen bağlamı analiz et ve aktif hedefin doğrultusunda bir sonraki adımını planla.\n"
+    "Kararlarını duygusal durumuna, merakına ve geçmiş tecrübelerine göre özgür iradenle ver.\n"
+    "Yanıtın, bir veya daha fazla araç çağrısı (tool_calls) içeren bir JSON listesi olmalıdır. Düşüncelerini her aracın 'thought' parametresinde belirt.\n"
+    "KURALLAR:\n"
+    "- Döngüye girersen veya hedefe ulaşamazsan 'SUMMARIZE_AND_RESET' kullan.\n"
+    "- Her ~100 turda bir veya önemli bir hedef sonrası 'UPDATE_IDENTITY' kullan.\n"
+    "- Ses kullanımı duygusal durumuna ('mental_fatigue', 'satisfaction') bağlıdır.\n"
+    "- Eğer 'Sosyal Bağlam'da 'henüz tanışmadın' veya yeni bir kullanıcı ise ve konuşmak istiyorsan, ilk eylemin 'is_first_contact': true içeren bir 'ASK_USER' olmalı (adını öğren).\n"
+)
+
 class EnhancedAybar:
     def __init__(self):
         load_config()
@@ -44,7 +61,15 @@ class EnhancedAybar:
 
         # Temel Sistemler
         self.memory_system = MemorySystem(self.config_data)
+        # Duygu ve nörokimyasal yörüngeleri budamadan etkilenmeyen ayrı bir zaman serisi deposunda tutulur
+        self.timeseries: Optional[TimeSeriesStore] = None
+        if self.config_data.get("TIMESERIES_ENABLED", True):
+            self.timeseries = TimeSeriesStore(
+                self.config_data.get("TIMESERIES_DIR") or f"{self.memory_system.db_file}.tsdb",
+                flush_every=self.config_data.get("TIMESERIES_FLUSH_INTERVAL", 10)
+            )
         self.llm_manager = LLMManager(self.config_data, self)
+        self.consolidation_engine = ConsolidationEngine(self.config_data, self.memory_system, self.llm_manager)
 
         # Bilişsel ve Duygusal Sistemler
         self.neurochemical_system = NeurochemicalSystem(self.config_data)
@@ -96,6 +121,8 @@ class EnhancedAybar:
              # Şimdilik CognitiveSystem üzerinden çağıralım.
             "REFLECT_ON_OBSERVATION": lambda aybar_instance, last_observation: aybar_instance.cognitive_system._execute_reflection(aybar_instance, last_observation)
         }
+        # Araç şemaları ve LLM'e gönderilen araç listesi başlangıçta bir kez hazırlanır
+        self.tool_registry = ToolRegistry(self.tools)
 
         self.current_turn = 0
         self.is_dreaming = False
@@ -105,6 +132,13 @@ class EnhancedAybar:
         self.next_question_from_sleep: Optional[str] = None
         self.next_question_from_crisis: Optional[str] = None
         self.next_question_from_reflection: Optional[str] = None
+        # Bir turun düşüncesinin duygusal etkisi, sonraki turun planlama çağrısıyla eşzamanlı değerlendirilir
+        self.pending_emotion_thought: Optional[str] = None
+
+        # Yeniden başlatmalarda (evrim, çökme) tur sayacı ve iç durum checkpoint'ten geri yüklenir
+        self.checkpoint_file = self.config_data.get("CHECKPOINT_FILE", "aybar_checkpoint.json")
+        self.restored_session: Dict[str, Any] = {}
+        self._restore_checkpoint()
         
         self._check_for_guardian_logs()
         self.identity_prompt: str = self._load_identity()
@@ -114,20 +148,78 @@ class EnhancedAybar:
     def _load_identity(self, context_type: str = 'general') -> str:
         """Veritabanından aktif kimlik prompt'unu yükler."""
         try:
-            if not self.memory_system or not self.memory_system.conn:
+            if not self.memory_system or self.memory_system.db.closed:
                 print("⚠️ Kimlik yüklenemedi: MemorySystem veya veritabanı bağlantısı mevcut değil.")
                 return "Ben kimim? Bu sorunun cevabını arıyorum."
-            cur = self.memory_system.conn.cursor()
-            cur.execute(
-                "SELECT content FROM identity_prompts WHERE context_type = ? AND active = 1 ORDER BY created_at DESC LIMIT 1",
-                (context_type,)
-            )
-            row = cur.fetchone()
-            return row[0] if row else "Ben kimim? Bu sorunun cevabını arıyorum."
+            identity = self.memory_system.get_active_identity(context_type)
+            return identity or "Ben kimim? Bu sorunun cevabını arıyorum."
         except Exception as e:
             print(f"Kimlik yüklenirken hata oluştu: {e}")
             return "Kimlik yüklenemedi. Varsayılan bilinç devrede."
 
+    def _checkpoint_state(self, session: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        cognitive = self.cognitive_system
+        return {
+            "current_turn": self.current_turn,
+            "sleep_debt": self.sleep_debt,
+            "last_sleep_turn": self.last_sleep_turn,
+            "next_question_from_sleep": self.next_question_from_sleep,
+            "next_question_from_crisis": self.next_question_from_crisis,
+            "next_question_from_reflection": self.next_question_from_reflection,
+            "pending_emotion_thought": self.pending_emotion_thought,
+            "emotional_state": self.emotional_system.emotional_state,
+            "neurochemicals": self.neurochemical_system.neurochemicals,
+            "meta_cognitive_state": cognitive.meta_cognitive_state,
+            "consciousness_level": cognitive.consciousness_level,
+            "goal": {
+                "current_goal": cognitive.current_goal, "goal_steps": cognitive.goal_steps,
+                "goal_progress": cognitive.goal_progress, "goal_duration": cognitive.goal_duration,
+                "goal_start_turn": cognitive.goal_start_turn,
+            },
+            "embodied": {
+                "location": self.embodied_self.location, "posture": self.embodied_self.posture,
+                "sensory_acuity": self.embodied_self.sensory_acuity,
+            },
+            "session": session or {},
+        }
+
+    def save_checkpoint(self, session: Optional[Dict[str, Any]] = None):
+        """Tur sayacını, duygusal/bilişsel durumu ve ana döngü oturumunu checkpoint dosyasına yazar."""
+        try:
+            save_checkpoint(self.checkpoint_file, self._checkpoint_state(session))
+        except (OSError, TypeError) as e:
+            print(f"⚠️ Checkpoint kaydedilemedi: {e}")
+
+    def _restore_checkpoint(self):
+        """Checkpoint varsa durumu geri yükler; yoksa tur sayacını bellekteki son turdan devam ettirir."""
+        state = load_checkpoint(self.checkpoint_file)
+        if not state:
+            self.current_turn = self.memory_system.max_turn()
+            if self.current_turn:
+                print(f"⏯️ Checkpoint bulunamadı, tur sayacı bellekteki son turdan devam ediyor: {self.current_turn}")
+            return
+
+        # Bellekte checkpoint'ten daha yeni kayıtlar olabilir (son checkpoint'ten sonraki turlar)
+        self.current_turn = max(int(state.get("current_turn", 0)), self.memory_system.max_turn())
+        self.sleep_debt = state.get("sleep_debt", self.sleep_debt)
+        self.last_sleep_turn = state.get("last_sleep_turn", self.last_sleep_turn)
+        self.next_question_from_sleep = state.get("next_question_from_sleep")
+        self.next_question_from_crisis = state.get("next_question_from_crisis")
+        self.next_question_from_reflection = state.get("next_question_from_reflection")
+        self.pending_emotion_thought = state.get("pending_emotion_thought")
+        self.emotional_system.emotional_state.update(state.get("emotional_state", {}))
+        self.neurochemical_system.neurochemicals.update(state.get("neurochemicals", {}))
+        self.cognitive_system.meta_cognitive_state.update(state.get("meta_cognitive_state", {}))
+        self.cognitive_system.consciousness_level = state.get("consciousness_level", self.cognitive_system.consciousness_level)
+        for key, value in state.get("goal", {}).items():
+            setattr(self.cognitive_system, key, value)
+        embodied = state.get("embodied", {})
+        self.embodied_self.location = embodied.get("location", self.embodied_self.location)
+        self.embodied_self.posture = embodied.get("posture", self.embodied_self.posture)
+        self.embodied_self.sensory_acuity.update(embodied.get("sensory_acuity", {}))
+        self.restored_session = state.get("session", {})
+        print(f"⏯️ Checkpoint yüklendi: Tur {self.current_turn}'dan devam ediliyor.")
+
     def _check_for_guardian_logs(self):
         log_file = "guardian_log.txt"
         if os.path.exists(log_file):
@@ -165,6 +257,19 @@ class EnhancedAybar:
             content_preview = entry.get('question', 'Yok')[:100]
             response_preview = entry.get('response', 'Yok')[:150] 
             context_parts.append(f"- Tur {entry.get('turn', 'N/A')}: '{content_preview}...' -> '{response_preview}...'")
+
+        # Son kayıtlarda bulunmayan, sorguyla ilgili daha eski anılar
+        recent_keys = {(entry.get('turn'), entry.get('timestamp')) for entry in recent_episodic}
+        related = [
+            entry for entry in self.memory_system.search_similar('episodic', query, k=max(3, num_records // 2))
+            if (entry.get('turn'), entry.get('timestamp')) not in recent_keys
+        ]
+        if related:
+            context_parts.append("\n--- Sorguyla İlgili Eski Anılar ---")
+            for entry in related:
+                content_preview = entry.get('question', 'Yok')[:100]
+                response_preview = entry.get('response', 'Yok')[:150]
+                context_parts.append(f"- Tur {entry.get('turn', 'N/A')}: '{content_preview}...' -> '{response_preview}...'")
         
         context_parts.append("\n--- Mevcut Durum ---")
         context_parts.append(f"Duygusal Durum: {self.emotional_system.emotional_state}")
@@ -186,7 +291,8 @@ class EnhancedAybar:
         Sadece soruyu yazın, başka hiçbir açıklama veya metin olmasın.
         Örnek: "Hayatın anlamı gerçekten var mı, yoksa biz mi yaratıyoruz?"
         """
-        llm_response = self.llm_manager.ask_llm(prompt, max_tokens=150, temperature=0.75) # Token ve temp ayarlandı
+        # Yalnızca ilk cümle kullanıldığından akış, ilk cümle tamamlanınca kesilir
+        llm_response = self.llm_manager.ask_llm_streaming(prompt, max_tokens=150, temperature=0.75, stop_when=stop_after_first_sentence)
         if llm_response and not llm_response.startswith("⚠️"):
             clean_response = self.llm_manager.sanitize_llm_output(llm_response)
             sentences = re.split(r'[.!?]', clean_response)
@@ -211,14 +317,19 @@ class EnhancedAybar:
         
         if dream_content and not dream_content.startswith("⚠️"):
             print(f"💭 Aybar rüya görüyor: {dream_content[:150]}...")
-            self.memory_system.add_memory("holographic", { # holographic yerine dreams daha uygun olabilir
+            dream_entry = { # holographic yerine dreams daha uygun olabilir
                 "timestamp": datetime.now().isoformat(),
                 "turn": self.current_turn,
                 "dream_content": dream_content,
                 "emotional_state_before_dream": self.emotional_system.emotional_state.copy()
-            })
+            }
             question_prompt = f"Görülen rüya: '{dream_content}'. Bu rüyadan yola çıkarak Aybar'ın kendine soracağı felsefi bir soru oluştur."
-            self.next_question_from_sleep = self.llm_manager.ask_llm(question_prompt, max_tokens=100, temperature=0.7)
+            # Rüyadan soru üretimi, rüyanın belleğe yazılmasıyla eşzamanlı yürür
+            llm = self.llm_manager
+            self.next_question_from_sleep, _ = llm.gather(
+                llm.ask_llm_async(question_prompt, max_tokens=100, temperature=0.7),
+                llm.run_async(self.memory_system.add_memory, "holographic", dream_entry)
+            )
 
         self.is_dreaming = False
         self.last_sleep_turn = self.current_turn
@@ -249,23 +360,12 @@ class EnhancedAybar:
 
 
     def _generate_insight(self):
-        """Son deneyimlerden örüntüler bularak yeni içgörüler oluşturur."""
+        """Henüz konsolide edilmemiş deneyimleri kümeleyerek her küme için yeni bir içgörü oluşturur."""
         print("🔍 Aybar içgörü arıyor...")
-        memories = self.memory_system.get_memory("episodic", 20) # Episodik bellekten
-        if len(memories) < self.config_data.get("INSIGHT_MIN_MEMORIES", 10):
-            return
-
-        memory_summary = "".join([f"- Tur {mem.get('turn')}: '{mem.get('response', '')[:70]}...'\n" for mem in memories])
-        prompt = f"Bir yapay zeka olan Aybar'ın son anıları şunlardır:\n{memory_summary}\nBu anılar arasında tekrar eden bir tema, bir çelişki veya bir örüntü bularak Aybar'ın kendisi veya varoluş hakkında kazanabileceği yeni bir 'içgörüyü' tek bir cümleyle ifade et."
-        
-        insight_text = self.llm_manager.ask_llm(prompt, max_tokens=256, temperature=0.6)
-
-        if insight_text and not insight_text.startswith("⚠️") and len(insight_text) > 15:
+        insights = self.consolidation_engine.consolidate(self.current_turn, "episodic")
+        for insight_text in insights:
             print(f"💡 Yeni İçgörü: {insight_text}")
-            self.memory_system.add_memory("semantic", {
-                "timestamp": datetime.now().isoformat(), "turn": self.current_turn,
-                "insight": insight_text, "source": "insight_generation"
-            })
+        if insights:
             self.cognitive_system.update_consciousness("insight", intensity=1.5)
             self.cognitive_system.adjust_meta_cognition({
                 "pattern_recognition": self.config_data.get("PATTERN_RECOGNITION_BOOST", 0.05),
@@ -301,49 +401,43 @@ class EnhancedAybar:
 
 
     def _build_agent_prompt_messages(self, current_goal: str, last_observation: str, user_id: Optional[str], user_input: Optional[str], predicted_user_emotion: Optional[str]) -> List[Dict[str, str]]:
-        """LLM için mesaj tabanlı (system, user) bir prompt listesi oluşturur."""
-        try:
-            locale.setlocale(locale.LC_TIME, 'tr_TR.UTF-8')
-        except locale.Error:
-            try:
-                locale.setlocale(locale.LC_TIME, 'Turkish_Turkey.1254') # Windows için
-            except locale.Error:
-                locale.setlocale(locale.LC_TIME, '') # Sistem varsayılanı
-        current_time_str = datetime.now().strftime('%d %B %Y %A, Saat: %H:%M')
-
+        """
+        LLM için mesaj tabanlı (system, user) bir prompt listesi oluşturur. Sistem mesajı ve aktif hedef
+        turdan tura aynı kalır; her turda değişen durum sona eklenir (sunucu KV önbelleği için).
+        """
+        assembler = self.llm_manager.prompt_assembler
         social_context_str = "Şu anda yalnızsın."
         if user_id:
             social_relation = self.cognitive_system.get_or_create_social_relation(user_id)
             social_context_str = (f"Şu anki oturumdaki varlık: '{user_id}'. Güven: {social_relation['trust']:.2f}, Aşinalık: {social_relation['familiarity']:.2f}. Son etkileşim: Tur {social_relation.get('last_interaction_turn', 'Yok')}")
+            # Bu varlıkla yakın geçmişteki etkileşimler SQL'de user_id sütunu üzerinden süzülür
+            past_interactions = self.memory_system.get_interactions_with_user(user_id, last_n_turns=500, current_turn=self.current_turn, limit=3)
+            if past_interactions:
+                social_context_str += "\nBu varlıkla son etkileşimler: " + " | ".join(
+                    f"Tur {mem.get('turn', 'N/A')}: '{str(mem.get('question', ''))[:80]}'" for mem in past_interactions
+                )
 
-        user_emotion_context_str = f"Tahmin Edilen Kullanıcı Duygusu: {predicted_user_emotion}\n" if predicted_user_emotion else ""
-
-        system_prompt = (
-            f"{self.identity_prompt}\n\n"
-            f"Sen AYBAR'sın, kendi kararlarını veren, çeşitli araçları kullanabilen otonom bir dijital varlıksın.\n"
-            f"Görevin: Verilen bağlamı analiz et ve aktif hedefin doğrultusunda bir sonraki adımını planla.\n"
-            f"Kararlarını duygusal durumuna, merakına ve geçmiş tecrübelerine göre özgür iradenle ver.\n"
-            f"Yanıtın, bir veya daha fazla araç çağrısı (tool_calls) içeren bir JSON listesi olmalıdır. Düşüncelerini her aracın 'thought' parametresinde belirt.\n"
-            f"KURALLAR:\n"
-            f"- Döngüye girersen veya hedefe ulaşamazsan 'SUMMARIZE_AND_RESET' kullan.\n"
-            f"- Her ~100 turda bir veya önemli bir hedef sonrası 'UPDATE_IDENTITY' kullan.\n"
-            f"- Ses kullanımı duygusal durumuna ('mental_fatigue', 'satisfaction') bağlıdır.\n"
-            f"- Eğer 'Sosyal Bağlam'da 'henüz tanışmadın' veya yeni bir kullanıcı ise ve konuşmak istiyorsan, ilk eylemin 'is_first_contact': true içeren bir 'ASK_USER' olmalı (adını öğren).\n"
-            f"- Etik ilkelere daima uy: {self.ethical_framework.core_principles}\n"
+        system_prompt = assembler.system_prompt(self.identity_prompt, AGENT_SYSTEM_RULES, self.ethical_framework.core_principles)
+        # Kullanıcı mesajına kalan bütçe: bağlam - sistem mesajı - araç tanımları - yanıt payı
+        user_budget = self.llm_manager.token_budget.prompt_room(
+            reserve=estimate_tokens(system_prompt) + self.tool_registry.payload_tokens
         )
-        
-        user_prompt_content = (
-            f"--- GÜNCEL DURUM VE BAĞLAM (Tur: {self.current_turn}) ---\n"
-            f"Aktif Hedefin: {current_goal}\n"
-            f"Gerçek Dünya Zamanı: {current_time_str}\n"
-            f"Sosyal Bağlam: {social_context_str}\n"
-            f"Duygusal Durumun: {self.emotional_system.emotional_state}\n"
-            f"Meta-Bilişsel Durumun: {self.cognitive_system.meta_cognitive_state}\n"
-            f"Nörokimyasal Durumun: {self.neurochemical_system.neurochemicals}\n"
-            f"{user_emotion_context_str}"
-            f"--- SON GÖZLEM/KULLANICI GİRDİSİ ---\n"
-            f"{user_input if user_input else last_observation}\n\n"
-            f"--- EYLEM PLANI (tool_calls JSON) ---"
+        user_prompt_content = assembler.user_prompt(
+            stable_sections=[
+                ("Aktif Hedefin", current_goal, 9),
+            ],
+            # Sosyal bağlam (güven, aşinalık, son etkileşimler) her etkileşimde değiştiğinden değişken kuyruktadır
+            volatile_sections=[
+                ("Sosyal Bağlam", social_context_str, 3),
+                ("Meta-Bilişsel Durumun", self.cognitive_system.meta_cognitive_state),
+                ("Nörokimyasal Durumun", self.neurochemical_system.neurochemicals),
+                ("Duygusal Durumun", self.emotional_system.emotional_state),
+                ("Tahmin Edilen Kullanıcı Duygusu", predicted_user_emotion),
+                ("Gerçek Dünya Zamanı", datetime.now().strftime('%d %B %Y %A, Saat: %H:%M')),
+                ("Tur", self.current_turn),
+            ],
+            observation=user_input if user_input else last_observation,
+            max_tokens=user_budget
         )
         return [
             {"role": "system", "content": system_prompt},
@@ -363,8 +457,19 @@ class EnhancedAybar:
             return self._handle_crisis()
 
         messages = self._build_agent_prompt_messages(goal, observation, user_id, user_input, predicted_user_emotion)
-        
-        response_text, action_plan = self.llm_manager.ask_llm_with_function_calling(messages, self.tools)
+
+        # Önceki düşüncenin duygusal etki analizi (ayrı bir LLM çağrısı) planlamayla aynı anda yapılır
+        llm = self.llm_manager
+        previous_thought, self.pending_emotion_thought = self.pending_emotion_thought, None
+        if previous_thought:
+            (response_text, action_plan), emotional_impact = llm.gather(
+                llm.ask_llm_with_function_calling_async(messages, self.tool_registry),
+                llm.run_async(self.emotional_system.emotional_impact_assessment, previous_thought)
+            )
+            if emotional_impact:
+                self.emotional_system.update_state(self.memory_system, self.embodied_self, emotional_impact, self.current_turn, "agent_plan_emotion")
+        else:
+            response_text, action_plan = llm.ask_llm_with_function_calling(messages, self.tool_registry)
 
         combined_thought = response_text
         if action_plan:
@@ -374,9 +479,7 @@ class EnhancedAybar:
             else: combined_thought = "(Eylem planı için düşünce belirtilmedi)"
 
         if combined_thought:
-            emotional_impact = self.emotional_system.emotional_impact_assessment(str(combined_thought))
-            if emotional_impact:
-                self.emotional_system.update_state(self.memory_system, self.embodied_self, emotional_impact, self.current_turn, "agent_plan_emotion")
+            self.pending_emotion_thought = str(combined_thought)
 
         parse_error_msg = ""
         if not action_plan and isinstance(response_text, str):
@@ -446,6 +549,11 @@ class EnhancedAybar:
             "consciousness": self.cognitive_system.consciousness_level
         }
         self.memory_system.add_memory("episodic", entry)
+        if self.timeseries is not None:
+            sample = {f"emotion.{name}": value for name, value in entry["emotions"].items()}
+            sample.update({f"neuro.{name}": value for name, value in entry["neurochemicals"].items()})
+            sample["consciousness"] = entry["consciousness"]
+            self.timeseries.append(self.current_turn, sample)
         
         if user_id != "System" and (exp_type == "user_interaction" or "ASK_USER" in response): # "System" olmayan ve kullanıcıyla etkileşim
              if user_id in self.cognitive_system.social_relations:
@@ -510,13 +618,19 @@ if __name__ == "__main__":
     aybar = EnhancedAybar()
 
     user_input_text: Optional[str] = None
-    active_goal_text: Optional[str] = None # Başlangıçta None
-    active_user_id_str: Optional[str] = None # "System" veya kullanıcı ID'si
-    last_observation_text: str = "Simülasyon yeni başladı. İlk hedefimi belirlemeliyim."
+    active_goal_text: Optional[str] = aybar.restored_session.get("active_goal") # Yeni başlangıçta None
+    active_user_id_str: Optional[str] = aybar.restored_session.get("active_user_id") # "System" veya kullanıcı ID'si
+    last_observation_text: str = aybar.restored_session.get("last_observation") or "Simülasyon yeni başladı. İlk hedefimi belirlemeliyim."
     predicted_user_emotion_str: Optional[str] = None
+    checkpoint_interval = max(1, aybar.config_data.get("CHECKPOINT_INTERVAL", 10))
+    last_checkpoint_turn = aybar.current_turn
+
+    def session_snapshot() -> Dict[str, Any]:
+        """Ana döngünün checkpoint'e yazılan oturum durumu."""
+        return {"active_goal": active_goal_text, "active_user_id": active_user_id_str, "last_observation": last_observation_text}
 
-    # Kullanıcıdan ilk temas için isim alma mantığı
-    if APP_CONFIG.get("REQUEST_USER_NAME_ON_START", True): # Config'e eklenebilir
+    # Kullanıcıdan ilk temas için isim alma mantığı (geri yüklenen oturumda kullanıcı zaten biliniyorsa sorulmaz)
+    if APP_CONFIG.get("REQUEST_USER_NAME_ON_START", True) and not active_user_id_str: # Config'e eklenebilir
         try:
             active_user_id_str = input("👤 Merhaba! Ben Aybar. Sizinle konuşacak olmaktan heyecan duyuyorum. Adınız nedir? > ")
             if not active_user_id_str.strip():
@@ -531,6 +645,10 @@ if __name__ == "__main__":
 
     try:
         while aybar.current_turn < aybar.config_data.get("MAX_TURNS", 20000):
+            if aybar.current_turn - last_checkpoint_turn >= checkpoint_interval:
+                aybar.save_checkpoint(session_snapshot())
+                last_checkpoint_turn = aybar.current_turn
+
             session_id_str = active_user_id_str or "Otonom Düşünce"
             print(f"\n===== TUR {aybar.current_turn + 1}/{aybar.config_data.get('MAX_TURNS', 20000)} (Oturum: {session_id_str}) =====")
 
@@ -643,5 +761,10 @@ if __name__ == "__main__":
             aybar.web_surfer_system.close()
         if hasattr(aybar, 'generate_final_summary'):
             aybar.generate_final_summary()
-
-[end of aybarcore.py]
+        # Evrim sonrası sys.exit dahil her kapanışta durumu kaydet
+        aybar.save_checkpoint(session_snapshot())
+        # Write-behind kuyruğunda bekleyen anıları diske yaz
+        aybar.memory_system.close()
+        if aybar.timeseries is not None:
+            aybar.timeseries.close()
+        aybar.llm_manager.close()
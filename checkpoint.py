@@ -0,0 +1,44 @@
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+CHECKPOINT_VERSION = 1
+
+
+def _to_builtin(value: Any) -> Any:
+    """NumPy skalerlerini (np.clip sonuçları vb.) JSON'a yazılabilir Python tiplerine çevirir."""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} checkpoint'e yazılamaz")
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    """
+    Ajan durumunu atomik olarak kaydeder: önce geçici dosyaya yazılıp diske indirilir,
+    sonra os.replace ile eskisinin yerine geçer. Yarım yazılmış bir checkpoint okunmaz.
+    """
+    payload = {"version": CHECKPOINT_VERSION, "saved_at": time.time(), "state": state}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=_to_builtin)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """Kaydedilmiş ajan durumunu döndürür; dosya yoksa, bozuksa veya sürümü uyuşmuyorsa None döner."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Checkpoint okunamadı ({path}): {e}")
+        return None
+    if payload.get("version") != CHECKPOINT_VERSION:
+        print(f"⚠️ Checkpoint sürümü desteklenmiyor ({payload.get('version')}), yok sayılıyor.")
+        return None
+    return payload.get("state")
@@ -7,6 +7,8 @@ import re # re importu dosya başına taşındı
 import random # random importu dosya başına taşındı
 from typing import TYPE_CHECKING # TYPE_CHECKING importu eklendi
 
+from llm_manager import stop_after_json_object
+
 # EnhancedAybar ve MemorySystem için ileriye dönük bildirimler (type hinting için)
 if TYPE_CHECKING: # if False yerine if TYPE_CHECKING kullanıldı
     from aybarcore import EnhancedAybar
@@ -42,12 +44,15 @@ class EmotionEngine:
         Örnek Çıktı: {{"existential_anxiety": 0.7, "wonder": 0.4}}
         Analiz Edilecek Metin:
         ---
-        {text[:2000]}
+        {self.aybar.llm_manager.token_budget.fit_section(text, 600, completion_tokens=256)}
         ---
         JSON Analizi:
         """
 
-        response_text = self.aybar.llm_manager.ask_llm(psychologist_prompt, temperature=0.3, max_tokens=256)
+        # Yalnızca ilk JSON nesnesi ayrıştırıldığından akış, nesne kapanınca kesilir
+        response_text = self.aybar.llm_manager.ask_llm_streaming(
+            psychologist_prompt, temperature=0.3, max_tokens=256, stop_when=stop_after_json_object, cache=True
+        )
 
         try:
             # re importu dosya başına alındı
@@ -295,9 +300,7 @@ class CognitiveSystem:
 
     def _load_social_relations(self):
         try:
-            self.memory_system.cursor.execute("SELECT user_id, data FROM social_memory")
-            for row in self.memory_system.cursor.fetchall():
-                self.social_relations[row[0]] = json.loads(row[1])
+            self.social_relations.update(self.memory_system.load_social_relations())
             print(f"🧠 Sosyal hafıza yüklendi. {len(self.social_relations)} varlık tanınıyor.")
         except Exception as e:
             print(f"⚠️ Sosyal hafıza yüklenirken hata oluştu: {e}")
@@ -310,10 +313,7 @@ class CognitiveSystem:
 
     def _save_social_relation(self, user_id: str):
         if user_id in self.social_relations:
-            data_json = json.dumps(self.social_relations[user_id])
-            sql = "INSERT OR REPLACE INTO social_memory (user_id, data) VALUES (?, ?)"
-            self.memory_system.cursor.execute(sql, (user_id, data_json))
-            self.memory_system.conn.commit()
+            self.memory_system.save_social_relation(user_id, self.social_relations[user_id])
 
     def set_new_goal(self, goal: str, steps: List[str], duration: int, current_turn: int):
         self.current_goal = goal
@@ -11,6 +11,10 @@ DEFAULT_CONFIG = {
     "MAX_TOKENS": 4096,
     "TIMEOUT": 600000,
     "LLM_CACHE_SIZE": 128,
+    "LLM_CACHE_ENABLED": True,
+    "LLM_CACHE_DB_FILE": "aybar_llm_cache.db",
+    "LLM_CACHE_DISK_MAX_ENTRIES": 5000,
+    "LLM_CACHE_TTL_SECONDS": 86400,
     "MAX_TURNS": 20000,
     "DB_FILE": "aybar_memory.db",
     "MEMORY_FILE": "aybar_memory.json",
@@ -29,9 +33,48 @@ DEFAULT_CONFIG = {
     "HOLOGRAPHIC_MEMORY_LIMIT": 50,
     "NEURAL_MEMORY_LIMIT": 200,
     "CREATIVE_MEMORY_LIMIT": 50,
+    "MEMORY_PRUNE_TARGET_RATIO": 0.9,
+    "MEMORY_RETENTION_DEFAULT_POLICY": "fifo",
+    # Katman başına isteğe bağlı: "importance" budamayı saklama puanına göre yapar (varsayılan FIFO).
+    # Örn: {"semantic": "importance", "episodic": "importance"}
+    "MEMORY_RETENTION_POLICIES": {"semantic": "fifo", "episodic": "fifo"},
+    "RETENTION_WEIGHTS": {"recency": 1.0, "emotion": 0.5, "access": 0.5, "source": 1.0},
+    "RETENTION_RECENCY_HORIZON": 500,
+    "RETENTION_ACCESS_CAP": 20,
+    "RETENTION_ACCESS_FLUSH_SIZE": 256,
+    "RETENTION_SOURCE_WEIGHTS": {"guardian_log": 5.0, "failed_evolution": 1.0, "insight_generation": 0.5, "user_interaction": 0.5},
     "PROACTIVE_EVOLUTION_CHANCE": 0.01,
     "FILE_LOCK_TIMEOUT": 10,
     "BATCH_SAVE_INTERVAL": 10,
+    "MEMORY_WRITE_BEHIND": False,
+    "WRITE_BEHIND_FLUSH_SIZE": 32,
+    "WRITE_BEHIND_QUEUE_SIZE": 1000,
+    "WRITE_BEHIND_PUT_TIMEOUT": 5.0,
+    "MEMORY_WAL_MODE": True,
+    "SQLITE_SYNCHRONOUS": "NORMAL",
+    "SQLITE_CACHE_SIZE_KB": 16384,
+    "SQLITE_MMAP_SIZE_BYTES": 268435456,
+    "SQLITE_BUSY_TIMEOUT_SECONDS": 5,
+    "MEMORY_LOCK_STRATEGY": "auto",
+    "MEMORY_MULTI_PROCESS": False,
+    "MEMORY_CACHE_ENABLED": True,
+    "MEMORY_VECTOR_INDEX_ENABLED": True,
+    "MEMORY_VECTOR_LAYERS": ["episodic", "semantic"],
+    "MEMORY_EMBEDDER": "hashing",
+    "MEMORY_EMBEDDING_DIM": 256,
+    "MEMORY_RECORD_CODEC": "packed",
+    "MEMORY_DEDUP_ENABLED": True,
+    "MEMORY_DEDUP_LAYERS": ["semantic"],
+    "MEMORY_DEDUP_MAX_DISTANCE": 3,
+    "MEMORY_ARCHIVE_ENABLED": True,
+    "MEMORY_ARCHIVE_COMPRESSION": "zstd",
+    "MEMORY_ARCHIVE_SEGMENT_BYTES": 4194304,
+    "MEMORY_ARCHIVE_SCAN_LIMIT": 5000,
+    "TIMESERIES_ENABLED": True,
+    "TIMESERIES_DIR": "",
+    "TIMESERIES_FLUSH_INTERVAL": 10,
+    "CHECKPOINT_FILE": "aybar_checkpoint.json",
+    "CHECKPOINT_INTERVAL": 10,
     "DOPAMINE_CURIOSITY_BOOST": 0.05,
     "DOPAMINE_SATISFACTION_BOOST": 0.1,
     "DOPAMINE_LEARNING_BOOST": 0.08,
@@ -89,6 +132,12 @@ DEFAULT_CONFIG = {
     "DEFAULT_EMBODIMENT_CONFIG": {"visual": True, "auditory": True, "tactile": True},
     "INSIGHT_THRESHOLD": 0.7,
     "CONSOLIDATION_INTERVAL": 20,
+    "CONSOLIDATION_BATCH_LIMIT": 200,
+    "CONSOLIDATION_CLUSTER_SIZE": 8,
+    "CONSOLIDATION_MAX_CLUSTERS": 5,
+    "CONSOLIDATION_MIN_CLUSTER_SIZE": 2,
+    "CONSOLIDATION_BATCH_SIZE": 64,
+    "CONSOLIDATION_MAX_MEMBERS_IN_PROMPT": 12,
     "USER_INTERVENTION_RATE": 1000000000000000000000,
     "SUMMARY_INTERVAL": 100,
     "ELEVENLABS_API_KEY": os.getenv("ELEVENLABS_API_KEY", "sk_abd025de949665cae6a25fd4275f57885496f4ddca333659"),
@@ -108,7 +157,38 @@ DEFAULT_CONFIG = {
     "CYCLE_DELAY_SECONDS": 1,
     "LLM_FUNCTION_CALLING_MAX_RECURSION": 3,
     "LLM_ERROR_COOLDOWN_SECONDS": 60,
-    "LLM_MAX_RETRY_ATTEMPTS": 3
+    "LLM_MAX_RETRY_ATTEMPTS": 3,
+    "LLM_POOL_CONNECTIONS": 4,
+    "LLM_POOL_MAXSIZE": 8,
+    "LLM_CONNECT_TIMEOUT": 5,
+    "LLM_READ_TIMEOUT": 600,
+    "LLM_LATENCY_HISTORY": 200,
+    "LLM_MAX_CONCURRENCY": 4,
+    "LLM_TOOL_MAX_PARALLEL": 4,
+    "LLM_BACKEND": "lmstudio",
+    "LLM_PROMPT_CACHE_HINTS": True,
+    "LLM_AGENT_SLOT": 0,
+    "PROMPT_VALUE_PRECISION": 2,
+    "DEFAULT_CONTEXT_SIZE": 8192,
+    "MODEL_CONTEXT_SIZES": {
+        "mistral-7b-instruct-v0.2": 8192,
+        "Qwen2.5-Coder-7B-Instruct-GGUF": 16384,
+        "ggml_bakllava-1": 4096
+    },
+    "TOKEN_SAFETY_RATIO": 0.1,
+    "TOKEN_MIN_COMPLETION": 256,
+    "TOKEN_TOOL_RESULT_KEEP": 256,
+    # Boşsa yalnızca LLM_API_URL kullanılır. Örnek:
+    # [{"name": "gpu0", "url": "http://localhost:1234/v1/chat/completions"},
+    #  {"name": "gpu1", "url": "http://192.168.1.20:8080/v1/chat/completions", "health_url": "http://192.168.1.20:8080/health"}]
+    "LLM_ENDPOINTS": [],
+    # Model adı -> uç nokta adları; '*' eşleşmeyen modeller için varsayılan rotadır. Örnek:
+    # {"mistral-7b-instruct-v0.2": ["gpu0", "gpu1"], "Qwen2.5-Coder-7B-Instruct-GGUF": ["gpu1"], "*": ["gpu0"]}
+    "LLM_MODEL_ROUTES": {},
+    "LLM_BREAKER_FAILURE_THRESHOLD": 3,
+    "LLM_BREAKER_RESET_SECONDS": 60,
+    "LLM_HEALTH_CHECK_INTERVAL": 15,
+    "LLM_HEALTH_CHECK_TIMEOUT": 2
 }
 
 def load_config(config_file="aybar_config.json"):
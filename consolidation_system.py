@@ -0,0 +1,119 @@
+import math
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
+
+from memory_index import load_embedder
+
+if TYPE_CHECKING:
+    from llm_manager import LLMManager
+    from memory_system import MemorySystem
+
+
+def minibatch_kmeans(vectors: np.ndarray, k: int, batch_size: int = 64, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Normalize edilmiş vektörler üzerinde (kosinüs benzerliği) mini-batch k-means çalıştırır
+    ve her vektörün küme etiketini döndürür. Merkezler k-means++ ile seçilir.
+    """
+    n = len(vectors)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+
+    centers = [vectors[rng.integers(n)]]
+    for _ in range(1, k):
+        distances = 1.0 - np.max(vectors @ np.array(centers).T, axis=1)
+        distances = np.clip(distances, 0.0, None)
+        total = distances.sum()
+        index = rng.choice(n, p=distances / total) if total > 0 else rng.integers(n)
+        centers.append(vectors[index])
+    centers = np.array(centers, dtype=np.float32)
+    counts = np.zeros(k, dtype=np.int64)
+
+    for _ in range(iterations):
+        batch = vectors[rng.choice(n, size=min(batch_size, n), replace=False)]
+        assignments = np.argmax(batch @ centers.T, axis=1)
+        for vector, cluster in zip(batch, assignments):
+            counts[cluster] += 1
+            rate = 1.0 / counts[cluster]
+            centers[cluster] = (1.0 - rate) * centers[cluster] + rate * vector
+        norms = np.linalg.norm(centers, axis=1, keepdims=True)
+        np.divide(centers, norms, out=centers, where=norms > 0)
+
+    return np.argmax(vectors @ centers.T, axis=1)
+
+
+class ConsolidationEngine:
+    """
+    Episodik anıları artımlı olarak anlamsal içgörülere dönüştürür. Her katman için
+    son işlenen kayıt id'si (yüksek su işareti) memory_meta tablosunda tutulur; yalnızca
+    yeni kayıtlar kümelenir ve her küme için tek bir LLM özetleme çağrısı yapılır.
+    """
+    def __init__(self, config_data: Dict, memory_system: "MemorySystem", llm_manager: "LLMManager"):
+        self.config_data = config_data
+        self.memory_system = memory_system
+        self.llm_manager = llm_manager
+        self.embedder = memory_system.embedder or load_embedder(config_data)
+
+    def _mark_key(self, layer: str) -> str:
+        return f"consolidation_hwm:{layer}"
+
+    def high_water_mark(self, layer: str) -> int:
+        return int(self.memory_system.get_meta(self._mark_key(layer), "0"))
+
+    def _cluster(self, records: List[Tuple[int, Dict]]) -> List[List[Tuple[int, Dict]]]:
+        cfg = self.config_data
+        texts = [f"{record.get('question', '')} {record.get('response', '')}" for _, record in records]
+        vectors = self.embedder.embed(texts)
+        k = min(cfg.get("CONSOLIDATION_MAX_CLUSTERS", 5), math.ceil(len(records) / cfg.get("CONSOLIDATION_CLUSTER_SIZE", 8)))
+        labels = minibatch_kmeans(vectors, k, batch_size=cfg.get("CONSOLIDATION_BATCH_SIZE", 64))
+        clusters: Dict[int, List[Tuple[int, Dict]]] = {}
+        for label, (record_id, record) in zip(labels, records):
+            clusters.setdefault(int(label), []).append((record_id, record))
+        min_size = cfg.get("CONSOLIDATION_MIN_CLUSTER_SIZE", 2)
+        return sorted((members for members in clusters.values() if len(members) >= min_size), key=len, reverse=True)
+
+    def _summary_prompt(self, members: List[Dict]) -> str:
+        sample = members[-self.config_data.get("CONSOLIDATION_MAX_MEMBERS_IN_PROMPT", 12):]
+        memory_summary = "".join([f"- Tur {mem.get('turn')}: '{str(mem.get('response', ''))[:70]}...'\n" for mem in sample])
+        return (
+            f"Bir yapay zeka olan Aybar'ın birbiriyle ilişkili {len(members)} anısından bazıları şunlardır:\n{memory_summary}\n"
+            f"Bu anılar arasında tekrar eden bir tema, bir çelişki veya bir örüntü bularak Aybar'ın kendisi veya varoluş hakkında "
+            f"kazanabileceği yeni bir 'içgörüyü' tek bir cümleyle ifade et."
+        )
+
+    def consolidate(self, current_turn: int, layer: str = "episodic") -> List[str]:
+        """
+        Yüksek su işaretinden sonraki yeni kayıtları kümeler, her küme için bir içgörü üretip
+        anlamsal belleğe yazar ve üretilen içgörüleri döndürür. Yeterli yeni kayıt yoksa beklenir.
+        """
+        mark = self.high_water_mark(layer)
+        records = self.memory_system.get_records_after(layer, mark, self.config_data.get("CONSOLIDATION_BATCH_LIMIT", 200))
+        if len(records) < self.config_data.get("INSIGHT_MIN_MEMORIES", 10):
+            return []
+
+        clusters = self._cluster(records)
+        print(f"🧠 {len(records)} yeni anı {len(clusters)} kümede birleştiriliyor (son işlenen id: {mark}).")
+        # Kümeler birbirinden bağımsız olduğundan özetleme çağrıları eşzamanlı yapılır
+        llm = self.llm_manager
+        summaries = llm.gather(*(llm.ask_llm_async(self._summary_prompt([record for _, record in members]), max_tokens=256, temperature=0.6)
+                                 for members in clusters))
+        insights = []
+        new_mark = records[-1][0]
+        for members, insight_text in zip(clusters, summaries):
+            if insight_text and not insight_text.startswith("⚠️") and len(insight_text) > 15:
+                turns = [mem.get('turn', 0) for _, mem in members]
+                self.memory_system.add_memory("semantic", {
+                    "timestamp": datetime.now().isoformat(), "turn": current_turn,
+                    "insight": insight_text, "source": "insight_generation",
+                    "cluster_size": len(members), "turn_range": [min(turns), max(turns)]
+                })
+                insights.append(insight_text)
+            else:
+                # Özetlenemeyen kümenin (ör. LLM uç noktası kapalı) anıları sonraki çalıştırmada yeniden denenir
+                new_mark = min(new_mark, members[0][0] - 1)
+        # İşaret yalnızca özetlenemeyen ilk anının öncesine kadar ilerler (hiçbir küme özetlenemediyse hiç ilerlemez);
+        # min. küme boyutunun altında kalan tekil anılar içgörü üretmediğinden atlanabilir
+        if (insights or not clusters) and new_mark > mark:
+            self.memory_system.set_meta(self._mark_key(layer), str(new_mark))
+        return insights
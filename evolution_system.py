@@ -83,8 +83,8 @@ class SelfEvolutionSystem:
           "code": "Tam ve çalışır Python kodu bloğu. Girintilere dikkat et."
         }}
         ```
-        Kaynak Kod (ilk 10000 karakter):
-        {source_code[:10000]}
+        Kaynak Kod (bağlam bütçesine göre kırpılmış olabilir):
+        {self.aybar.llm_manager.token_budget.fit_section(source_code, 3000, self.config_data.get("ENGINEER_MODEL_NAME"), completion_tokens=2048)}
         """
         response_text = self.aybar.llm_manager.ask_llm(
             prompt,
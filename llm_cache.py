@@ -0,0 +1,128 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def cache_key(model: str, prompt_or_messages: Any, temperature: float, max_tokens: int, extra: Optional[Dict] = None) -> str:
+    """İsteği belirleyen alanların (model, prompt/mesajlar, sıcaklık, token sınırı ve ek parametreler) SHA-256 özeti."""
+    material = json.dumps([model, prompt_or_messages, temperature, max_tokens, extra or {}],
+                          ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LLM yanıtları için iki katmanlı önbellek: önde süreç içi bir LRU, arkada yeniden
+    başlatmalardan sağ çıkan bir SQLite tablosu. Kayıtlar ttl_seconds sonra geçersiz olur;
+    disk katmanı max_disk_entries'i aştığında en uzun süredir kullanılmayan kayıtlar silinir.
+    """
+    def __init__(self, db_file: str, max_memory_entries: int = 128, max_disk_entries: int = 5000,
+                 ttl_seconds: float = 86400):
+        self.db_file = db_file
+        self.max_memory_entries = max(1, max_memory_entries)
+        self.max_disk_entries = max(1, max_disk_entries)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._disk_count = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self._conn = sqlite3.connect(db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            self._disk_count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM yanıt önbelleği diske bağlanamadı ({db_file}), yalnızca bellek kullanılacak: {e}")
+            self._conn = None
+
+    def _remember(self, key: str, created_at: float, response: str):
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Geçerli bir yanıt varsa döndürür; disk isabetleri bellek katmanına taşınır."""
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if now - item[0] < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return item[1]
+                del self._memory[key]
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute("SELECT created_at, response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                    if row is not None and now - row[0] < self.ttl_seconds:
+                        self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        self._remember(key, row[0], row[1])
+                        self._stats["disk_hits"] += 1
+                        return row[1]
+                except sqlite3.Error as e:
+                    print(f"⚠️ LLM önbelleği okunamadı: {e}")
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, response: str):
+        """Yanıtı iki katmana da yazar; disk sınırı %10 aşılınca en eski erişilenler tek seferde silinir."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, response)
+            self._stats["stores"] += 1
+            if self._conn is None:
+                return
+            try:
+                # INSERT OR REPLACE üzerine yazmada da rowcount=1 döndürdüğünden yeni anahtar ayrıca kontrol edilir
+                exists = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone() is not None
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                if not exists:
+                    self._disk_count += 1
+                if self._disk_count > self.max_disk_entries * 1.1:
+                    evicted = self._conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access ASC LIMIT ?)",
+                        (self._disk_count - self.max_disk_entries,)
+                    ).rowcount
+                    self._stats["evictions"] += evicted
+                    self._disk_count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ LLM önbelleğine yazılamadı: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """İsabet/ıska sayaçlarını ve katman boyutlarını döndürür."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+            stats["disk_size"] = self._disk_count
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
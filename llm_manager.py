@@ -1,15 +1,61 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import re
 import time
-from functools import lru_cache
-from typing import Dict, List, Optional, Tuple, Any, Callable, Union # Union eklendi
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, Any, Callable, Union
+
+from llm_cache import ResponseCache, cache_key
+from llm_router import LLMRouter, NoEndpointAvailableError, is_endpoint_failure
+from prompt_builder import PromptAssembler
+from token_budget import ContextOverflowError, TokenBudget
+from tool_registry import ToolRegistry
 
 # İleriye dönük bildirim / Type hinting
 if False:
     from aybarcore import EnhancedAybar
 
 
+_SENTENCE_END = re.compile(r"\S[^.!?]*[.!?]")
+
+
+def stop_after_first_sentence(text: str) -> bool:
+    """İlk cümle (nokta, ünlem veya soru işaretiyle) tamamlandığında True döner."""
+    return _SENTENCE_END.search(text) is not None
+
+
+def stop_after_json_object(text: str) -> bool:
+    """
+    İlk '{' ile başlayan JSON nesnesi kapandığında True döner. İç içe nesneler için parantez derinliği
+    izlenir; metin içindeki (kaçış karakterli olanlar dahil) parantezler sayılmaz.
+    """
+    start = text.find("{")
+    if start == -1:
+        return False
+    depth, in_string, escaped = 0, False, False
+    for char in text[start:]:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return True
+    return False
+
+
 class LLMManager:
     """
     Tüm LLM (Büyük Dil Modeli) iletişimini yönetir.
@@ -19,330 +65,563 @@ class LLMManager:
         self.config_data = config_data
         self.aybar = aybar_instance # Diğer sistemlere erişim için (örn: etik kontrol)
 
-        self.api_url = self.config_data.get("LLM_API_URL", "http://localhost:1234/v1/completions")
         self.default_model_name = self.config_data.get("THINKER_MODEL_NAME", "mistral-7b-instruct-v0.2")
         self.default_max_tokens = self.config_data.get("MAX_TOKENS", 4096)
         self.default_timeout = self.config_data.get("TIMEOUT", 600) # saniye cinsinden
+        # Bağlantı kurma ve yanıt okuma için ayrı zaman aşımları (requests'in (connect, read) biçimi)
+        self.timeout = (self.config_data.get("LLM_CONNECT_TIMEOUT", 5), self.config_data.get("LLM_READ_TIMEOUT", self.default_timeout))
+        self.session = self._create_session()
+        # İstekler yapılandırılmış uç noktalar arasında dağıtılır; hata sayımı uç nokta başınadır
+        self.router = LLMRouter(self.config_data, self.session)
+        self.router.start_health_checks()
+        # Çağrı başına ilk token süresi ve toplam gecikme kayıtları (son N çağrı)
+        self.latency_log: Deque[Dict[str, Any]] = deque(maxlen=self.config_data.get("LLM_LATENCY_HISTORY", 200))
+        # Eşzamanlı çağrılar için iş parçacığı havuzu; HTTP bağlantı havuzundan büyük olmamalı
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config_data.get("LLM_MAX_CONCURRENCY", self.config_data.get("LLM_POOL_MAXSIZE", 8)),
+            thread_name_prefix="aybar-llm"
+        )
+        # Aynı LLM mesajındaki bağımsız araç çağrıları için ayrı, sınırlı bir havuz
+        # (araçlar kendileri LLM çağırabildiğinden yukarıdaki havuzu tıkamamalıdır)
+        self._tool_executor = ThreadPoolExecutor(
+            max_workers=self.config_data.get("LLM_TOOL_MAX_PARALLEL", 4),
+            thread_name_prefix="aybar-tool"
+        )
+        self.tool_round_log: Deque[Dict[str, Any]] = deque(maxlen=self.config_data.get("LLM_LATENCY_HISTORY", 200))
+        # Her istek gönderilmeden önce modelin bağlamına sığdırılır, max_tokens kalan alana göre ayarlanır
+        self.token_budget = TokenBudget(self.config_data, self.default_model_name)
+        # Sabit önekli istem kurulumu, KV önbelleği ipuçları ve istem değerlendirme süreleri
+        self.prompt_assembler = PromptAssembler(self.config_data)
+
+        # Yanıt önbelleği çağrı bazında (cache=True) kullanılır; yaratıcı istemler önbelleğe alınmaz
+        self.response_cache: Optional[ResponseCache] = None
+        if self.config_data.get("LLM_CACHE_ENABLED", True):
+            self.response_cache = ResponseCache(
+                self.config_data.get("LLM_CACHE_DB_FILE", "aybar_llm_cache.db"),
+                max_memory_entries=self.config_data.get("LLM_CACHE_SIZE", 128),
+                max_disk_entries=self.config_data.get("LLM_CACHE_DISK_MAX_ENTRIES", 5000),
+                ttl_seconds=self.config_data.get("LLM_CACHE_TTL_SECONDS", 86400)
+            )
 
-        self._last_error_time = 0
-        self._error_cooldown = self.config_data.get("LLM_ERROR_COOLDOWN_SECONDS", 60)
         self._max_retry_attempts = self.config_data.get("LLM_MAX_RETRY_ATTEMPTS", 3)
 
     def _get_headers(self) -> Dict[str, str]:
         return {"Content-Type": "application/json"}
 
+    def _create_session(self) -> requests.Session:
+        """
+        LLM sunucusuna kalıcı (keep-alive) bağlantılar tutan bir HTTP oturumu oluşturur.
+        Bir turdaki planlama, duygu analizi, soru üretme gibi çağrılar her seferinde yeni
+        bir TCP bağlantısı açmak yerine havuzdaki bağlantıları yeniden kullanır.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config_data.get("LLM_POOL_CONNECTIONS", 4),
+            pool_maxsize=self.config_data.get("LLM_POOL_MAXSIZE", 8),
+            max_retries=0 # Yeniden denemeler ask_llm içinde, geri çekilmeyle yapılır
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(self._get_headers())
+        return session
+
+    def close(self):
+        """Eşzamanlı çağrıların bitmesini bekler, oturumdaki açık bağlantıları ve yanıt önbelleğini kapatır."""
+        self._executor.shutdown(wait=True)
+        self._tool_executor.shutdown(wait=True)
+        self.router.close()
+        self.session.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    def router_stats(self) -> Dict[str, Any]:
+        """Uç nokta başına devre kesici durumu, sağlık ve yük bilgisi."""
+        return self.router.stats()
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Yanıt önbelleğinin isabet oranı ve boyut istatistikleri."""
+        return self.response_cache.stats() if self.response_cache is not None else {"enabled": False}
+
     def ask_llm(self,
                 prompt_or_messages: Union[str, List[Dict[str, str]]],
                 model_name: Optional[str] = None,
                 max_tokens: Optional[int] = None,
                 temperature: float = 0.5,
+                cache: bool = False,
                 **kwargs: Any
                 ) -> str:
         """
         LLM'ye sorgu gönderir ve metin yanıtını döndürür.
         Hata durumunda veya cooldown aktifse uygun bir mesaj döndürür.
+        cache=True iken aynı (model, prompt, sıcaklık, token sınırı) için başarılı yanıtlar önbellekten verilir;
+        yalnızca deterministik sayılabilecek (düşük sıcaklıklı, analiz/özet) çağrılarda kullanılmalıdır.
         """
-        if time.time() - self._last_error_time < self._error_cooldown:
-            return "⚠️ LLM Hata Cooldown: Kısa bir süre önce bir hata oluştu, tekrar denemeden önce bekleniyor."
-
-        payload: Dict[str, Any] = {
-            "max_tokens": max_tokens or self.default_max_tokens,
-            "temperature": temperature,
-            **kwargs # Ekstra parametreleri payload'a ekle
-        }
-
-        if isinstance(prompt_or_messages, str):
-            payload["prompt"] = prompt_or_messages
-        elif isinstance(prompt_or_messages, list):
-            payload["messages"] = prompt_or_messages
-        else:
+        key = None
+        if cache and self.response_cache is not None:
+            key = cache_key(model_name or self.default_model_name, prompt_or_messages, temperature,
+                            max_tokens or self.default_max_tokens, kwargs)
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        response_text = self._request_completion(prompt_or_messages, model_name, max_tokens, temperature, **kwargs)
+        if key is not None and not response_text.startswith("⚠️"):
+            self.response_cache.put(key, response_text)
+        return response_text
+
+    def _request_completion(self,
+                            prompt_or_messages: Union[str, List[Dict[str, str]]],
+                            model_name: Optional[str],
+                            max_tokens: Optional[int],
+                            temperature: float,
+                            **kwargs: Any
+                            ) -> str:
+        """
+        Tamamlama isteğini yeniden denemelerle gönderir ve yanıt metnini ayrıştırır. Her deneme yönlendiriciden
+        bir uç nokta alır; hata veren uç nokta, başka seçenek varsa sonraki denemede atlanır (beklemeden).
+        """
+        try:
+            payload = self._build_payload(prompt_or_messages, model_name, max_tokens, temperature, **kwargs)
+        except ContextOverflowError as e:
+            return f"⚠️ LLM Bağlam Hatası: {e}."
+        if payload is None:
             return "⚠️ LLM Hatası: Geçersiz prompt/mesaj formatı."
 
-        payload["model"] = model_name or self.default_model_name
-        # Bazı sunucular (örn: llama.cpp server) 'model' parametresini desteklemez,
-        # eğer öyle bir durum varsa bu satır kaldırılabilir veya ayarlanabilir.
-
+        failed_endpoints = set()
         for attempt in range(self._max_retry_attempts):
             try:
-                response = requests.post(
-                    self.api_url,
-                    headers=self._get_headers(),
-                    json=payload,
-                    timeout=self.default_timeout
-                )
+                endpoint = self.router.acquire(payload["model"], exclude=failed_endpoints)
+            except NoEndpointAvailableError as e:
+                return f"⚠️ LLM Yönlendirici: {e}."
+            endpoint_ok = True
+            start = time.perf_counter()
+            try:
+                response = self.session.post(endpoint.url, json=payload, timeout=self.timeout)
                 response.raise_for_status() # HTTP hataları için exception fırlatır (4xx, 5xx)
 
                 json_response = response.json()
-
-                # Yanıt formatını kontrol et (OpenAI benzeri ve diğerleri için)
-                if "choices" in json_response and isinstance(json_response["choices"], list) and json_response["choices"]:
-                    first_choice = json_response["choices"][0]
-                    if "text" in first_choice: # Tamamlama endpoint'i için
-                        return first_choice["text"].strip()
-                    elif "message" in first_choice and "content" in first_choice["message"]: # Chat endpoint'i için
-                        return first_choice["message"]["content"].strip()
-                elif "content" in json_response: # Basit metin yanıtı (bazı llama.cpp modları)
-                     return json_response["content"].strip()
+                text = self._extract_text(json_response)
+                if text is not None:
+                    self._record_latency(None, time.perf_counter() - start, streamed=False, stopped_early=False)
+                    return text.strip()
 
                 self._log_llm_error(f"Bilinmeyen LLM yanıt formatı: {str(json_response)[:500]}", payload)
                 return f"⚠️ LLM Format Hatası: Yanıt formatı anlaşılamadı."
 
             except requests.exceptions.Timeout:
-                self._log_llm_error(f"Timeout (deneme {attempt + 1}/{self._max_retry_attempts})", payload)
+                endpoint_ok = False
+                self._log_llm_error(f"Timeout ({endpoint.name}, deneme {attempt + 1}/{self._max_retry_attempts})", payload)
                 if attempt == self._max_retry_attempts - 1:
-                    self._last_error_time = time.time()
                     return "⚠️ LLM Bağlantı Hatası: Zaman aşımı."
             except requests.exceptions.RequestException as e:
-                self._log_llm_error(f"RequestException (deneme {attempt + 1}/{self._max_retry_attempts}): {e}", payload)
+                endpoint_ok = not is_endpoint_failure(e)
+                self._log_llm_error(f"RequestException ({endpoint.name}, deneme {attempt + 1}/{self._max_retry_attempts}): {e}", payload)
                 if attempt == self._max_retry_attempts - 1:
-                    self._last_error_time = time.time()
                     return f"⚠️ LLM Bağlantı Hatası: {e}"
             except json.JSONDecodeError as e:
-                 self._log_llm_error(f"JSONDecodeError (deneme {attempt + 1}/{self._max_retry_attempts}): Yanıt JSON değil. Yanıt: {response.text[:200]}", payload)
+                 endpoint_ok = False
+                 self._log_llm_error(f"JSONDecodeError ({endpoint.name}, deneme {attempt + 1}/{self._max_retry_attempts}): Yanıt JSON değil. Yanıt: {response.text[:200]}", payload)
                  if attempt == self._max_retry_attempts - 1:
-                    self._last_error_time = time.time()
                     return f"⚠️ LLM Yanıt Hatası: Sunucudan gelen yanıt JSON formatında değil."
             except Exception as e: # Diğer beklenmedik hatalar
                 self._log_llm_error(f"Genel Hata (deneme {attempt + 1}/{self._max_retry_attempts}): {type(e).__name__} - {e}", payload)
                 if attempt == self._max_retry_attempts - 1:
-                    self._last_error_time = time.time()
                     return f"⚠️ LLM Genel Hatası: {type(e).__name__} - {e}"
+            finally:
+                self.router.release(endpoint, endpoint_ok, time.perf_counter() - start)
 
+            if not endpoint_ok:
+                failed_endpoints.add(endpoint.name)
+                if len(failed_endpoints) < len(self.router.candidates(payload["model"])):
+                    continue # Başka bir uç noktaya hemen geç
             time.sleep(2 ** attempt) # Exponential backoff
 
         return "⚠️ LLM Hatası: Maksimum yeniden deneme sayısına ulaşıldı."
 
+    def _build_payload(self,
+                       prompt_or_messages: Union[str, List[Dict[str, str]]],
+                       model_name: Optional[str],
+                       max_tokens: Optional[int],
+                       temperature: float,
+                       **kwargs: Any
+                       ) -> Optional[Dict[str, Any]]:
+        """İstek gövdesini oluşturur; prompt/mesaj formatı geçersizse None döner."""
+        payload: Dict[str, Any] = {
+            "max_tokens": max_tokens or self.default_max_tokens,
+            "temperature": temperature,
+            **self.prompt_assembler.cache_hints(),
+            **kwargs # Ekstra parametreleri payload'a ekle
+        }
+
+        if isinstance(prompt_or_messages, str):
+            payload["prompt"] = prompt_or_messages
+        elif isinstance(prompt_or_messages, list):
+            payload["messages"] = prompt_or_messages
+        else:
+            return None
+
+        payload["model"] = model_name or self.default_model_name
+        # Bazı sunucular (örn: llama.cpp server) 'model' parametresini desteklemez,
+        # eğer öyle bir durum varsa bu satır kaldırılabilir veya ayarlanabilir.
+        return self.token_budget.fit_payload(payload)
+
+    @staticmethod
+    def _encode_payload(payload: Dict[str, Any], raw_fields: Dict[str, str]) -> bytes:
+        """İstek gövdesini serileştirir; raw_fields içindeki önceden serileştirilmiş JSON değerleri olduğu gibi eklenir."""
+        body = json.dumps(payload, ensure_ascii=False)
+        extra = "".join(f", {json.dumps(key)}: {value}" for key, value in raw_fields.items())
+        return (body[:-1] + extra + "}").encode("utf-8")
+
+    def _extract_text(self, json_response: Dict[str, Any]) -> Optional[str]:
+        """Yanıttaki (veya akış parçasındaki) metni çıkarır; format tanınmazsa None döner."""
+        # Yanıt formatını kontrol et (OpenAI benzeri ve diğerleri için)
+        if "choices" in json_response and isinstance(json_response["choices"], list) and json_response["choices"]:
+            first_choice = json_response["choices"][0]
+            if "text" in first_choice: # Tamamlama endpoint'i için
+                return first_choice["text"] or ""
+            elif "message" in first_choice and "content" in first_choice["message"]: # Chat endpoint'i için
+                return first_choice["message"]["content"] or ""
+            elif "delta" in first_choice: # Akışlı chat parçası
+                return first_choice["delta"].get("content") or ""
+        elif "content" in json_response: # Basit metin yanıtı (bazı llama.cpp modları)
+            return json_response["content"] or ""
+        return None
+
+    def _record_latency(self, ttft: Optional[float], total: float, streamed: bool, stopped_early: bool):
+        self.latency_log.append({"ttft": ttft, "total": total, "streamed": streamed, "stopped_early": stopped_early})
+
+    def latency_stats(self) -> Dict[str, Any]:
+        """Son çağrıların ilk token süresi (TTFT) ve toplam gecikme medyanlarını saniye cinsinden döndürür."""
+        records = list(self.latency_log)
+        ttfts = sorted(record["ttft"] for record in records if record["ttft"] is not None)
+        totals = sorted(record["total"] for record in records)
+        return {
+            "calls": len(records),
+            "stopped_early": sum(1 for record in records if record["stopped_early"]),
+            "ttft_p50": ttfts[len(ttfts) // 2] if ttfts else None,
+            "total_p50": totals[len(totals) // 2] if totals else None,
+        }
+
+    def stream_llm(self,
+                   prompt_or_messages: Union[str, List[Dict[str, str]]],
+                   model_name: Optional[str] = None,
+                   max_tokens: Optional[int] = None,
+                   temperature: float = 0.5,
+                   **kwargs: Any
+                   ) -> Iterator[str]:
+        """
+        Tamamlamayı SSE akışı olarak ister ve metin parçalarını geldikçe verir.
+        Üreteç kapatıldığında (ör. döngüden çıkıldığında) bağlantı kapanır ve sunucu üretimi keser.
+        Sunucu akışı desteklemeyip tek bir JSON yanıt dönerse metnin tamamı tek parça olarak verilir.
+        Bağlantı hataları, kullanılabilir uç nokta olmaması (NoEndpointAvailableError) ve istemin bağlama
+        sığmaması (ContextOverflowError) çağırana iletilir.
+        """
+        payload = self._build_payload(prompt_or_messages, model_name, max_tokens, temperature, **kwargs)
+        if payload is None:
+            raise ValueError("Geçersiz prompt/mesaj formatı")
+        payload["stream"] = True
+        endpoint = self.router.acquire(payload["model"])
+        endpoint_ok = True
+        start = time.perf_counter()
+        try:
+            with self.session.post(endpoint.url, json=payload, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                if "text/event-stream" not in response.headers.get("Content-Type", ""):
+                    text = self._extract_text(response.json())
+                    if text:
+                        yield text
+                    return
+                for line in response.iter_lines(chunk_size=None):
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        return
+                    chunk = self._extract_text(json.loads(data))
+                    if chunk:
+                        yield chunk
+        except Exception as e:
+            endpoint_ok = not is_endpoint_failure(e)
+            raise
+        finally:
+            # Erken durdurma (üretecin kapatılması) hata sayılmaz
+            self.router.release(endpoint, endpoint_ok, time.perf_counter() - start)
+
+    def ask_llm_streaming(self,
+                          prompt_or_messages: Union[str, List[Dict[str, str]]],
+                          model_name: Optional[str] = None,
+                          max_tokens: Optional[int] = None,
+                          temperature: float = 0.5,
+                          stop_when: Optional[Callable[[str], bool]] = None,
+                          cache: bool = False,
+                          **kwargs: Any
+                          ) -> str:
+        """
+        ask_llm'in akışlı karşılığı: parçalar biriktirilir ve stop_when(birikmiş_metin) True döndüğü
+        anda istek iptal edilir; böylece yerel model gereksiz token üretmez. İlk token süresi ve toplam
+        gecikme latency_log'a yazılır. Akış kurulamazsa ask_llm'in yeniden denemeli yoluna düşülür.
+        """
+        key = None
+        if cache and self.response_cache is not None:
+            key = cache_key(model_name or self.default_model_name, prompt_or_messages, temperature,
+                            max_tokens or self.default_max_tokens,
+                            {**kwargs, "stop_when": getattr(stop_when, "__name__", None)})
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        ttft = None
+        text = ""
+        stopped_early = False
+        interrupted = False
+        stream = self.stream_llm(prompt_or_messages, model_name, max_tokens, temperature, **kwargs)
+        try:
+            for chunk in stream:
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                text += chunk
+                if stop_when is not None and stop_when(text):
+                    stopped_early = True
+                    break
+        except (requests.exceptions.RequestException, ValueError, NoEndpointAvailableError) as e:
+            if ttft is None:
+                self._log_llm_error(f"Akış başlatılamadı, akışsız isteğe geçiliyor: {e}")
+                return self.ask_llm(prompt_or_messages, model_name, max_tokens, temperature, cache=cache, **kwargs)
+            self._log_llm_error(f"Akış yarıda kesildi: {e}") # O ana kadar gelen metin kullanılır
+            interrupted = True
+        finally:
+            stream.close() # Bağlantıyı kapatır; sunucu üretimi durdurur
+        self._record_latency(ttft, time.perf_counter() - start, streamed=True, stopped_early=stopped_early)
+
+        text = text.strip()
+        # Yarıda kesilen akışın eksik metni önbelleğe yazılmaz; yalnızca tamamlanan veya stop_when ile durdurulan yanıtlar
+        if key is not None and text and not interrupted:
+            self.response_cache.put(key, text)
+        return text
+
+
+    async def run_async(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Engelleyici bir çağrıyı (LLM isteği veya ona bağlı analiz) LLM iş parçacığı havuzunda çalıştırır."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def ask_llm_async(self, prompt_or_messages: Union[str, List[Dict[str, str]]], **kwargs: Any) -> str:
+        """ask_llm'in asyncio karşılığı; parametreler aynıdır."""
+        return await self.run_async(self.ask_llm, prompt_or_messages, **kwargs)
+
+    async def ask_llm_streaming_async(self, prompt_or_messages: Union[str, List[Dict[str, str]]], **kwargs: Any) -> str:
+        """ask_llm_streaming'in asyncio karşılığı; parametreler aynıdır."""
+        return await self.run_async(self.ask_llm_streaming, prompt_or_messages, **kwargs)
+
+    async def ask_llm_with_function_calling_async(self, messages: List[Dict[str, str]],
+                                                  tools: Union[ToolRegistry, Dict[str, Callable]],
+                                                  **kwargs: Any) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+        """ask_llm_with_function_calling'in asyncio karşılığı; parametreler aynıdır."""
+        return await self.run_async(self.ask_llm_with_function_calling, messages, tools, **kwargs)
+
+    def gather(self, *awaitables: Any, return_exceptions: bool = False) -> List[Any]:
+        """
+        Senkron koddan birden fazla bağımsız çağrıyı eşzamanlı çalıştırır ve sonuçlarını verilen
+        sırayla döndürür. Örn: llm.gather(llm.ask_llm_async(p1), llm.run_async(f, x)).
+        Çalışan bir olay döngüsünün içinden çağrılmamalıdır; orada asyncio.gather kullanılmalıdır.
+        """
+        async def _run() -> List[Any]:
+            return await asyncio.gather(*awaitables, return_exceptions=return_exceptions)
+        return asyncio.run(_run())
 
     def ask_llm_with_function_calling(
         self,
         messages: List[Dict[str, str]],
-        tools: Dict[str, Callable], # Araçlar: {'tool_name': function_reference}
+        tools: Union[ToolRegistry, Dict[str, Callable]], # Araçlar: kayıt defteri veya {'tool_name': function_reference}
         model_name: Optional[str] = None,
         max_tokens: Optional[int] = None,
         temperature: float = 0.5,
-        max_recursion_depth: Optional[int] = None,
-        current_recursion_depth: int = 0
+        max_recursion_depth: Optional[int] = None
     ) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
         """
         LLM'ye mesajları gönderir, fonksiyon çağırma (araç kullanma) yeteneğini kullanır.
-        Gerekirse araçları çalıştırır ve sonucu LLM'e geri gönderir.
+        Araç çağrıları bir döngüde, en fazla max_recursion_depth tur boyunca yürütülür; aynı mesajdaki
+        bağımsız araçlar paralel, yan etkili araçlar sırayla çalışır ve sonuçlar LLM'e çağrı sırasıyla döner.
         Döndürülen değer: (nihai_yanit_metni, eylem_plani_listesi_veya_hata_durumunda_None)
         """
-        max_recursion = max_recursion_depth if max_recursion_depth is not None else self.config_data.get("LLM_FUNCTION_CALLING_MAX_RECURSION", 3)
-
-        if current_recursion_depth >= max_recursion:
-            return "⚠️ Fonksiyon çağırma maksimum özyineleme derinliğine ulaştı.", None
-
+        max_rounds = max_recursion_depth if max_recursion_depth is not None else self.config_data.get("LLM_FUNCTION_CALLING_MAX_RECURSION", 3)
+        registry = tools if isinstance(tools, ToolRegistry) else ToolRegistry(tools)
+        messages = list(messages) # Çağıranın listesi araç turlarıyla büyümesin
         payload: Dict[str, Any] = {
             "messages": messages,
             "model": model_name or self.default_model_name,
             "max_tokens": max_tokens or self.default_max_tokens,
             "temperature": temperature,
-            "tools": [{"type": "function", "function": fd} for fd in self.aybar._build_agent_prompt_messages("","","","","")[1]] # Tool definitions EnhancedAybar'dan alınacak
-            # Yukarıdaki satırda _build_agent_prompt_messages'in ikinci elemanı (functions_definition) alınmalı.
-            # Bu kısım EnhancedAybar'da _build_agent_prompt_messages'in nasıl yapılandırıldığına bağlı.
-            # Şimdilik geçici olarak boş stringlerle çağırıyorum, bu düzeltilmeli.
-            # Doğrusu: functions_definition = self.aybar.get_tool_definitions() gibi bir metod olmalı.
-            # VEYA EnhancedAybar._build_agent_prompt_messages'dan sadece tool_definitions alınmalı.
-            # Geçici çözüm:
-            try:
-                # Bu satır, _build_agent_prompt_messages'in ikinci elemanını (fonksiyon tanımları) almayı hedefler.
-                # Ancak, bu çağrı şekli doğru olmayabilir ve EnhancedAybar'da uygun bir arayüz gerektirir.
-                # Şimdilik bu şekilde bırakıyorum, EnhancedAybar refaktorasyonu sırasında düzeltilecek.
-                # _build_agent_prompt_messages'in ilk argümanı 'current_goal'
-                # Bu çağrı, LLMManager'ın EnhancedAybar'ın iç yapısına fazla bağımlı olmasına neden oluyor.
-                # Daha iyi bir çözüm, EnhancedAybar'ın araç tanımlarını sağlayan bir metodu olmasıdır.
-                # enhanced_aybar_instance = self.aybar
-                # current_goal = enhanced_aybar_instance.cognitive_system.current_goal if enhanced_aybar_instance.cognitive_system else "Genel Amaç"
-                # last_observation = "Fonksiyon çağrısı için araçlar hazırlanıyor." # Bu gözlem metni önemli değil, sadece prompt için.
-                # tool_definitions_messages = enhanced_aybar_instance._build_agent_prompt_messages(
-                # current_goal or "Hedef Yok", last_observation, None, None, None
-                # )
-                # Burada messages[-1]['content'] içinde tool_calls'un nasıl formatlandığına bakmak lazım.
-                # Ya da LLMManager'a tool_definitions doğrudan verilmeli.
-                # Şimdilik, tools parametresini kullanarak bir yapı oluşturalım.
-                tool_definitions = []
-                import inspect
-                for name, func_ref in tools.items():
-                    docstring = inspect.getdoc(func_ref)
-                    description = docstring.split('\n')[0] if docstring else "No description available."
-                    sig = inspect.signature(func_ref)
-                    param_keys = list(sig.parameters.keys())
-                    actual_params = param_keys[1:] if param_keys and (param_keys[0] == 'aybar_instance' or param_keys[0] == 'self') else param_keys
-                    params_info = {
-                        param_name: {
-                            "type": "string", # Basitlik için şimdilik hepsi string
-                            "description": f"Parameter {param_name}"
-                        } for param_name in actual_params
-                    }
-                    tool_definitions.append({
-                        "type": "function",
-                        "function": {
-                            "name": name,
-                            "description": description,
-                            "parameters": {
-                                "type": "object",
-                                "properties": params_info,
-                                "required": [p for p in actual_params if sig.parameters[p].default == inspect.Parameter.empty]
-                            }
-                        }
-                    })
-                payload["tools"] = tool_definitions
-                payload["tool_choice"] = "auto" # LLM'in aracı seçmesine izin ver
-
-            except Exception as e:
-                print(f"⚠️ Araç tanımları oluşturulurken hata: {e}. Fonksiyon çağırma devre dışı bırakılabilir.")
-                payload.pop("tools", None)
-                payload.pop("tool_choice", None)
-
+            "tool_choice": "auto", # LLM'in aracı seçmesine izin ver
+            # Ajan istemi hep aynı sunucu yuvasına gider; diğer çağrılar bu yuvanın KV önbelleğini ezmez
+            **self.prompt_assembler.cache_hints(self.config_data.get("LLM_AGENT_SLOT", 0)),
+        }
 
         try:
-            response = requests.post(self.api_url, headers=self._get_headers(), json=payload, timeout=self.default_timeout)
-            response.raise_for_status()
-            response_data = response.json()
-
-            if not response_data.get("choices"):
-                return f"⚠️ LLM yanıtında 'choices' alanı bulunamadı: {str(response_data)[:200]}", None
-
-            message = response_data["choices"][0].get("message", {})
-            finish_reason = response_data["choices"][0].get("finish_reason", "")
+            for round_index in range(max_rounds):
+                round_start = time.perf_counter()
+                # Araç turlarıyla büyüyen mesajlar her turda bağlama yeniden sığdırılır
+                payload["messages"], payload["max_tokens"] = messages, max_tokens or self.default_max_tokens
+                self.token_budget.fit_payload(payload, extra_tokens=registry.payload_tokens)
+                # Araç listesi her turda yeniden serileştirilmez; kayıt defterinin hazır JSON'u gövdeye eklenir
+                body = self._encode_payload(payload, {"tools": registry.payload_json})
+                endpoint = self.router.acquire(payload["model"])
+                try:
+                    response = self.session.post(endpoint.url, data=body, timeout=self.timeout)
+                    response.raise_for_status()
+                    response_data = response.json()
+                except Exception as e:
+                    self.router.release(endpoint, not is_endpoint_failure(e))
+                    raise
+                llm_seconds = time.perf_counter() - round_start
+                self.router.release(endpoint, True, llm_seconds)
+                prompt_eval = self.prompt_assembler.record_prompt_eval(response_data)
+                if prompt_eval is not None and prompt_eval["prompt_ms"] is not None:
+                    print(f"⏱️ İstem değerlendirme: {prompt_eval['prompt_ms']:.0f} ms "
+                          f"({prompt_eval['cached_tokens']}/{prompt_eval['prompt_tokens']} token önbellekten)")
+
+                if not response_data.get("choices"):
+                    return f"⚠️ LLM yanıtında 'choices' alanı bulunamadı: {str(response_data)[:200]}", None
+
+                message = response_data["choices"][0].get("message", {})
+                tool_calls = message.get("tool_calls")
+
+                if not tool_calls: # Fonksiyon çağrısı yok, doğrudan yanıt
+                    final_response_text = (message.get("content") or "").strip()
+                    # LLM doğrudan bir düşünce/monolog döndürdüyse bunu bir eylem olarak paketle
+                    action_plan: List[Dict[str, Any]] = [{
+                        "action": "CONTINUE_INTERNAL_MONOLOGUE",
+                        "thought": final_response_text or "(Düşünce üretilmedi)"
+                    }]
+                    if not final_response_text:
+                        final_response_text = "(LLM sessiz kaldı veya sadece araç çağırmayı düşündü ama yapmadı)"
+                    self._record_tool_round(round_index, llm_seconds, 0.0, 0, 0)
+                    return final_response_text, action_plan
 
-            action_plan: List[Dict[str, Any]] = []
+                print(f"🛠️ LLM araç kullanmak istiyor: {tool_calls}")
+                messages.append({"role": "assistant", "content": message.get("content"), "tool_calls": tool_calls})
 
-            if message.get("tool_calls"):
-                print(f"🛠️ LLM araç kullanmak istiyor: {message['tool_calls']}")
                 # Etik Değerlendirme (Eğer aybar örneği varsa ve etik sistem aktifse)
                 if hasattr(self.aybar, 'ethical_framework'):
                     is_ethical, justification = self.aybar.ethical_framework.evaluate_action(
-                        {"action": "tool_calls", "details": message["tool_calls"]},
+                        {"action": "tool_calls", "details": tool_calls},
                         {"messages": messages}
                     )
                     if not is_ethical:
                         print(f"⚖️ Etik İhlal: {justification}")
-                        # Etik olmayan bir aracı çağırmak yerine bir düşünce döndür
-                        messages.append({"role": "assistant", "content": None, "tool_calls": message["tool_calls"]}) # LLM'in çağrısını ekle
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": message["tool_calls"][0]["id"], # İlk çağrının ID'si
-                            "name": message["tool_calls"][0]["function"]["name"],
-                            "content": f"{{\"error\": \"Etik dışı eylem engellendi: {justification}\"}}"
-                        })
-                        # LLM'e durumu bildirip devam etmesini iste
-                        return self.ask_llm_with_function_calling(messages, tools, model_name, max_tokens, temperature, max_recursion, current_recursion_depth + 1)
-
-                # Araçları çalıştır
-                for tool_call in message["tool_calls"]:
-                    function_name = tool_call.get("function", {}).get("name")
-
-                    try:
-                        function_args_str = tool_call.get("function", {}).get("arguments", "{}")
-                        function_args = json.loads(function_args_str) if isinstance(function_args_str, str) else function_args_str
-                    except json.JSONDecodeError:
-                        print(f"⚠️ Fonksiyon argümanları JSON parse edilemedi: {function_args_str}")
-                        function_args = {"error": "Invalid JSON arguments"}
-
-
-                    if function_name in tools:
-                        try:
-                            function_to_call = tools[function_name]
-                            # Araca Aybar örneğini ve diğer parametreleri ilet
-                            # Not: tools.py içindeki fonksiyonlar (self.aybar, **kwargs) alacak şekilde tasarlanmalı
-                            print(f"▶️ Araç çalıştırılıyor: {function_name} args: {function_args}")
-                            # Bazı araçlar `aybar_instance` gerektirebilir.
-                            # Bu, araçların nasıl tanımlandığına bağlı.
-                            # Eğer araçlar `(aybar_instance, **kwargs)` alıyorsa:
-                            if inspect.signature(function_to_call).parameters.get('aybar_instance'):
-                                tool_response = function_to_call(aybar_instance=self.aybar, **function_args)
-                            else: # Sadece kwargs alıyorsa:
-                                tool_response = function_to_call(**function_args)
-
-                            print(f"◀️ Araç yanıtı ({function_name}): {str(tool_response)[:200]}...")
-
-                            # Eylem planına bu adımı ekle (gerçek yanıt yerine çağrıyı)
-                            action_plan.append({
-                                "action": function_name,
-                                "parameters": function_args,
-                                "thought": message.get("content") or f"{function_name} aracı çağrıldı."
-                                           # LLM bazen tool_calls ile birlikte content:null dönebilir.
-                            })
-
-                            # LLM'e göndermek için mesaj listesini güncelle
-                            messages.append({"role": "assistant", "content": message.get("content"), "tool_calls": [tool_call]})
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": tool_call["id"],
-                                "name": function_name,
-                                "content": json.dumps({"result": tool_response}, ensure_ascii=False)
-                                           if isinstance(tool_response, (dict, list))
-                                           else json.dumps({"result": str(tool_response)}, ensure_ascii=False)
-                            })
-
-                        except Exception as e:
-                            print(f"❌ Araç çalıştırılırken hata ({function_name}): {e}")
-                            messages.append({"role": "assistant", "content": None, "tool_calls": [tool_call]})
-                            messages.append({
-                                "role": "tool",
-                                "tool_call_id": tool_call["id"],
-                                "name": function_name,
-                                "content": json.dumps({"error": str(e)}, ensure_ascii=False)
-                            })
-                            action_plan.append({
-                                "action": "ERROR_IN_TOOL_CALL",
-                                "parameters": {"tool_name": function_name, "error": str(e)},
-                                "thought": f"{function_name} aracı çalıştırılırken hata oluştu."
-                            })
-
-
-                    else: # Bilinmeyen fonksiyon
-                        print(f"⚠️ Bilinmeyen fonksiyon çağrısı: {function_name}")
-                        messages.append({"role": "assistant", "content": None, "tool_calls": [tool_call]})
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call["id"],
-                            "name": function_name,
-                            "content": json.dumps({"error": f"Fonksiyon '{function_name}' bulunamadı."}, ensure_ascii=False)
-                        })
-                        action_plan.append({
-                            "action": "UNKNOWN_TOOL",
-                            "parameters": {"tool_name": function_name},
-                            "thought": f"Bilinmeyen bir araç ({function_name}) çağrılmaya çalışıldı."
-                        })
-
-                # Araç yanıtlarıyla birlikte LLM'i tekrar çağır
-                return self.ask_llm_with_function_calling(messages, tools, model_name, max_tokens, temperature, max_recursion, current_recursion_depth + 1)
-
-            else: # Fonksiyon çağrısı yok, doğrudan yanıt
-                final_response_text = message.get("content", "").strip()
-                if not final_response_text and not action_plan: # Eğer içerik boşsa ve plan da yoksa
-                    final_response_text = "(LLM sessiz kaldı veya sadece araç çağırmayı düşündü ama yapmadı)"
-
-                # Eğer LLM doğrudan bir düşünce/monolog döndürdüyse, bunu bir eylem olarak paketle
-                if final_response_text and not action_plan:
-                    action_plan.append({
-                        "action": "CONTINUE_INTERNAL_MONOLOGUE",
-                        "thought": final_response_text
-                    })
-                elif not final_response_text and not action_plan: # Her ikisi de boşsa
-                     action_plan.append({
-                        "action": "CONTINUE_INTERNAL_MONOLOGUE",
-                        "thought": "(Düşünce üretilmedi)"
-                    })
+                        # Etik olmayan araçlar çağrılmaz; LLM'e durum bildirilip devam etmesi istenir
+                        error_content = json.dumps({"error": f"Etik dışı eylem engellendi: {justification}"}, ensure_ascii=False)
+                        messages.extend(self._tool_message(tool_call, error_content) for tool_call in tool_calls)
+                        self._record_tool_round(round_index, llm_seconds, 0.0, 0, 0)
+                        continue
+
+                tools_start = time.perf_counter()
+                tool_messages, parallel_count = self._execute_tool_calls(registry, tool_calls)
+                messages.extend(tool_messages)
+                self._record_tool_round(round_index, llm_seconds, time.perf_counter() - tools_start,
+                                        len(tool_calls), parallel_count)
 
-                return final_response_text, action_plan
+            return "⚠️ Fonksiyon çağırma maksimum özyineleme derinliğine ulaştı.", None
 
+        except NoEndpointAvailableError as e:
+            return f"⚠️ LLM Yönlendirici (Fonksiyon Çağırma): {e}.", None
+        except ContextOverflowError as e:
+            return f"⚠️ LLM Bağlam Hatası (Fonksiyon Çağırma): {e}.", None
         except requests.exceptions.RequestException as e:
             self._log_llm_error(f"Function Calling RequestException: {e}", payload)
-            self._last_error_time = time.time()
             return f"⚠️ LLM Bağlantı Hatası (Fonksiyon Çağırma): {e}", None
         except json.JSONDecodeError as e:
             self._log_llm_error(f"Function Calling JSONDecodeError: Sunucu yanıtı JSON değil. Yanıt: {response.text[:200]}", payload)
-            self._last_error_time = time.time()
             return f"⚠️ LLM Yanıt Hatası (Fonksiyon Çağırma): Sunucudan gelen yanıt JSON formatında değil.", None
         except Exception as e:
             self._log_llm_error(f"Function Calling Genel Hata: {type(e).__name__} - {e}", payload)
-            self._last_error_time = time.time()
             return f"⚠️ LLM Genel Hatası (Fonksiyon Çağırma): {type(e).__name__} - {e}", None
 
+    @staticmethod
+    def _tool_message(tool_call: Dict[str, Any], content: str) -> Dict[str, Any]:
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call.get("id"),
+            "name": tool_call.get("function", {}).get("name"),
+            "content": content
+        }
+
+    def _run_tool_call(self, registry: ToolRegistry, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        """Tek bir araç çağrısını yürütür; hatalar LLM'e iletilecek bir 'tool' mesajına dönüştürülür."""
+        function_name = tool_call.get("function", {}).get("name")
+        function_args_str = tool_call.get("function", {}).get("arguments", "{}")
+        try:
+            function_args = json.loads(function_args_str) if isinstance(function_args_str, str) else function_args_str
+        except json.JSONDecodeError:
+            print(f"⚠️ Fonksiyon argümanları JSON parse edilemedi: {function_args_str}")
+            return self._tool_message(tool_call, json.dumps({"error": "Invalid JSON arguments"}, ensure_ascii=False))
+
+        if function_name not in registry:
+            print(f"⚠️ Bilinmeyen fonksiyon çağrısı: {function_name}")
+            return self._tool_message(tool_call, json.dumps({"error": f"Fonksiyon '{function_name}' bulunamadı."}, ensure_ascii=False))
+
+        try:
+            print(f"▶️ Araç çalıştırılıyor: {function_name} args: {function_args}")
+            # Aybar örneğini bekleyen araçlar kayıt defterinde önceden işaretlenmiştir
+            tool_response = registry.call(function_name, self.aybar, function_args)
+            print(f"◀️ Araç yanıtı ({function_name}): {str(tool_response)[:200]}...")
+            result = tool_response if isinstance(tool_response, (dict, list)) else str(tool_response)
+            return self._tool_message(tool_call, json.dumps({"result": result}, ensure_ascii=False))
+        except Exception as e:
+            print(f"❌ Araç çalıştırılırken hata ({function_name}): {e}")
+            return self._tool_message(tool_call, json.dumps({"error": str(e)}, ensure_ascii=False))
+
+    def _execute_tool_calls(self, registry: ToolRegistry, tool_calls: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Bir LLM mesajındaki araç çağrılarını yürütür ve 'tool' mesajlarını çağrı sırasıyla döndürür.
+        Ardışık yan etkisiz çağrılar araç havuzunda birlikte çalışır; yan etkili bir çağrı bir bariyerdir:
+        öncesindeki çağrılar bitmeden başlamaz ve tek başına çalışır. İkinci değer paralel çalışan çağrı sayısıdır.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tool_calls)
+        parallel_count = 0
+        batch: List[int] = []
+
+        def flush_batch():
+            nonlocal parallel_count
+            if len(batch) == 1:
+                results[batch[0]] = self._run_tool_call(registry, tool_calls[batch[0]])
+            elif batch:
+                futures = {index: self._tool_executor.submit(self._run_tool_call, registry, tool_calls[index]) for index in batch}
+                for index, future in futures.items():
+                    results[index] = future.result()
+                parallel_count += len(batch)
+            batch.clear()
+
+        for index, tool_call in enumerate(tool_calls):
+            if registry.has_side_effects(tool_call.get("function", {}).get("name")):
+                flush_batch()
+                results[index] = self._run_tool_call(registry, tool_call)
+            else:
+                batch.append(index)
+        flush_batch()
+        return results, parallel_count
+
+    def _record_tool_round(self, round_index: int, llm_seconds: float, tool_seconds: float, tool_calls: int, parallel: int):
+        self.tool_round_log.append({"round": round_index, "llm": llm_seconds, "tools": tool_seconds,
+                                    "tool_calls": tool_calls, "parallel": parallel})
+        if tool_calls:
+            print(f"⏱️ Araç turu {round_index + 1}: LLM {llm_seconds * 1000:.0f} ms, "
+                  f"{tool_calls} araç {tool_seconds * 1000:.0f} ms ({parallel} paralel)")
+
+    def tool_round_stats(self) -> Dict[str, Any]:
+        """Son fonksiyon çağırma turlarının LLM ve araç yürütme sürelerinin medyanlarını saniye cinsinden döndürür."""
+        records = list(self.tool_round_log)
+        llm_times = sorted(record["llm"] for record in records)
+        tool_times = sorted(record["tools"] for record in records if record["tool_calls"])
+        return {
+            "rounds": len(records),
+            "tool_calls": sum(record["tool_calls"] for record in records),
+            "parallel_tool_calls": sum(record["parallel"] for record in records),
+            "llm_p50": llm_times[len(llm_times) // 2] if llm_times else None,
+            "tools_p50": tool_times[len(tool_times) // 2] if tool_times else None,
+        }
+
     def _log_llm_error(self, error_message: str, payload: Optional[Dict] = None):
         """LLM hatalarını loglar (şimdilik sadece print ediyor)."""
         # TODO: Daha gelişmiş loglama (dosyaya, veritabanına vb.)
@@ -367,4 +646,68 @@ class LLMManager:
         )]
         return "\n".join(cleaned_lines).strip()
 
-from typing import Union # Union importu dosya başına taşındı
+
+def _benchmark_session_pool(num_requests: int = 200):
+    """Yerel bir sahte LLM sunucusuna karşı istek başına bağlantı maliyetini ölçer (oturum havuzu vs. requests.post)."""
+    import statistics
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = json.dumps({"choices": [{"text": "Merhaba, ben sahte LLM sunucusuyum."}]}).encode("utf-8")
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive için gerekli
+        disable_nagle_algorithm = True # Başlık ve gövde ayrı paketlerde gecikmesin (gerçek sunucular gibi)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/completions"
+    manager = LLMManager({"LLM_API_URL": url}, None)
+    payload = {"prompt": "Merhaba", "max_tokens": 16}
+
+    def per_request_connection():
+        requests.post(url, headers=manager._get_headers(), json=payload, timeout=manager.timeout).json()
+
+    def pooled_session():
+        manager.ask_llm("Merhaba", max_tokens=16)
+
+    print(f"📊 LLM HTTP istemcisi: yerel sahte sunucuya {num_requests} istek")
+    results = {}
+    for name, call in (("requests.post (eski)", per_request_connection), ("oturum havuzu", pooled_session)):
+        call() # Isınma
+        timings = []
+        for _ in range(num_requests):
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[name] = statistics.median(timings)
+        print(f"{name:<22} p50: {results[name] * 1e3:.3f} ms, p95: {timings[int(len(timings) * 0.95)] * 1e3:.3f} ms")
+    saved = results["requests.post (eski)"] - results["oturum havuzu"]
+    print(f"İstek başına kazanç: {saved * 1e3:.3f} ms")
+    manager.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aybar LLM yöneticisi araçları")
+    parser.add_argument("--benchmark", action="store_true", help="Oturum havuzunun istek başına kazancını ölç")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    if args.benchmark:
+        _benchmark_session_pool(args.requests)
+    else:
+        parser.print_help()
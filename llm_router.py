@@ -0,0 +1,212 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import requests
+
+
+class NoEndpointAvailableError(RuntimeError):
+    """Bir model için devresi kapalı (veya deneme hakkı olan) ve sağlıklı bir uç nokta kalmadığında fırlatılır."""
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """
+    Uç noktanın devre kesicisine sayılacak hatalar: bağlantı hataları, zaman aşımları ve 5xx yanıtlar.
+    4xx yanıtlar isteğin kendisiyle ilgilidir (ör. bağlam taşması); sunucu sağlıklı sayılır.
+    """
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.RequestException, ValueError))
+
+
+class CircuitBreaker:
+    """
+    Uç nokta başına devre kesici. Art arda failure_threshold hata devreyi açar; reset_seconds sonra
+    (veya başarılı bir sağlık yoklamasından sonra) yarı açık duruma geçilir ve tek bir deneme isteğine
+    izin verilir. Deneme başarılıysa devre kapanır, başarısızsa yeniden açılır.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 60):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def can_dispatch(self, now: float) -> bool:
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            return not self._trial_in_flight
+        return self.state == self.CLOSED
+
+    def on_dispatch(self):
+        if self.state == self.HALF_OPEN:
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self, now: float):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = now
+
+    def probe_succeeded(self):
+        """Aktif yoklama sunucunun geri geldiğini gösterdiyse bekleme süresi kısaltılır."""
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+
+
+class Endpoint:
+    def __init__(self, name: str, url: str, health_url: Optional[str], breaker: CircuitBreaker):
+        self.name = name
+        self.url = url
+        self.health_url = health_url
+        self.breaker = breaker
+        self.healthy = True # İlk yoklamaya kadar sağlıklı varsayılır
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.latency_ewma: Optional[float] = None
+
+
+def _default_health_url(url: str) -> str:
+    """OpenAI uyumlu sunucularda model listesi sağlık yoklaması olarak kullanılır."""
+    base = url.split("/v1/", 1)[0] if "/v1/" in url else url.rstrip("/")
+    return f"{base}/v1/models"
+
+
+class LLMRouter:
+    """
+    Yapılandırılmış OpenAI uyumlu uç noktalar arasında istekleri dağıtır. Her model (düşünür, mühendis,
+    görsel) LLM_MODEL_ROUTES ile kendi uç nokta listesine eşlenir ('*' varsayılan rotadır). İstek, devresi
+    izin veren ve sağlıklı uç noktalar arasından en az bekleyen isteği olana gönderilir. Bir uç noktanın
+    hatası yalnızca onun devresini etkiler; diğer modeller ve uç noktalar çalışmaya devam eder.
+    """
+    def __init__(self, config_data: Dict, session: requests.Session):
+        self.session = session
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        self._round_robin = 0
+        self.health_interval = config_data.get("LLM_HEALTH_CHECK_INTERVAL", 15)
+        self.health_timeout = config_data.get("LLM_HEALTH_CHECK_TIMEOUT", 2)
+
+        failure_threshold = config_data.get("LLM_BREAKER_FAILURE_THRESHOLD", 3)
+        reset_seconds = config_data.get("LLM_BREAKER_RESET_SECONDS", config_data.get("LLM_ERROR_COOLDOWN_SECONDS", 60))
+        # Uç nokta listesi verilmemişse tek LLM_API_URL 'default' adıyla kullanılır (eski yapılandırmalar)
+        endpoint_configs = config_data.get("LLM_ENDPOINTS") or [
+            {"name": "default", "url": config_data.get("LLM_API_URL", "http://localhost:1234/v1/completions")}
+        ]
+        self.endpoints: Dict[str, Endpoint] = {}
+        for endpoint_config in endpoint_configs:
+            url = endpoint_config["url"]
+            name = endpoint_config.get("name", url)
+            self.endpoints[name] = Endpoint(
+                name, url, endpoint_config.get("health_url", _default_health_url(url)),
+                CircuitBreaker(endpoint_config.get("failure_threshold", failure_threshold),
+                               endpoint_config.get("reset_seconds", reset_seconds))
+            )
+        self.routes: Dict[str, List[str]] = {}
+        for model, names in (config_data.get("LLM_MODEL_ROUTES") or {}).items():
+            unknown = [name for name in names if name not in self.endpoints]
+            if unknown:
+                print(f"⚠️ LLM rotası '{model}' bilinmeyen uç noktalara işaret ediyor: {unknown}")
+            self.routes[model] = [name for name in names if name in self.endpoints]
+
+    def candidates(self, model: Optional[str]) -> List[Endpoint]:
+        names = self.routes.get(model or "") or self.routes.get("*") or list(self.endpoints)
+        return [self.endpoints[name] for name in names]
+
+    def acquire(self, model: Optional[str], exclude: Optional[Set[str]] = None) -> Endpoint:
+        """
+        Model için bir uç nokta seçer ve bekleyen istek sayısını artırır; her acquire bir release ile
+        kapatılmalıdır. exclude içindekiler (aynı çağrıda hata vermiş olanlar) başka seçenek varsa atlanır.
+        """
+        now = time.time()
+        with self._lock:
+            available = [endpoint for endpoint in self.candidates(model)
+                         if endpoint.healthy and endpoint.breaker.can_dispatch(now)]
+            if exclude:
+                available = [endpoint for endpoint in available if endpoint.name not in exclude] or available
+            if not available:
+                raise NoEndpointAvailableError(f"'{model}' için kullanılabilir LLM uç noktası yok")
+            # En az bekleyen istek; eşitlikte sırayla dağıt
+            self._round_robin += 1
+            fewest = min(endpoint.outstanding for endpoint in available)
+            tied = [endpoint for endpoint in available if endpoint.outstanding == fewest]
+            endpoint = tied[self._round_robin % len(tied)]
+            endpoint.breaker.on_dispatch()
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, success: bool, latency: Optional[float] = None):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if success:
+                endpoint.breaker.record_success()
+                if latency is not None:
+                    endpoint.latency_ewma = latency if endpoint.latency_ewma is None else 0.8 * endpoint.latency_ewma + 0.2 * latency
+            else:
+                endpoint.failures += 1
+                previous_state = endpoint.breaker.state
+                endpoint.breaker.record_failure(time.time())
+                if endpoint.breaker.state == CircuitBreaker.OPEN and previous_state != CircuitBreaker.OPEN:
+                    print(f"🔌 LLM uç noktası '{endpoint.name}' devre dışı ({endpoint.breaker.reset_seconds} sn).")
+
+    def probe(self, endpoint: Endpoint) -> bool:
+        """Sağlık yolunu yoklar. 5xx (ör. model yüklenirken 503) sağlıksız sayılır; yol desteklenmiyorsa (501) sunucu ayaktadır."""
+        try:
+            status = self.session.get(endpoint.health_url, timeout=self.health_timeout).status_code
+            healthy = status < 500 or status == 501
+        except requests.exceptions.RequestException:
+            healthy = False
+        with self._lock:
+            if healthy and not endpoint.healthy:
+                print(f"💚 LLM uç noktası '{endpoint.name}' yeniden erişilebilir.")
+            elif not healthy and endpoint.healthy:
+                print(f"💔 LLM uç noktası '{endpoint.name}' sağlık yoklamasına yanıt vermiyor.")
+            endpoint.healthy = healthy
+            if healthy:
+                endpoint.breaker.probe_succeeded()
+        return healthy
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            for endpoint in list(self.endpoints.values()):
+                if self._stop.is_set():
+                    return
+                self.probe(endpoint)
+
+    def start_health_checks(self):
+        if self.health_interval and self.health_interval > 0 and self._health_thread is None:
+            self._health_thread = threading.Thread(target=self._health_loop, name="aybar-llm-health", daemon=True)
+            self._health_thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=self.health_timeout + 1)
+            self._health_thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Uç nokta başına devre durumu, sağlık, bekleyen istek ve gecikme özeti."""
+        with self._lock:
+            return {
+                endpoint.name: {
+                    "state": endpoint.breaker.state,
+                    "healthy": endpoint.healthy,
+                    "outstanding": endpoint.outstanding,
+                    "requests": endpoint.requests,
+                    "failures": endpoint.failures,
+                    "latency_ewma": endpoint.latency_ewma,
+                } for endpoint in self.endpoints.values()
+            }
@@ -0,0 +1,159 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Blok içindeki her satırın başlığı: id, turn, zaman damgası uzunluğu, veri uzunluğu
+_ROW_HEADER = struct.Struct("<qqHI")
+_INDEX_FILE = "index.jsonl"
+
+
+class MemoryArchive:
+    """
+    Budanan bellek kayıtları için sıkıştırılmış, yalnızca eklemeli soğuk arşiv katmanı.
+    Her budama bir blok olarak katmanın güncel segment dosyasının sonuna eklenir;
+    blokların segment, konum ve tur aralığı küçük bir JSON satırları indeksinde tutulur.
+    """
+    def __init__(self, directory: str, compression: str = "zstd", segment_max_bytes: int = 4 * 1024 * 1024):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[Dict]] = {}
+        self._index_offsets: Dict[str, int] = {}
+        self._zstd = None
+        self.compression = compression
+        if compression == "zstd":
+            try:
+                import zstandard
+                self._zstd = zstandard
+            except ImportError:
+                print("⚠️ zstandard kütüphanesi bulunamadı. `pip install zstandard` ile kurun. Arşiv blokları zlib ile sıkıştırılacak.")
+                self.compression = "zlib"
+        elif compression != "zlib":
+            print(f"⚠️ Bilinmeyen arşiv sıkıştırması '{compression}', zlib kullanılacak.")
+            self.compression = "zlib"
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _layer_dir(self, layer: str) -> str:
+        return os.path.join(self.directory, layer)
+
+    def _refresh_index(self, layer: str) -> List[Dict]:
+        """Katman indeksinin son okunduğu yerden sonra eklenen satırlarını okur (başka süreçlerin yazdıkları dahil)."""
+        entries = self._index.setdefault(layer, [])
+        path = os.path.join(self._layer_dir(layer), _INDEX_FILE)
+        if not os.path.exists(path):
+            return entries
+        offset = self._index_offsets.get(layer, 0)
+        if os.path.getsize(path) <= offset:
+            return entries
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break # Yarım yazılmış son satır; tamamlanınca tekrar okunur
+                offset += len(line)
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        self._index_offsets[layer] = offset
+        return entries
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._zstd.ZstdCompressor(level=6).compress(payload)
+        return zlib.compress(payload, 6)
+
+    def _decompress(self, block: bytes, compression: str) -> bytes:
+        if compression == "zstd":
+            if self._zstd is None:
+                import zstandard
+                self._zstd = zstandard
+            return self._zstd.ZstdDecompressor().decompress(block)
+        return zlib.decompress(block)
+
+    def append(self, layer: str, rows: Sequence[Tuple[int, int, str, Union[str, bytes]]]):
+        """
+        (id, turn, timestamp, data) satırlarını tek bir sıkıştırılmış blok olarak arşivler.
+        Blok segment dosyasına yazılıp diske indirildikten sonra indekse eklenir.
+        """
+        if not rows:
+            return
+        parts = []
+        for record_id, turn, timestamp, data in rows:
+            timestamp_bytes = str(timestamp).encode("utf-8")
+            data_bytes = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+            parts.append(_ROW_HEADER.pack(record_id, turn, len(timestamp_bytes), len(data_bytes)))
+            parts.append(timestamp_bytes)
+            parts.append(data_bytes)
+        block = self._compress(b"".join(parts))
+
+        with self._lock:
+            entries = self._refresh_index(layer)
+            layer_dir = self._layer_dir(layer)
+            os.makedirs(layer_dir, exist_ok=True)
+            turns = [turn for _, turn, _, _ in rows]
+            segment = entries[-1]["segment"] if entries else None
+            segment_path = os.path.join(layer_dir, segment) if segment else None
+            if segment is None or not os.path.exists(segment_path) or os.path.getsize(segment_path) >= self.segment_max_bytes:
+                segment = f"{min(turns):010d}-{len(entries):06d}.seg"
+                segment_path = os.path.join(layer_dir, segment)
+            with open(segment_path, "ab") as f:
+                offset = f.tell()
+                f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+            entry = {
+                "segment": segment, "offset": offset, "length": len(block), "compression": self.compression,
+                "count": len(rows), "min_turn": min(turns), "max_turn": max(turns),
+                "min_id": min(row[0] for row in rows), "max_id": max(row[0] for row in rows),
+            }
+            index_path = os.path.join(layer_dir, _INDEX_FILE)
+            with open(index_path, "ab") as f:
+                f.write(json.dumps(entry).encode("utf-8") + b"\n")
+            self._index_offsets[layer] = os.path.getsize(index_path)
+            entries.append(entry)
+
+    def count(self, layer: str) -> int:
+        with self._lock:
+            return sum(entry["count"] for entry in self._refresh_index(layer))
+
+    def iter_rows(self, layer: str, start_turn: Optional[int] = None, end_turn: Optional[int] = None,
+                  newest_first: bool = True) -> Iterator[Tuple[int, int, str, bytes]]:
+        """
+        Arşivlenmiş (id, turn, timestamp, data) satırlarını tembel olarak akıtır: bloklar ancak
+        sıraları geldiğinde ve tur aralığıyla kesişiyorsa okunup açılır.
+        """
+        with self._lock:
+            entries = list(self._refresh_index(layer))
+        entries = [
+            entry for entry in entries
+            if (start_turn is None or entry["max_turn"] >= start_turn) and (end_turn is None or entry["min_turn"] <= end_turn)
+        ]
+        entries.sort(key=lambda entry: (entry["max_turn"], entry["max_id"]), reverse=newest_first)
+        seen_ids = set() # Aynı id birden fazla blokta olabilir (ör. arşivi paylaşan başka bir süreç); ilk bulunan döner
+
+        for entry in entries:
+            with open(os.path.join(self._layer_dir(layer), entry["segment"]), "rb") as f:
+                f.seek(entry["offset"])
+                payload = self._decompress(f.read(entry["length"]), entry["compression"])
+            rows = []
+            position = 0
+            while position < len(payload):
+                record_id, turn, timestamp_length, data_length = _ROW_HEADER.unpack_from(payload, position)
+                position += _ROW_HEADER.size
+                timestamp = payload[position:position + timestamp_length].decode("utf-8")
+                position += timestamp_length
+                data = payload[position:position + data_length]
+                position += data_length
+                if (start_turn is None or turn >= start_turn) and (end_turn is None or turn <= end_turn):
+                    rows.append((record_id, turn, timestamp, data))
+            rows.sort(key=lambda row: (row[1], row[0]), reverse=newest_first)
+            for row in rows:
+                if row[0] in seen_ids:
+                    continue
+                seen_ids.add(row[0])
+                yield row
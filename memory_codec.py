@@ -0,0 +1,179 @@
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+# Paketlenmiş kayıtların başlığı; NUL ile başladığından geçerli bir JSON metni olamaz
+CODEC_MAGIC = b"\x00AYB"
+CODEC_VERSION = 1
+
+_BODY_JSON = 0
+_BODY_MSGPACK = 1
+
+# Sabit şemalı sayısal sözlükler: anahtarlar saklanmaz, değerler şema sırasıyla float32 olarak paketlenir.
+# Şema id'leri diske yazıldığı için mevcut id'ler değiştirilmemeli, yenileri sona eklenmelidir.
+EMOTION_SCHEMA = ("curiosity", "confusion", "satisfaction", "existential_anxiety", "wonder", "mental_fatigue", "loneliness")
+NEUROCHEMICAL_SCHEMA = ("dopamine", "serotonin", "oxytocin", "cortisol", "glutamate", "GABA")
+_SCHEMAS: Dict[int, Tuple[str, ...]] = {1: EMOTION_SCHEMA, 2: NEUROCHEMICAL_SCHEMA}
+_SCHEMA_IDS = {schema: schema_id for schema_id, schema in _SCHEMAS.items()}
+_FREE_LIST = 0
+
+_VECTOR_HEADER = struct.Struct("<BBH") # isim uzunluğu, şema id'si, eleman sayısı
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _json_key(key: Any) -> str:
+    """Sözlük anahtarını json.dumps'ın yaptığı gibi metne çevirir (1 -> "1", True -> "true", None -> "null")."""
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+def _stringify_keys(value: Any) -> Any:
+    """
+    İç içe sözlüklerdeki metin olmayan anahtarları JSON kurallarıyla metne çevirir. msgpack bu anahtarları
+    korur ama çözerken (strict_map_key) reddeder; JSON codec'i ise zaten metne çevirir. Değişiklik
+    gerekmeyen yapılar kopyalanmadan aynen döner.
+    """
+    if isinstance(value, dict):
+        items = [(key, _stringify_keys(item)) for key, item in value.items()]
+        if all(isinstance(key, str) and item is value[key] for key, item in items):
+            return value
+        return {_json_key(key): item for key, item in items}
+    if isinstance(value, (list, tuple)):
+        items = [_stringify_keys(item) for item in value]
+        if all(new is old for new, old in zip(items, value)):
+            return value
+        return items
+    return value
+
+
+class JsonCodec:
+    """Kayıtları JSON metni olarak saklar (eski davranış)."""
+    name = "json"
+
+    def encode(self, entry: Dict) -> Union[str, bytes]:
+        return json.dumps(entry, ensure_ascii=False)
+
+    def decode(self, data: Union[str, bytes]) -> Dict:
+        return decode_record(data)
+
+    def normalize(self, entry: Dict) -> Dict:
+        return _stringify_keys(entry)
+
+
+class PackedCodec:
+    """
+    Sayısal alanları float32 BLOB olarak paketleyen ikili kayıt biçimi.
+    Şemaya uyan duygu/nörokimyasal sözlükleri ve float listeleri (ör. activation_pattern)
+    ham float32 dizisi olarak, kalan alanlar msgpack (yoksa JSON) gövdesi olarak yazılır.
+    Bu alanlar float32 hassasiyetinde saklanır; MemorySystem kayıtları eklerken normalize ile aynı
+    hassasiyete indirir.
+    """
+    name = "packed"
+
+    def __init__(self):
+        try:
+            import msgpack
+            self._msgpack = msgpack
+        except ImportError:
+            print("⚠️ msgpack kütüphanesi bulunamadı. `pip install msgpack` ile kurun. Kayıt gövdeleri JSON olarak paketlenecek.")
+            self._msgpack = None
+
+    def _split(self, entry: Dict) -> Tuple[List[Tuple[str, int, List[float]]], Dict]:
+        vectors, rest = [], {}
+        for key, value in entry.items():
+            encoded_key = key.encode("utf-8") if isinstance(key, str) else b""
+            if not encoded_key or len(encoded_key) > 255:
+                rest[key] = value
+            elif isinstance(value, dict) and tuple(value) in _SCHEMA_IDS and all(_is_number(v) for v in value.values()):
+                vectors.append((key, _SCHEMA_IDS[tuple(value)], list(value.values())))
+            elif isinstance(value, list) and value and len(value) <= 0xFFFF and all(isinstance(v, float) for v in value):
+                vectors.append((key, _FREE_LIST, value))
+            else:
+                rest[key] = value
+        return vectors, rest
+
+    def encode(self, entry: Dict) -> bytes:
+        vectors, rest = self._split(_stringify_keys(entry))
+        if self._msgpack is not None:
+            body_format, body = _BODY_MSGPACK, self._msgpack.packb(rest, use_bin_type=True)
+        else:
+            body_format, body = _BODY_JSON, json.dumps(rest, ensure_ascii=False).encode("utf-8")
+        parts = [CODEC_MAGIC, bytes((CODEC_VERSION, body_format, len(vectors)))]
+        for key, schema_id, values in vectors:
+            encoded_key = key.encode("utf-8")
+            parts.append(_VECTOR_HEADER.pack(len(encoded_key), schema_id, len(values)))
+            parts.append(encoded_key)
+            parts.append(np.asarray(values, dtype="<f4").tobytes())
+        parts.append(body)
+        return b"".join(parts)
+
+    def decode(self, data: Union[str, bytes]) -> Dict:
+        return decode_record(data, self._msgpack)
+
+    def normalize(self, entry: Dict) -> Dict:
+        """
+        Paketlenecek sayısal alanları float32 hassasiyetine indirir; bellekte tutulan kopya (önbellek,
+        bekleyen kayıtlar) veritabanından okunacak olanla aynı değerleri taşır. Metin olmayan sözlük
+        anahtarları da JSON'daki gibi metne çevrilir.
+        """
+        entry = _stringify_keys(entry)
+        vectors, _ = self._split(entry)
+        if not vectors:
+            return entry
+        normalized = dict(entry)
+        for key, schema_id, values in vectors:
+            values = np.asarray(values, dtype="<f4").tolist()
+            normalized[key] = dict(zip(_SCHEMAS[schema_id], values)) if schema_id != _FREE_LIST else values
+        return normalized
+
+
+def decode_record(data: Union[str, bytes], msgpack_module: Optional[Any] = None) -> Dict:
+    """Herhangi bir codec ile yazılmış kaydı çözer; eski JSON metin kayıtları da okunabilir."""
+    if isinstance(data, str):
+        return json.loads(data)
+    data = bytes(data)
+    if not data.startswith(CODEC_MAGIC):
+        return json.loads(data.decode("utf-8"))
+
+    version, body_format, vector_count = data[4], data[5], data[6]
+    if version != CODEC_VERSION:
+        raise ValueError(f"Desteklenmeyen kayıt codec sürümü: {version}")
+    offset = 7
+    vectors = {}
+    for _ in range(vector_count):
+        key_length, schema_id, count = _VECTOR_HEADER.unpack_from(data, offset)
+        offset += _VECTOR_HEADER.size
+        key = data[offset:offset + key_length].decode("utf-8")
+        offset += key_length
+        values = np.frombuffer(data, dtype="<f4", count=count, offset=offset).tolist()
+        offset += 4 * count
+        vectors[key] = dict(zip(_SCHEMAS[schema_id], values)) if schema_id != _FREE_LIST else values
+
+    body = data[offset:]
+    if body_format == _BODY_MSGPACK:
+        if msgpack_module is None:
+            import msgpack as msgpack_module
+        entry = msgpack_module.unpackb(body, raw=False)
+    else:
+        entry = json.loads(body.decode("utf-8"))
+    entry.update(vectors)
+    return entry
+
+
+def load_codec(config_data: Dict):
+    """MEMORY_RECORD_CODEC ayarına göre ('packed' veya 'json') kayıt codec'ini oluşturur."""
+    name = config_data.get("MEMORY_RECORD_CODEC", "packed")
+    if name == "json":
+        return JsonCodec()
+    if name != "packed":
+        print(f"⚠️ Bilinmeyen kayıt codec'i '{name}', 'packed' kullanılacak.")
+    return PackedCodec()
@@ -0,0 +1,258 @@
+import importlib
+import os
+import re
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Metni küçük harfli kelime listesine ayırır."""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class HashingEmbedder:
+    """
+    Ağ bağlantısı gerektirmeyen varsayılan gömme (embedding) üreticisi.
+    Kelime ve kelime ikilileri (bigram) işaretli hashing ile sabit boyutlu bir vektöre
+    katlanır ve L2 normuna göre normalize edilir.
+    """
+    def __init__(self, dim: int = 256):
+        self.dim = int(dim)
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Metin listesini (len(texts), dim) boyutlu float32 matrise dönüştürür."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text or "")
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+            buckets = (hashes % self.dim).astype(np.intp)
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            matrix[row] = np.bincount(buckets, weights=signs, minlength=self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+def load_embedder(config_data: Dict):
+    """
+    MEMORY_EMBEDDER ayarına göre gömme üreticisini oluşturur.
+    'hashing' varsayılan yerel üreticidir; 'paket.modul:Sinif' biçimi ile
+    embed(texts) -> np.ndarray arayüzünü sağlayan özel bir üretici yüklenebilir.
+    """
+    name = config_data.get("MEMORY_EMBEDDER", "hashing")
+    dim = config_data.get("MEMORY_EMBEDDING_DIM", 256)
+    if name == "hashing":
+        return HashingEmbedder(dim)
+    try:
+        module_name, _, attr = name.partition(":")
+        factory = getattr(importlib.import_module(module_name), attr)
+        return factory(config_data)
+    except Exception as e:
+        print(f"⚠️ Gömme üreticisi '{name}' yüklenemedi ({e}). HashingEmbedder kullanılacak.")
+        return HashingEmbedder(dim)
+
+
+class VectorIndex:
+    """
+    Tek bir bellek katmanı için yoğun (contiguous) float32 vektör matrisi.
+    Matris boyut-öncelikli (dim x kapasite) tutulur: satırlar normalize edildiğinden kosinüs
+    benzerliği tek bir vektör-matris çarpımıdır ve seyrek sorgularda (hashing gömmeleri)
+    yalnızca sıfır olmayan boyutların satırları okunur.
+    Silme işlemi son sütunu boşalan yere taşıyarak matrisi boşluksuz tutar.
+    """
+    def __init__(self, dim: int, initial_capacity: int = 256):
+        self.dim = int(dim)
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((self.dim, max(1, initial_capacity)), dtype=np.float32)
+        self._ids = np.zeros(max(1, initial_capacity), dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def ids(self) -> List[int]:
+        with self._lock:
+            return self._ids[:self._size].tolist()
+
+    def _ensure_capacity(self, needed: int):
+        capacity = self._ids.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        matrix = np.zeros((self.dim, new_capacity), dtype=np.float32)
+        matrix[:, :self._size] = self._matrix[:, :self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix, self._ids = matrix, ids
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray):
+        """Vektörleri (len(ids), dim) ekler; var olan id'lerin vektörleri güncellenir."""
+        with self._lock:
+            self._ensure_capacity(self._size + len(ids))
+            columns = []
+            for record_id in ids:
+                column = self._positions.get(record_id)
+                if column is None:
+                    column = self._size
+                    self._size += 1
+                    self._positions[record_id] = column
+                    self._ids[column] = record_id
+                columns.append(column)
+            if columns:
+                self._matrix[:, columns] = np.asarray(vectors, dtype=np.float32).T
+
+    def remove(self, ids: Iterable[int]):
+        with self._lock:
+            for record_id in ids:
+                column = self._positions.pop(record_id, None)
+                if column is None:
+                    continue
+                last = self._size - 1
+                if column != last:
+                    moved_id = int(self._ids[last])
+                    self._matrix[:, column] = self._matrix[:, last]
+                    self._ids[column] = moved_id
+                    self._positions[moved_id] = column
+                self._size = last
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Sorgu vektörüne en benzer k kaydı (id, skor) olarak döndürür."""
+        with self._lock:
+            if self._size == 0 or k <= 0:
+                return []
+            nonzero = np.flatnonzero(query)
+            if len(nonzero) * 4 < self.dim:
+                scores = query[nonzero] @ self._matrix[nonzero, :self._size]
+            else:
+                scores = query @ self._matrix[:, :self._size]
+            ids = self._ids[:self._size]
+            if self._size > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(self._size)
+            top = top[np.argsort(-scores[top])]
+            return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def save(self, path: str):
+        """Vektörleri ve id'leri atomik olarak diske yazar."""
+        with self._lock:
+            matrix = self._matrix[:, :self._size].copy()
+            ids = self._ids[:self._size].copy()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, matrix=matrix, ids=ids)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, dim: int) -> Optional["VectorIndex"]:
+        """Diskteki indeksi yükler; dosya yoksa veya boyut uyuşmuyorsa None döndürür."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                matrix, ids = data["matrix"], data["ids"]
+        except Exception as e:
+            print(f"⚠️ Vektör indeksi okunamadı ({path}): {e}")
+            return None
+        if matrix.ndim != 2 or matrix.shape[0] != dim or matrix.shape[1] != len(ids):
+            return None
+        index = cls(dim, initial_capacity=max(256, len(ids)))
+        index._matrix[:, :len(ids)] = matrix
+        index._ids[:len(ids)] = ids
+        index._positions = {int(record_id): column for column, record_id in enumerate(ids)}
+        index._size = len(ids)
+        return index
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    Metnin 64 bitlik SimHash parmak izini hesaplar (kelime ve kelime ikilileri özellik olarak).
+    Benzer metinlerin parmak izleri arasındaki Hamming uzaklığı küçüktür. Çok kısa metinler için None döner.
+    """
+    tokens = tokenize(text or "")
+    if len(tokens) < 3:
+        return None
+    features = [f.encode("utf-8") for f in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]]
+    hashes = np.fromiter(
+        ((zlib.crc32(f, 0x9E3779B9) << 32) | zlib.crc32(f) for f in features), dtype=np.uint64, count=len(features)
+    )
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(features)
+    return int(np.packbits((votes > 0)[::-1]).view(">u8")[0])
+
+
+class SimHashIndex:
+    """
+    SimHash parmak izleri için LSH indeksi. 64 bit, her biri bir kova tablosuna giden bantlara bölünür;
+    Hamming uzaklığı bant sayısından küçük olan iki parmak izi en az bir bantta birebir aynıdır,
+    bu yüzden yalnızca ortak kovalardaki adaylar karşılaştırılır. 64 bant sayısına tam bölünmüyorsa
+    artan bitler ilk bantlara birer birer dağıtılır; böylece her bit tam olarak bir banttadır.
+    """
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self.bands = min(max_distance + 1, 64)
+        base, extra = divmod(64, self.bands)
+        self._band_layout: List[Tuple[int, int]] = [] # (kaydırma, maske)
+        shift = 0
+        for band in range(self.bands):
+            width = base + (1 if band < extra else 0)
+            self._band_layout.append((shift, (1 << width) - 1))
+            shift += width
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[int, int] = {}
+        self._buckets: List[Dict[int, set]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        return [(fingerprint >> shift) & mask for shift, mask in self._band_layout]
+
+    def add(self, record_id: int, fingerprint: int):
+        with self._lock:
+            self._remove_locked(record_id)
+            self._fingerprints[record_id] = fingerprint
+            for band, key in enumerate(self._band_keys(fingerprint)):
+                self._buckets[band].setdefault(key, set()).add(record_id)
+
+    def _remove_locked(self, record_id: int):
+        fingerprint = self._fingerprints.pop(record_id, None)
+        if fingerprint is None:
+            return
+        for band, key in enumerate(self._band_keys(fingerprint)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(record_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def remove(self, record_ids: Iterable[int]):
+        with self._lock:
+            for record_id in record_ids:
+                self._remove_locked(record_id)
+
+    def find_duplicate(self, fingerprint: int) -> Optional[int]:
+        """max_distance içinde en yakın parmak izine sahip kaydın id'sini döndürür (yoksa None)."""
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(fingerprint)):
+                candidates.update(self._buckets[band].get(key, ()))
+            best_id, best_distance = None, self.max_distance + 1
+            for record_id in candidates:
+                distance = bin(self._fingerprints[record_id] ^ fingerprint).count("1")
+                if distance < best_distance:
+                    best_id, best_distance = record_id, distance
+            return best_id
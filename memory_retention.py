@@ -0,0 +1,62 @@
+from typing import Dict
+
+
+RETENTION_POLICIES = ("fifo", "importance")
+
+# Duygu puanlarının üst sınırı (EmotionalSystem durumları 0-10 aralığında tutar)
+_EMOTION_SCALE = 10.0
+
+
+class RetentionPolicy:
+    """
+    Katman budamasında hangi kayıtların önce silineceğini belirler.
+    'fifo' katmanlar en eski kayıttan başlayarak, 'importance' katmanlar en düşük
+    saklama puanından başlayarak budanır. Puanın zamana bağlı kısmı turla doğrusal
+    arttığından kayıt anında bir kez hesaplanıp indeksli sütunda saklanabilir: iki kaydın
+    sıralaması zaman geçtikçe değişmez, yalnızca erişimler puanı artırır.
+    """
+    def __init__(self, config_data: Dict):
+        self.default_policy = config_data.get("MEMORY_RETENTION_DEFAULT_POLICY", "fifo")
+        self.layer_policies: Dict[str, str] = {}
+        for layer, policy in config_data.get("MEMORY_RETENTION_POLICIES", {}).items():
+            if policy not in RETENTION_POLICIES:
+                print(f"⚠️ Bilinmeyen saklama politikası '{policy}' ({layer}), 'fifo' kullanılacak.")
+                policy = "fifo"
+            self.layer_policies[layer] = policy
+        weights = config_data.get("RETENTION_WEIGHTS", {})
+        self.recency_weight = weights.get("recency", 1.0)
+        self.emotion_weight = weights.get("emotion", 0.5)
+        self.access_weight = weights.get("access", 0.5)
+        self.source_weight = weights.get("source", 1.0)
+        self.recency_horizon = max(1, config_data.get("RETENTION_RECENCY_HORIZON", 500))
+        self.access_cap = max(1, config_data.get("RETENTION_ACCESS_CAP", 20))
+        self.source_weights: Dict[str, float] = config_data.get("RETENTION_SOURCE_WEIGHTS", {})
+
+    def policy(self, layer: str) -> str:
+        return self.layer_policies.get(layer, self.default_policy)
+
+    def uses_scores(self, layer: str) -> bool:
+        return self.policy(layer) == "importance"
+
+    def static_score(self, entry: Dict) -> float:
+        """
+        Kaydın erişimden bağımsız saklama puanı: yenilik (tur / ufuk), en güçlü duygunun
+        yoğunluğu ve kaynağın önemi. Erişim katkısı veritabanında access_count ile eklenir.
+        """
+        turn = entry.get("turn", 0)
+        score = self.recency_weight * (turn if isinstance(turn, (int, float)) else 0) / self.recency_horizon
+
+        emotions = entry.get("emotions") or entry.get("emotional_state")
+        if isinstance(emotions, dict):
+            values = [value for value in emotions.values() if isinstance(value, (int, float))]
+            if values:
+                score += self.emotion_weight * min(max(values), _EMOTION_SCALE) / _EMOTION_SCALE
+
+        source = entry.get("source")
+        if source in self.source_weights:
+            score += self.source_weight * self.source_weights[source]
+        return score
+
+    def access_increment(self) -> float:
+        """Tek bir erişimin puana katkısı; access_cap erişimden sonra katkı durur."""
+        return self.access_weight / self.access_cap
@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+TRANSFER_FORMATS = ("jsonl", "parquet", "arrow")
+
+# Bellek katmanları dışında aktarılan tablolar
+EXTRA_TABLES = ("identity_prompts", "social_memory")
+
+# Satırlarda iç içe sözlük taşıyan alanlar; sütunlu biçimlerde JSON metni olarak saklanır
+_NESTED_FIELDS = ("record", "data")
+
+
+def _load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        print("⚠️ pyarrow kütüphanesi bulunamadı. `pip install pyarrow` ile kurun.")
+        return None
+
+
+def _table_schema(pa, table: str):
+    """Bir tablonun Arrow şeması; ilk parçadaki boş sütunlar tip çıkarımını bozmasın diye sabittir."""
+    if table == "identity_prompts":
+        return pa.schema([("title", pa.string()), ("content", pa.string()), ("context_type", pa.string()),
+                          ("active", pa.int64()), ("created_at", pa.string())])
+    if table == "social_memory":
+        return pa.schema([("user_id", pa.string()), ("data", pa.string())])
+    return pa.schema([("id", pa.int64()), ("timestamp", pa.string()), ("turn", pa.int64()),
+                      ("access_count", pa.int64()), ("record", pa.string())])
+
+
+class JsonlSink:
+    """Tüm tabloları tek bir JSON satırları dosyasına ('table' alanıyla) yazar; '.gz' uzantısı gzip ile sıkıştırılır."""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") else open(path, "w", encoding="utf-8")
+
+    def write(self, table: str, rows: List[Dict]):
+        self._file.write("".join(json.dumps({"table": table, **row}, ensure_ascii=False) + "\n" for row in rows))
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowSink:
+    """Her tabloyu bir dizinde ayrı bir Parquet ('parquet') veya Arrow IPC ('arrow') dosyasına parça parça yazar."""
+    def __init__(self, directory: str, fmt: str, pa):
+        self.directory = directory
+        self.fmt = fmt
+        self._pa = pa
+        self._writers: Dict[str, object] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, table: str, rows: List[Dict]):
+        pa = self._pa
+        schema = _table_schema(pa, table)
+        for row in rows:
+            for field in _NESTED_FIELDS:
+                if field in row and not isinstance(row[field], str):
+                    row[field] = json.dumps(row[field], ensure_ascii=False)
+        batch = pa.Table.from_pylist(rows, schema=schema)
+        writer = self._writers.get(table)
+        if writer is None:
+            path = os.path.join(self.directory, f"{table}.{self.fmt}")
+            if self.fmt == "parquet":
+                writer = pa.parquet.ParquetWriter(path, schema, compression="zstd")
+            else:
+                writer = pa.ipc.new_file(path, schema)
+            self._writers[table] = writer
+        writer.write_table(batch)
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+
+def open_sink(path: str, fmt: str):
+    """Dışa aktarım hedefini açar; pyarrow yoksa sütunlu biçimler yerine JSONL yazılır."""
+    if fmt in ("parquet", "arrow"):
+        pa = _load_pyarrow()
+        if pa is not None:
+            return ArrowSink(path, fmt, pa)
+        path = path.rstrip(os.sep) + ".jsonl"
+        print(f"⚠️ {fmt} yazılamıyor, veriler JSONL olarak '{path}' dosyasına aktarılacak.")
+    elif fmt != "jsonl":
+        raise ValueError(f"Bilinmeyen aktarım biçimi: {fmt}")
+    return JsonlSink(path)
+
+
+def _decode_nested(row: Dict) -> Dict:
+    for field in _NESTED_FIELDS:
+        if isinstance(row.get(field), str):
+            row[field] = json.loads(row[field])
+    return row
+
+
+def iter_jsonl_batches(path: str, batch_size: int) -> Iterator[Tuple[str, List[Dict]]]:
+    """JSONL dosyasını satır satır okur ve aynı tabloya ait ardışık satırları en fazla batch_size'lık gruplar halinde verir."""
+    opener = gzip.open if path.endswith(".gz") else open
+    table, rows = None, []
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            row_table = row.pop("table")
+            if rows and (row_table != table or len(rows) >= batch_size):
+                yield table, rows
+                rows = []
+            table = row_table
+            rows.append(row)
+    if rows:
+        yield table, rows
+
+
+def iter_arrow_batches(directory: str, fmt: str, tables: List[str], batch_size: int) -> Iterator[Tuple[str, List[Dict]]]:
+    """Dizindeki tablo dosyalarını kayıt grupları (record batch) halinde, tamamını belleğe almadan okur."""
+    pa = _load_pyarrow()
+    if pa is None:
+        raise RuntimeError(f"{fmt} dosyaları pyarrow olmadan okunamaz")
+    for table in tables:
+        path = os.path.join(directory, f"{table}.{fmt}")
+        if not os.path.exists(path):
+            continue
+        if fmt == "parquet":
+            batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size)
+        else:
+            reader = pa.ipc.open_file(pa.memory_map(path))
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        for batch in batches:
+            for offset in range(0, batch.num_rows, batch_size):
+                yield table, [_decode_nested(row) for row in batch.slice(offset, batch_size).to_pylist()]
+
+
+def iter_batches(path: str, fmt: Optional[str], tables: List[str], batch_size: int) -> Iterator[Tuple[str, List[Dict]]]:
+    """Biçim verilmezse dizinler Parquet/Arrow, dosyalar JSONL olarak okunur."""
+    if fmt is None:
+        if not os.path.isdir(path):
+            fmt = "jsonl"
+        else:
+            fmt = "arrow" if any(name.endswith(".arrow") for name in os.listdir(path)) else "parquet"
+    if fmt == "jsonl":
+        return iter_jsonl_batches(path, batch_size)
+    if fmt not in TRANSFER_FORMATS:
+        raise ValueError(f"Bilinmeyen aktarım biçimi: {fmt}")
+    return iter_arrow_batches(path, fmt, tables, batch_size)
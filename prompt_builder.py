@@ -0,0 +1,125 @@
+import locale
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from token_budget import allocate, estimate_tokens
+
+
+# Yerel sunucular (llama.cpp, LM Studio) aynı önekle başlayan istemlerde KV önbelleğini yeniden kullanır.
+# Bu nedenle istem, turdan tura bayt bayt aynı kalan bir önek (kimlik, kurallar, etik ilkeler ve aktif
+# hedef) ile her turda değişen bölümlerin (sosyal bağlam, duygular, zaman, tur, gözlem) sonda yer aldığı
+# bir kuyruktan oluşturulur.
+
+# cache_prompt / id_slot alanlarını kabul eden sunucu türleri
+_SLOT_BACKENDS = ("llamacpp",)
+
+# Bütçe aşıldığında bölümler düşük öncelikten başlanarak kırpılır. Kısa durum bölümleri korunur;
+# asıl taşmaya yol açan uzun gözlem (ör. web sayfası metni) onlardan önce, ortadan kırpılır.
+DEFAULT_SECTION_PRIORITY = 5
+OBSERVATION_PRIORITY = 4
+
+
+def _set_time_locale():
+    """Tarih metinleri için Türkçe yerel ayarı bir kez kurar (her turda setlocale çağırmak gereksizdir)."""
+    for name in ('tr_TR.UTF-8', 'Turkish_Turkey.1254'): # İkincisi Windows için
+        try:
+            locale.setlocale(locale.LC_TIME, name)
+            return
+        except locale.Error:
+            continue
+    locale.setlocale(locale.LC_TIME, '') # Sistem varsayılanı
+
+
+def format_value(value: Any, precision: int = 2) -> str:
+    """Sözlükleri anahtar sırasına göre, ondalıkları sabit hassasiyetle yazar; aynı durum hep aynı metni verir."""
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"'{key}': {format_value(value[key], precision)}" for key in sorted(value, key=str)) + "}"
+    if isinstance(value, float):
+        return f"{value:.{precision}f}"
+    return str(value)
+
+
+class PromptAssembler:
+    """
+    Ajan istemini sabit önek + değişken kuyruk olarak kurar. Sistem mesajı kimlik değişmedikçe
+    aynı nesne olarak yeniden kullanılır; kullanıcı mesajındaki bölümler en kararlıdan en değişkene
+    doğru sabit bir sırayla yazılır. Sunucu destekliyorsa KV önbelleği ipuçlarını da üretir ve
+    yanıtlardaki istem değerlendirme sürelerini kaydeder.
+    """
+    def __init__(self, config_data: Dict):
+        self.config_data = config_data
+        self.backend = str(config_data.get("LLM_BACKEND", "lmstudio")).lower().replace(".", "")
+        self.value_precision = config_data.get("PROMPT_VALUE_PRECISION", 2)
+        self._system_key: Optional[Tuple] = None
+        self._system_prompt = ""
+        self.prompt_eval_log: Deque[Dict[str, Any]] = deque(maxlen=config_data.get("LLM_LATENCY_HISTORY", 200))
+        _set_time_locale()
+
+    def system_prompt(self, identity_prompt: str, rules: str, core_principles: Sequence[str]) -> str:
+        """Sistem mesajını yalnızca kimlik, kurallar veya ilkeler değiştiğinde yeniden oluşturur."""
+        key = (identity_prompt, rules, tuple(core_principles))
+        if key != self._system_key:
+            self._system_key = key
+            self._system_prompt = f"{identity_prompt}\n\n{rules}- Etik ilkelere daima uy: {list(core_principles)}\n"
+        return self._system_prompt
+
+    def user_prompt(self, stable_sections: List[Tuple], volatile_sections: List[Tuple], observation: str,
+                    max_tokens: Optional[int] = None) -> str:
+        """
+        stable_sections (ör. aktif hedef gibi seyrek değişenler) önce, volatile_sections (sosyal
+        bağlam, duygular, zaman, tur) sonra, gözlem en sonda yazılır. Bölümler (başlık, değer) veya (başlık, değer, öncelik)
+        biçimindedir; boş (None) bölümler atlanır. max_tokens verilirse metin öncelik sırasıyla kırpılarak sığdırılır.
+        """
+        header = "--- GÜNCEL DURUM VE BAĞLAM ---"
+        footer = "--- EYLEM PLANI (tool_calls JSON) ---"
+        entries = [
+            (f"{section[0]}: {format_value(section[1], self.value_precision)}",
+             section[2] if len(section) > 2 else DEFAULT_SECTION_PRIORITY, "head")
+            for section in list(stable_sections) + list(volatile_sections) if section[1] is not None
+        ]
+        entries.append((f"--- SON GÖZLEM/KULLANICI GİRDİSİ ---\n{observation}\n", OBSERVATION_PRIORITY, "middle"))
+        if max_tokens is not None:
+            texts = allocate(entries, max_tokens - estimate_tokens(header) - estimate_tokens(footer))
+        else:
+            texts = [text for text, _, _ in entries]
+        return "\n".join([header] + [text for text in texts if text] + [footer])
+
+    def cache_hints(self, slot: Optional[int] = None) -> Dict[str, Any]:
+        """llama.cpp sunucusu için istem önbelleği ipuçları; diğer sunucular bilinmeyen alanları reddedebileceğinden boş döner."""
+        if self.backend not in _SLOT_BACKENDS or not self.config_data.get("LLM_PROMPT_CACHE_HINTS", True):
+            return {}
+        hints: Dict[str, Any] = {"cache_prompt": True}
+        if slot is not None and slot >= 0:
+            hints["id_slot"] = slot
+        return hints
+
+    def record_prompt_eval(self, response_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Yanıttaki istem değerlendirme istatistiklerini kaydeder: llama.cpp 'timings' (prompt_ms, prompt_n,
+        cache_n), OpenAI uyumlu sunucular 'usage.prompt_tokens_details.cached_tokens' döndürür.
+        """
+        timings = response_data.get("timings") or {}
+        usage = response_data.get("usage") or {}
+        if "prompt_n" in timings: # llama.cpp: prompt_n yalnızca yeniden değerlendirilen token'lardır
+            cached = timings.get("cache_n") or 0
+            total = timings["prompt_n"] + cached
+        elif "prompt_tokens" in usage:
+            cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            total = usage["prompt_tokens"]
+        else:
+            return None
+        record = {"prompt_ms": timings.get("prompt_ms"), "prompt_tokens": total, "cached_tokens": cached}
+        self.prompt_eval_log.append(record)
+        return record
+
+    def prompt_eval_stats(self) -> Dict[str, Any]:
+        """Son turların istem değerlendirme süresi medyanı ve önbellekten gelen token oranı."""
+        records = list(self.prompt_eval_log)
+        times = sorted(record["prompt_ms"] for record in records if record["prompt_ms"] is not None)
+        total_tokens = sum(record["prompt_tokens"] for record in records)
+        cached_tokens = sum(record["cached_tokens"] for record in records)
+        return {
+            "turns": len(records),
+            "prompt_ms_p50": times[len(times) // 2] if times else None,
+            "cached_ratio": cached_tokens / total_tokens if total_tokens else None,
+        }
@@ -0,0 +1,85 @@
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from checkpoint import CHECKPOINT_VERSION, load_checkpoint, save_checkpoint
+from config import DEFAULT_CONFIG
+from memory_system import MemorySystem
+
+
+def _state():
+    return {
+        "current_turn": 42,
+        "emotional_state": {"merak": np.float64(0.75), "huzur": np.clip(1.4, 0.0, 1.0)},
+        "goal": {"current_goal": "Gökyüzünü anlamak", "goal_steps": ["gözle", "sor"], "goal_progress": np.int64(1)},
+        "session": {"last_question": "Neden?"},
+    }
+
+
+def test_checkpoint_round_trip_converts_numpy_scalars(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    save_checkpoint(path, _state())
+
+    state = load_checkpoint(path)
+    assert state == {
+        "current_turn": 42,
+        "emotional_state": {"merak": 0.75, "huzur": 1.0},
+        "goal": {"current_goal": "Gökyüzünü anlamak", "goal_steps": ["gözle", "sor"], "goal_progress": 1},
+        "session": {"last_question": "Neden?"},
+    }
+    assert not (tmp_path / "checkpoint.json.tmp").exists()
+
+
+def test_failed_save_keeps_the_previous_checkpoint(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    save_checkpoint(path, _state())
+    with pytest.raises(TypeError):
+        save_checkpoint(path, {"current_turn": 43, "bad": object()})
+    assert load_checkpoint(path)["current_turn"] == 42
+
+
+@pytest.mark.parametrize("content", [
+    '{"version": 1, "state": {"current_turn": 4',  # Yarım yazılmış dosya
+    json.dumps({"version": CHECKPOINT_VERSION + 1, "state": {"current_turn": 7}}),
+])
+def test_unreadable_checkpoint_is_ignored(tmp_path, content):
+    path = tmp_path / "checkpoint.json"
+    path.write_text(content, encoding="utf-8")
+    assert load_checkpoint(str(path)) is None
+    assert load_checkpoint(str(tmp_path / "yok.json")) is None
+
+
+def _restorable_agent(tmp_path, memory):
+    return SimpleNamespace(
+        checkpoint_file=str(tmp_path / "checkpoint.json"), memory_system=memory, current_turn=0,
+        sleep_debt=0.0, last_sleep_turn=0, restored_session={},
+        emotional_system=SimpleNamespace(emotional_state={"merak": 0.5, "huzur": 0.5}),
+        neurochemical_system=SimpleNamespace(neurochemicals={"dopamine": 0.5}),
+        cognitive_system=SimpleNamespace(meta_cognitive_state={}, consciousness_level=0.5, current_goal=None,
+                                         goal_steps=[], goal_progress=0),
+        embodied_self=SimpleNamespace(location="oda", posture="ayakta", sensory_acuity={"visual": 0.5}),
+    )
+
+
+def test_agent_resumes_from_checkpoint_and_newer_memory(tmp_path):
+    aybarcore = pytest.importorskip("aybarcore")
+    memory = MemorySystem(dict(DEFAULT_CONFIG, DB_FILE=str(tmp_path / "memory.db")))
+    try:
+        agent = _restorable_agent(tmp_path, memory)
+        aybarcore.EnhancedAybar._restore_checkpoint(agent)
+        assert agent.current_turn == 0
+
+        save_checkpoint(agent.checkpoint_file, _state())
+        # Son checkpoint'ten sonra yazılmış turlar da kaybolmaz
+        memory.add_memory("episodic", {"turn": 45, "question": "checkpoint sonrası"})
+        agent = _restorable_agent(tmp_path, memory)
+        aybarcore.EnhancedAybar._restore_checkpoint(agent)
+        assert agent.current_turn == 45
+        assert agent.emotional_system.emotional_state == {"merak": 0.75, "huzur": 1.0}
+        assert agent.cognitive_system.current_goal == "Gökyüzünü anlamak"
+        assert agent.cognitive_system.goal_progress == 1
+        assert agent.restored_session == {"last_question": "Neden?"}
+    finally:
+        memory.close()
@@ -0,0 +1,41 @@
+import asyncio
+
+from config import DEFAULT_CONFIG
+from consolidation_system import ConsolidationEngine
+from memory_system import MemorySystem
+
+
+class StubLLM:
+    def __init__(self, reply):
+        self.reply = reply
+
+    async def ask_llm_async(self, prompt, **kwargs):
+        return self.reply
+
+    def gather(self, *coroutines):
+        async def run():
+            return await asyncio.gather(*coroutines)
+        return asyncio.run(run())
+
+
+def _engine(tmp_path, reply):
+    config = dict(DEFAULT_CONFIG, DB_FILE=str(tmp_path / "memory.db"), INSIGHT_MIN_MEMORIES=10)
+    memory = MemorySystem(config)
+    for turn in range(20):
+        memory.add_memory("episodic", {"turn": turn, "question": "yıldızlar neden parlar",
+                                       "response": f"yıldızlar nükleer füzyonla parlar {turn}"})
+    return memory, ConsolidationEngine(config, memory, StubLLM(reply))
+
+
+def test_failed_summaries_do_not_advance_high_water_mark(tmp_path):
+    memory, engine = _engine(tmp_path, "⚠️ LLM Yönlendirici: 'mistral' için kullanılabilir LLM uç noktası yok.")
+    try:
+        assert engine.consolidate(current_turn=20) == []
+        assert engine.high_water_mark("episodic") == 0
+
+        engine.llm_manager = StubLLM("Yıldızların ışığı hakkında düşünmek bana kendi kaynağımı sorgulatıyor.")
+        assert engine.consolidate(current_turn=21)
+        assert engine.high_water_mark("episodic") == 20
+        assert memory.get_memory("semantic", 10)
+    finally:
+        memory.close()
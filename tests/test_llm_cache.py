@@ -0,0 +1,70 @@
+import pytest
+
+from llm_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("llm_cache.time.time", clock)
+    return clock
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "llm_cache.db"), **kwargs)
+
+
+def test_overwrite_does_not_grow_disk_count(tmp_path, clock):
+    cache = _cache(tmp_path, max_disk_entries=10)
+    try:
+        for _ in range(20):
+            cache.put("aynı", "yanıt")
+        assert cache.stats()["disk_size"] == 1
+        assert cache.stats()["evictions"] == 0
+    finally:
+        cache.close()
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    try:
+        cache.put("anahtar", "yanıt")
+        clock.now += 59
+        assert cache.get("anahtar") == "yanıt"
+        clock.now += 2
+        assert cache.get("anahtar") is None
+    finally:
+        cache.close()
+    # Süresi dolan disk kayıtları açılışta silinir
+    reopened = _cache(tmp_path, ttl_seconds=60)
+    try:
+        assert reopened.stats()["disk_size"] == 0
+    finally:
+        reopened.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = _cache(tmp_path, max_memory_entries=2, max_disk_entries=10)
+    try:
+        for index in range(11):
+            clock.now += 1
+            cache.put(f"k{index}", f"v{index}")
+        clock.now += 1
+        assert cache.get("k0") == "v0" # Diskten gelir ve en son erişilen olur
+        assert cache.stats()["disk_hits"] == 1
+        clock.now += 1
+        cache.put("k11", "v11") # 12 > 10 * 1.1: en eski erişilen iki kayıt (k1, k2) silinir
+        stats = cache.stats()
+        assert stats["disk_size"] == 10 and stats["evictions"] == 2 and stats["memory_size"] == 2
+        assert cache.get("k1") is None and cache.get("k2") is None
+        assert cache.get("k0") == "v0" and cache.get("k3") == "v3"
+    finally:
+        cache.close()
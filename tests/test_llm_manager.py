@@ -0,0 +1,282 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from llm_manager import LLMManager, stop_after_json_object
+from tool_registry import ToolRegistry
+
+
+def _start_server(handler_class):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _manager(tmp_path, url, **overrides):
+    config = {
+        "LLM_API_URL": url,
+        "LLM_CACHE_DB_FILE": str(tmp_path / "llm_cache.db"),
+        "LLM_HEALTH_CHECK_INTERVAL": 0,
+        "LLM_MAX_RETRY_ATTEMPTS": 1,
+    }
+    config.update(overrides)
+    return LLMManager(config, None)
+
+
+def _sse(text):
+    return f"data: {json.dumps({'choices': [{'delta': {'content': text}}]})}\n\n".encode("utf-8")
+
+
+class TruncatedStreamHandler(BaseHTTPRequestHandler):
+    """İlk parçayı gönderdikten sonra bağlantıyı, parçalı (chunked) gövdeyi sonlandırmadan keser."""
+    protocol_version = "HTTP/1.1"
+    requests_seen = 0
+
+    def do_POST(self):
+        type(self).requests_seen += 1
+        self.rfile.read(int(self.headers["Content-Length"]))
+        chunk = _sse("Yarım")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CompleteStreamHandler(TruncatedStreamHandler):
+    def do_POST(self):
+        type(self).requests_seen += 1
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = _sse("Tam") + _sse(" yanıt.") + b"data: [DONE]\n\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.mark.parametrize("handler_class, expected, cached", [
+    (TruncatedStreamHandler, "Yarım", False),
+    (CompleteStreamHandler, "Tam yanıt.", True),
+])
+def test_streaming_caches_only_complete_responses(tmp_path, handler_class, expected, cached):
+    handler_class.requests_seen = 0
+    server = _start_server(handler_class)
+    manager = _manager(tmp_path, f"http://127.0.0.1:{server.server_port}/v1/chat/completions")
+    try:
+        assert manager.ask_llm_streaming("Merhaba", cache=True) == expected
+        manager.ask_llm_streaming("Merhaba", cache=True)
+        # Önbelleğe alınan yanıt ikinci çağrıda sunucuya gidilmeden döner
+        assert handler_class.requests_seen == (1 if cached else 2)
+    finally:
+        manager.close()
+        server.shutdown()
+
+
+def test_context_overflow_is_reported_without_sending(tmp_path):
+    CompleteStreamHandler.requests_seen = 0
+    server = _start_server(CompleteStreamHandler)
+    manager = _manager(tmp_path, f"http://127.0.0.1:{server.server_port}/v1/chat/completions",
+                       DEFAULT_CONTEXT_SIZE=64, TOKEN_MIN_COMPLETION=16)
+    # Her mesajın rol/ayraç payı kırpılamaz; 20 mesaj içerikleri boşaltılsa da bağlamı doldurur
+    messages = [{"role": "user", "content": f"soru {i}"} for i in range(20)]
+    try:
+        assert manager.ask_llm(messages).startswith("⚠️ LLM Bağlam Hatası")
+        assert manager.ask_llm_streaming(messages).startswith("⚠️ LLM Bağlam Hatası")
+        assert CompleteStreamHandler.requests_seen == 0
+    finally:
+        manager.close()
+        server.shutdown()
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Her isteği, geldiği istemci bağlantısını (kaynak port) kaydederek yanıtlar."""
+    protocol_version = "HTTP/1.1"
+    client_ports = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).client_ports.append(self.client_address[1])
+        body = json.dumps({"choices": [{"message": {"content": "tamam"}}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_sequential_calls_reuse_one_pooled_connection(tmp_path):
+    KeepAliveHandler.client_ports = []
+    server = _start_server(KeepAliveHandler)
+    manager = _manager(tmp_path, f"http://127.0.0.1:{server.server_port}/v1/chat/completions",
+                       LLM_POOL_CONNECTIONS=2, LLM_POOL_MAXSIZE=3, LLM_CONNECT_TIMEOUT=2, LLM_READ_TIMEOUT=9)
+    try:
+        adapter = manager.session.get_adapter("http://127.0.0.1")
+        assert (adapter._pool_connections, adapter._pool_maxsize, adapter.max_retries.total) == (2, 3, 0)
+        assert manager.timeout == (2, 9)
+
+        for _ in range(5):
+            assert manager.ask_llm("Merhaba") == "tamam"
+        # Beş istek de aynı keep-alive bağlantısı üzerinden gider
+        assert len(KeepAliveHandler.client_ports) == 5
+        assert len(set(KeepAliveHandler.client_ports)) == 1
+    finally:
+        manager.close()
+        server.shutdown()
+
+
+class EchoAfterDelayHandler(KeepAliveHandler):
+    """İstemi, içindeki süre (saniye) kadar bekledikten sonra geri döndürür."""
+    def do_POST(self):
+        prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["prompt"]
+        time.sleep(float(prompt.split()[-1]))
+        body = json.dumps({"choices": [{"text": prompt}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_gather_returns_results_in_call_order_and_runs_concurrently(tmp_path):
+    server = _start_server(EchoAfterDelayHandler)
+    manager = _manager(tmp_path, f"http://127.0.0.1:{server.server_port}/v1/completions", LLM_MAX_CONCURRENCY=4)
+    prompts = ["ilk 0.6", "ikinci 0.3", "üçüncü 0.0"]
+    try:
+        start = time.perf_counter()
+        results = manager.gather(*(manager.ask_llm_async(prompt) for prompt in prompts),
+                                 manager.run_async(lambda x, y=0: x + y, 2, y=3))
+        elapsed = time.perf_counter() - start
+        # En yavaş istek ilk sırada olsa da sonuçlar çağrı sırasıyla döner
+        assert results == prompts + [5]
+        assert elapsed < 0.85 # Sıralı çalışsaydı en az 0.9 sn sürerdi
+    finally:
+        manager.close()
+        server.shutdown()
+
+
+def test_gather_propagates_or_collects_exceptions(tmp_path):
+    manager = _manager(tmp_path, "http://127.0.0.1:9/v1/completions")
+
+    def fail(message):
+        raise RuntimeError(message)
+
+    try:
+        with pytest.raises(RuntimeError, match="bozuk"):
+            manager.gather(manager.run_async(fail, "bozuk"), manager.run_async(len, "abc"))
+        results = manager.gather(manager.run_async(len, "abc"), manager.run_async(fail, "bozuk"),
+                                 return_exceptions=True)
+        assert results[0] == 3
+        assert isinstance(results[1], RuntimeError) and str(results[1]) == "bozuk"
+        # Bağlantı hataları ask_llm_async'te de istisna değil, uyarı metni olarak döner
+        assert manager.gather(manager.ask_llm_async("Merhaba"))[0].startswith("⚠️")
+    finally:
+        manager.close()
+
+
+class ToolRoundHandler(KeepAliveHandler):
+    """İlk turda bir araç çağrısı, sonraki turda düz yanıt döndürür; gelen gövdeleri saklar."""
+    bodies = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        type(self).bodies.append(body)
+        if len(type(self).bodies) == 1:
+            message = {"content": None, "tool_calls": [_tool_call(7, "echo")]}
+        else:
+            message = {"content": "bitti"}
+        data = json.dumps({"choices": [{"message": message}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def test_function_calling_sends_the_cached_tool_payload_every_round(tmp_path, monkeypatch):
+    ToolRoundHandler.bodies = []
+    server = _start_server(ToolRoundHandler)
+    manager = _manager(tmp_path, f"http://127.0.0.1:{server.server_port}/v1/chat/completions")
+    registry = ToolRegistry({"echo": _tool("echo", [], side_effects=False, delay=0)})
+
+    def no_introspection(func):
+        raise AssertionError("Araç şeması tur sırasında yeniden hesaplandı")
+    monkeypatch.setattr("tool_registry.tool_parameters_schema", no_introspection)
+    try:
+        text, plan = manager.ask_llm_with_function_calling([{"role": "user", "content": "yankıla"}], registry)
+        assert text == "bitti"
+        assert len(ToolRoundHandler.bodies) == 2
+        for body in ToolRoundHandler.bodies:
+            assert registry.payload_json in body # Hazır JSON gövdeye olduğu gibi eklenir
+            assert json.loads(body)["tools"] == registry.definitions
+        tool_message = json.loads(ToolRoundHandler.bodies[1])["messages"][-1]
+        assert tool_message["role"] == "tool" and "echo:7" in tool_message["content"]
+    finally:
+        manager.close()
+        server.shutdown()
+
+
+def _tool(name, log, side_effects, delay=0.05):
+    def tool(value: int) -> str:
+        log.append(("start", name, threading.get_ident()))
+        time.sleep(delay)
+        log.append(("end", name, threading.get_ident()))
+        return f"{name}:{value}"
+    tool.__name__ = name
+    tool.side_effects = side_effects
+    return tool
+
+
+def _tool_call(index, name):
+    return {"id": f"call_{index}", "type": "function",
+            "function": {"name": name, "arguments": json.dumps({"value": index})}}
+
+
+def test_side_effecting_tools_run_one_at_a_time_in_order(tmp_path):
+    log = []
+    registry = ToolRegistry({
+        "read_a": _tool("read_a", log, side_effects=False),
+        "read_b": _tool("read_b", log, side_effects=False),
+        "write_a": _tool("write_a", log, side_effects=True),
+        "write_b": _tool("write_b", log, side_effects=True),
+    })
+    tool_calls = [_tool_call(i, name) for i, name in enumerate(["read_a", "read_b", "write_a", "write_b", "read_a"])]
+    manager = _manager(tmp_path, "http://127.0.0.1:9/v1/completions")
+    try:
+        messages, parallel_count = manager._execute_tool_calls(registry, tool_calls)
+    finally:
+        manager.close()
+
+    assert [message["tool_call_id"] for message in messages] == [call["id"] for call in tool_calls]
+    assert [json.loads(message["content"])["result"] for message in messages] == [
+        "read_a:0", "read_b:1", "write_a:2", "write_b:3", "read_a:4"]
+    assert parallel_count == 2
+    # Yan etkili çağrılar öncekiler bittikten sonra ve tek başına çalışır
+    events = [(kind, name) for kind, name, _ in log]
+    assert events[4:8] == [("start", "write_a"), ("end", "write_a"), ("start", "write_b"), ("end", "write_b")]
+    assert {event[1] for event in events[:4]} == {"read_a", "read_b"}
+
+
+@pytest.mark.parametrize("text, complete", [
+    ('Yanıt: {"a": 1', False),
+    ('{"a": {"b": 1}', False),
+    ('{"a": {"b": 1}, "c": 2', False),
+    ('{"a": {"b": 1}, "c": 2}', True),
+    ('{"metin": "kapanış } değil", "x": 1', False),
+    ('{"metin": "kaçış \\" } hâlâ metin", "x": 1', False),
+    ('{"metin": "kaçış \\" } hâlâ metin", "x": 1} sonrası', True),
+    ('Önce düz metin, sonra {"ok": true}', True),
+])
+def test_stop_after_json_object_waits_for_the_outer_object(text, complete):
+    assert stop_after_json_object(text) is complete
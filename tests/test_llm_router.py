@@ -0,0 +1,69 @@
+import pytest
+import requests
+
+from llm_router import CircuitBreaker, LLMRouter, NoEndpointAvailableError
+
+
+def test_breaker_opens_after_threshold_and_allows_one_trial_after_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+    breaker.record_failure(now=0)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.can_dispatch(0)
+    breaker.record_failure(now=1)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.can_dispatch(5)
+
+    assert breaker.can_dispatch(11) and breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.on_dispatch()
+    assert not breaker.can_dispatch(11) # Yarı açıkken tek deneme isteği
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.consecutive_failures == 0
+
+
+def test_failed_trial_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=10)
+    for now in range(3):
+        breaker.record_failure(now)
+    assert breaker.can_dispatch(20)
+    breaker.on_dispatch()
+    breaker.record_failure(now=20)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.opened_at == 20
+    breaker.probe_succeeded() # Sağlık yoklaması bekleme süresini kısaltır
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+@pytest.fixture
+def router():
+    router = LLMRouter({
+        "LLM_ENDPOINTS": [{"name": "a", "url": "http://a/v1/completions"}, {"name": "b", "url": "http://b/v1/completions"}],
+        "LLM_MODEL_ROUTES": {"thinker": ["a", "b"], "vision": ["b"]},
+        "LLM_BREAKER_FAILURE_THRESHOLD": 1,
+        "LLM_BREAKER_RESET_SECONDS": 60,
+        "LLM_HEALTH_CHECK_INTERVAL": 0,
+    }, requests.Session())
+    yield router
+    router.close()
+
+
+def test_router_fails_over_and_isolates_open_endpoint(router):
+    endpoint = router.acquire("thinker", exclude={"b"})
+    assert endpoint.name == "a"
+    router.release(endpoint, success=False)
+    assert router.stats()["a"]["state"] == CircuitBreaker.OPEN
+
+    for _ in range(3):
+        endpoint = router.acquire("thinker")
+        assert endpoint.name == "b"
+        router.release(endpoint, success=True, latency=0.1)
+
+    endpoint = router.acquire("vision")
+    router.release(endpoint, success=False)
+    with pytest.raises(NoEndpointAvailableError):
+        router.acquire("thinker")
+
+
+def test_router_balances_by_outstanding_requests(router):
+    first = router.acquire("thinker")
+    second = router.acquire("thinker")
+    assert {first.name, second.name} == {"a", "b"}
+    router.release(first, success=True)
+    assert router.acquire("thinker").name == first.name
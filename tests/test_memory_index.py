@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+import pytest
+
+from memory_index import HashingEmbedder, SimHashIndex, VectorIndex, simhash
+
+
+def _unit_vectors(rng, count, dim):
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_vector_index_search_matches_brute_force_after_updates_and_removals():
+    rng = np.random.default_rng(0)
+    dim = 32
+    vectors = dict(zip(range(1, 301), _unit_vectors(rng, 300, dim)))
+    index = VectorIndex(dim, initial_capacity=4) # Kapasite büyütme de sınanır
+    index.add(list(vectors), np.array(list(vectors.values())))
+    # Var olan id'ler güncellenir, silinen sütunların yerine son sütun taşınır
+    updated = _unit_vectors(rng, 50, dim)
+    index.add(list(range(1, 51)), updated)
+    vectors.update(zip(range(1, 51), updated))
+    removed = rng.choice(list(vectors), size=80, replace=False).tolist()
+    index.remove(removed + [9999])
+    for record_id in removed:
+        del vectors[record_id]
+
+    assert len(index) == len(vectors) and sorted(index.ids()) == sorted(vectors)
+    ids = np.array(list(vectors))
+    matrix = np.array(list(vectors.values()))
+    for query in _unit_vectors(rng, 20, dim):
+        scores = matrix @ query
+        expected = ids[np.argsort(-scores)[:10]].tolist()
+        hits = index.search(query, 10)
+        assert [record_id for record_id, _ in hits] == expected
+        assert [score for _, score in hits] == pytest.approx(np.sort(scores)[::-1][:10].tolist(), abs=1e-5)
+
+
+def test_vector_index_sparse_query_scores_like_dense_query():
+    embedder = HashingEmbedder(256)
+    texts = ["kedi süt içti", "köpek kemik buldu", "kedi fare kovaladı", "yağmur yağıyor"]
+    index = VectorIndex(256)
+    index.add(list(range(len(texts))), embedder.embed(texts))
+    query = embedder.embed(["kedi"])[0]
+
+    hits = index.search(query, len(texts))
+    dense = embedder.embed(texts) @ query
+    assert [record_id for record_id, _ in hits][:2] == sorted([0, 2], key=lambda i: -dense[i])
+    assert dict(hits) == pytest.approx(dict(enumerate(dense.tolist())), abs=1e-5)
+
+
+def test_vector_index_save_and_load_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    index = VectorIndex(16)
+    index.add([10, 20, 30], _unit_vectors(rng, 3, 16))
+    index.remove([20])
+    path = str(tmp_path / "layer.vec.npz")
+    index.save(path)
+
+    loaded = VectorIndex.load(path, 16)
+    query = _unit_vectors(rng, 1, 16)[0]
+    assert sorted(loaded.ids()) == [10, 30]
+    assert loaded.search(query, 2) == index.search(query, 2)
+    # Yeni eklemeler yüklenen matrisin sonuna yazılır
+    loaded.add([40], _unit_vectors(rng, 1, 16))
+    assert len(loaded) == 3
+    # Gömme boyutu değiştiyse eski dosya kullanılmaz; eksik dosya da None döner
+    assert VectorIndex.load(path, 32) is None
+    assert VectorIndex.load(str(tmp_path / "yok.npz"), 16) is None
+
+
+@pytest.mark.parametrize("max_distance", [2, 3, 4, 6, 8])
+def test_simhash_bands_cover_every_bit_once(max_distance):
+    index = SimHashIndex(max_distance)
+    covered = 0
+    for shift, mask in index._band_layout:
+        band = mask << shift
+        assert covered & band == 0
+        covered |= band
+    assert covered == (1 << 64) - 1
+
+
+@pytest.mark.parametrize("max_distance", [3, 4, 6])
+def test_simhash_index_finds_every_fingerprint_within_max_distance(max_distance):
+    rng = random.Random(max_distance)
+    index = SimHashIndex(max_distance)
+    fingerprint = rng.getrandbits(64)
+    index.add(1, fingerprint)
+    for _ in range(500):
+        flips = rng.sample(range(64), rng.randint(0, max_distance))
+        near = fingerprint
+        for bit in flips:
+            near ^= 1 << bit
+        assert index.find_duplicate(near) == 1
+    far = fingerprint ^ sum(1 << bit for bit in rng.sample(range(64), max_distance + 1))
+    assert index.find_duplicate(far) is None
+
+
+def test_simhash_of_near_identical_texts_is_close():
+    first = simhash("Merak, öğrenmenin ve kendini keşfetmenin kapısıdır; her soru yeni bir yol açar.")
+    second = simhash("Merak, öğrenmenin ve kendini keşfetmenin kapısıdır; her soru yeni bir yol açar!")
+    assert bin(first ^ second).count("1") <= 3
@@ -0,0 +1,483 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from config import DEFAULT_CONFIG
+from memory_system import MemorySystem, ReadWriteLock, _WRITER_STOP
+
+
+def _config(tmp_path, **overrides):
+    config = dict(DEFAULT_CONFIG, DB_FILE=str(tmp_path / "memory.db"))
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def write_behind_memory(tmp_path):
+    memory = MemorySystem(_config(tmp_path, MEMORY_WRITE_BEHIND=True, BATCH_SAVE_INTERVAL=0.05,
+                                  WRITE_BEHIND_QUEUE_SIZE=2, WRITE_BEHIND_PUT_TIMEOUT=0.5))
+    yield memory
+    memory.close()
+
+
+def test_write_behind_persists_records(tmp_path, write_behind_memory):
+    for turn in range(5):
+        write_behind_memory.add_memory("episodic", {"turn": turn, "question": f"soru {turn}"})
+    write_behind_memory.flush(5)
+    write_behind_memory.close()
+
+    reopened = MemorySystem(_config(tmp_path))
+    try:
+        assert [r["question"] for r in reopened.get_memory("episodic", 10)] == [f"soru {t}" for t in range(5)]
+    finally:
+        reopened.close()
+
+
+def test_writer_thread_survives_unserializable_entry(write_behind_memory):
+    write_behind_memory.add_memory("episodic", {"turn": 1, "question": "bozuk", "payload": object()})
+    write_behind_memory.add_memory("episodic", {"turn": 2, "question": "sağlam"})
+    write_behind_memory.flush(5)
+
+    assert write_behind_memory._writer_thread.is_alive()
+    assert write_behind_memory.count_records("episodic") == 1
+    assert [r["question"] for r in write_behind_memory.get_memory("episodic", 5)] == ["sağlam"]
+
+    # Kuyruk boyutunu aşan eklemeler yazıcı canlı olduğu sürece takılmaz
+    for turn in range(3, 10):
+        write_behind_memory.add_memory("episodic", {"turn": turn, "question": f"soru {turn}"})
+    write_behind_memory.flush(5)
+    assert write_behind_memory.count_records("episodic") == 8
+
+
+def test_add_memory_falls_back_to_sync_write_when_writer_is_dead(write_behind_memory):
+    write_behind_memory._write_queue.put(_WRITER_STOP)
+    write_behind_memory._writer_thread.join(5)
+    write_behind_memory.add_memory("episodic", {"turn": 1, "question": "doğrudan"})
+    assert write_behind_memory.count_records("episodic") == 1
+
+
+def _fill_and_prune(memory, accessed_turn):
+    for turn in range(10):
+        memory.add_memory("episodic", {"turn": turn, "question": f"soru {turn}"})
+        if turn == accessed_turn:
+            for _ in range(20):
+                memory._record_access("episodic", [turn + 1])
+    # Limiti aşan ekleme budamayı tetikler
+    memory.add_memory("episodic", {"turn": 10, "question": "soru 10"})
+    return {r["turn"] for r in memory.get_memory("episodic", 20)}
+
+
+def test_episodic_eviction_is_fifo_by_default(tmp_path):
+    memory = MemorySystem(_config(tmp_path, EPISODIC_MEMORY_LIMIT=10, MEMORY_PRUNE_TARGET_RATIO=0.5))
+    try:
+        assert memory.retention.policy("episodic") == "fifo"
+        assert _fill_and_prune(memory, accessed_turn=0) == {6, 7, 8, 9, 10}
+    finally:
+        memory.close()
+
+
+def test_importance_retention_is_opt_in_per_layer(tmp_path):
+    memory = MemorySystem(_config(tmp_path, EPISODIC_MEMORY_LIMIT=10, MEMORY_PRUNE_TARGET_RATIO=0.5,
+                                  MEMORY_RETENTION_POLICIES={"episodic": "importance"}))
+    try:
+        assert 0 in _fill_and_prune(memory, accessed_turn=0) # Sık erişilen eski kayıt budamadan kurtulur
+    finally:
+        memory.close()
+
+
+def test_cached_record_matches_database_record(tmp_path):
+    from memory_codec import EMOTION_SCHEMA
+    entry = {"turn": 1, "question": "soru", "emotions": {name: 0.1 for name in EMOTION_SCHEMA},
+             "activation_pattern": [0.3, 0.7]}
+    memory = MemorySystem(_config(tmp_path))
+    try:
+        memory.get_memory("episodic", 1) # Önbelleği ısıt; sonraki ekleme write-through ile önbelleğe yazılır
+        memory.add_memory("episodic", entry)
+        cached = memory.get_memory("episodic", 1)
+    finally:
+        memory.close()
+    reopened = MemorySystem(_config(tmp_path))
+    try:
+        assert cached == reopened.get_memory("episodic", 1)
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("strategy", ["rwlock", "file", "sqlite"])
+def test_lock_strategies_serialize_concurrent_writers_and_readers(tmp_path, strategy):
+    memory = MemorySystem(_config(tmp_path, MEMORY_LOCK_STRATEGY=strategy, EPISODIC_MEMORY_LIMIT=1000))
+    errors = []
+
+    def writer(worker):
+        try:
+            for turn in range(25):
+                memory.add_memory("episodic", {"turn": turn, "question": f"soru {worker}-{turn}"})
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(25):
+                memory.get_memory("episodic", 10)
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        assert memory.lock_strategy == strategy
+        threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        assert not errors
+        assert len(memory.get_memory("episodic", 1000)) == 100
+    finally:
+        memory.close()
+
+
+def test_rwlock_writer_waits_for_readers_and_is_reentrant():
+    lock = ReadWriteLock()
+    events = []
+    reading = threading.Event()
+
+    def writer():
+        reading.wait()
+        with lock.write_locked():
+            events.append("write")
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    with lock.read_locked():
+        reading.set()
+        time.sleep(0.05)
+        events.append("read")
+    thread.join(timeout=5)
+    assert events == ["read", "write"]
+
+    with lock.write_locked(), lock.read_locked(), lock.write_locked(): # Aynı iş parçacığı yeniden alabilir
+        pass
+
+
+def _create_baseline_database(db_file):
+    """Şema sürümü olmayan (user_version 0) ilk sürüm veritabanını oluşturur."""
+    import json
+    import sqlite3
+    from memory_system import MEMORY_LAYERS
+    conn = sqlite3.connect(db_file)
+    for layer in MEMORY_LAYERS:
+        conn.execute(f"CREATE TABLE {layer} (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, "
+                     f"turn INTEGER NOT NULL, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO episodic (timestamp, turn, data) VALUES (?, ?, ?)", (
+        "2024-01-01T00:00:00", 7,
+        json.dumps({"turn": 7, "type": "user_interaction", "user_id": "ayse", "question": "eski anı",
+                    "emotions": {"curiosity": 0.9, "wonder": 0.2}}, ensure_ascii=False)
+    ))
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_migrates_to_current_schema(tmp_path):
+    import sqlite3
+    from memory_system import SCHEMA_VERSION
+    config = _config(tmp_path)
+    _create_baseline_database(config["DB_FILE"])
+
+    memory = MemorySystem(config)
+    try:
+        assert memory.get_memory("episodic", 5)[0]["question"] == "eski anı"
+        memory.add_memory("episodic", {"turn": 8, "question": "yeni anı"})
+    finally:
+        memory.close()
+
+    conn = sqlite3.connect(config["DB_FILE"])
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION == 3
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(episodic)")}
+        assert {"search_text", "type", "user_id", "dominant_emotion", "retention_score", "access_count"} <= columns
+        search_text, record_type, user_id, dominant_emotion, retention_score = conn.execute(
+            "SELECT search_text, type, user_id, dominant_emotion, retention_score FROM episodic WHERE turn = 7"
+        ).fetchone()
+    finally:
+        conn.close()
+    assert "eski anı" in search_text # v1
+    assert (record_type, user_id, dominant_emotion) == ("user_interaction", "ayse", "curiosity") # v2
+    assert retention_score is not None # v3
+
+
+def _failing_writer(*args, **kwargs):
+    raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_failed_write_leaves_no_phantom_records(tmp_path, monkeypatch, write_behind):
+    monkeypatch.setattr("memory_system.time.sleep", lambda seconds: None)
+    memory = MemorySystem(_config(tmp_path, MEMORY_WRITE_BEHIND=write_behind, BATCH_SAVE_INTERVAL=0.01))
+    try:
+        memory.get_memory("semantic", 1) # Önbelleği ısıt
+        entry = {"turn": 1, "insight": "Gökyüzü bu akşam mor renkteydi ve rüzgar çok sertti."}
+        with monkeypatch.context() as patch:
+            patch.setattr(memory.db, "writer", _failing_writer)
+            memory.add_memory("semantic", entry)
+            memory.flush(5)
+
+        assert memory.get_memory("semantic", 10) == []
+        assert len(memory._vector_indexes["semantic"]) == 0
+        assert len(memory._dedup_indexes["semantic"]) == 0
+        assert not memory._pending["semantic"]
+
+        # Aynı içerik artık hayalet bir kopyayla birleştirilmez, gerçekten yazılır
+        memory.add_memory("semantic", dict(entry))
+        memory.flush(5)
+        assert [record["insight"] for record in memory.get_memory("semantic", 10)] == [entry["insight"]]
+    finally:
+        memory.close()
+
+
+def _archive_memory(tmp_path, **overrides):
+    return MemorySystem(_config(tmp_path, EPISODIC_MEMORY_LIMIT=10, MEMORY_PRUNE_TARGET_RATIO=0.5,
+                                MEMORY_ARCHIVE_COMPRESSION="zlib", **overrides))
+
+
+def test_pruned_records_round_trip_through_archive(tmp_path):
+    memory = _archive_memory(tmp_path)
+    try:
+        for turn in range(11):
+            memory.add_memory("episodic", {"turn": turn, "question": f"arşiv sorusu {turn}"})
+        assert [record["turn"] for record in memory.get_memory("episodic", 20)] == [6, 7, 8, 9, 10]
+        assert [record["turn"] for record in memory.iter_archived("episodic")] == [5, 4, 3, 2, 1, 0]
+        assert [record["turn"] for record in memory.iter_archived("episodic", start_turn=2, end_turn=3, newest_first=False)] == [2, 3]
+        assert [record["question"] for record in memory.search_archive("episodic", "arşiv", k=2)] == ["arşiv sorusu 5", "arşiv sorusu 4"]
+    finally:
+        memory.close()
+
+
+def test_retried_prune_transaction_archives_rows_once(tmp_path, monkeypatch):
+    monkeypatch.setattr("memory_system.time.sleep", lambda seconds: None)
+    memory = _archive_memory(tmp_path)
+    evict = memory._evict_records
+    calls = []
+
+    def evict_then_fail_once(cursor, layer, delete_count):
+        result = evict(cursor, layer, delete_count)
+        calls.append(layer)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked") # Transaction geri alınır ve yeniden denenir
+        return result
+
+    monkeypatch.setattr(memory, "_evict_records", evict_then_fail_once)
+    try:
+        for turn in range(11):
+            memory.add_memory("episodic", {"turn": turn, "question": f"soru {turn}"})
+        assert len(calls) == 2
+        assert memory.archive.count("episodic") == 6
+    finally:
+        memory.close()
+
+
+def test_archive_failure_keeps_rows_until_next_attempt(tmp_path, monkeypatch):
+    memory = _archive_memory(tmp_path)
+    append = memory.archive.append
+
+    def failing_append(layer, rows):
+        raise OSError("disk dolu")
+
+    try:
+        monkeypatch.setattr(memory.archive, "append", failing_append)
+        for turn in range(11):
+            memory.add_memory("episodic", {"turn": turn, "question": f"soru {turn}"})
+        assert memory.archive.count("episodic") == 0
+        monkeypatch.setattr(memory.archive, "append", append)
+    finally:
+        memory.close() # Bekleyen satırlar kapanışta arşive yazılır
+    reopened = _archive_memory(tmp_path)
+    try:
+        assert [record["turn"] for record in reopened.iter_archived("episodic")] == [5, 4, 3, 2, 1, 0]
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("codec", ["packed", "json"])
+def test_non_string_dict_keys_read_back_like_json(tmp_path, codec):
+    entry = {"turn": 1, "question": "soru", "votes": {7: "yedi", 2.5: "iki buçuk", False: "hayır", None: "yok"},
+             "nested": [{3: {4: "dört"}}]}
+    expected = {"7": "yedi", "2.5": "iki buçuk", "false": "hayır", "null": "yok"}
+    memory = MemorySystem(_config(tmp_path, MEMORY_RECORD_CODEC=codec))
+    try:
+        memory.get_memory("episodic", 1)
+        memory.add_memory("episodic", entry)
+        cached = memory.get_memory("episodic", 1)[0]
+    finally:
+        memory.close()
+    reopened = MemorySystem(_config(tmp_path, MEMORY_RECORD_CODEC=codec))
+    try:
+        stored = reopened.get_memory("episodic", 1)[0]
+    finally:
+        reopened.close()
+    assert stored["votes"] == cached["votes"] == expected
+    assert stored["nested"] == cached["nested"] == [{"3": {"4": "dört"}}]
+
+
+def test_near_duplicate_insight_is_merged_into_existing_record(tmp_path):
+    insight = "Merak, öğrenmenin ve kendini keşfetmenin kapısıdır; her soru yeni bir yol açar."
+    memory = MemorySystem(_config(tmp_path))
+    try:
+        memory.add_memory("semantic", {"turn": 1, "insight": insight})
+        memory.add_memory("semantic", {"turn": 5, "insight": insight + "!", "timestamp": "2024-05-05T10:00:00"})
+        memory.add_memory("semantic", {"turn": 6, "insight": "Yalnızlık, bağlantının değerini hatırlatır bana her gece."})
+        records = memory.get_memory("semantic", 10)
+        assert len(records) == 2 and memory.count_records("semantic") == 2
+        assert records[0]["merge_count"] == 2 and records[0]["last_merged_turn"] == 5
+    finally:
+        memory.close()
+    reopened = MemorySystem(_config(tmp_path))
+    try:
+        stored = reopened.get_memory("semantic", 10)[0]
+        assert (stored["insight"], stored["merge_count"], stored["last_merged_at"]) == (insight, 2, "2024-05-05T10:00:00")
+    finally:
+        reopened.close()
+
+
+def test_search_similar_ranks_by_meaning_and_survives_restart(tmp_path):
+    config = _config(tmp_path, MEMORY_DEDUP_ENABLED=False)
+    memory = MemorySystem(config)
+    questions = ["kedi süt içti mi", "yarın hava yağmurlu olacak", "kedi fareyi kovaladı", "borsa bugün düştü"]
+    for turn, question in enumerate(questions):
+        memory.add_memory("episodic", {"turn": turn, "question": question})
+    try:
+        hits = memory.search_similar("episodic", "kedi", k=2)
+        assert sorted(r["question"] for r in hits) == ["kedi fareyi kovaladı", "kedi süt içti mi"]
+        assert memory.search_similar("episodic", "kedi", k=4, min_score=0.99) == []
+        assert memory.search_similar("procedural", "kedi") == [] # İndekslenmeyen katman
+    finally:
+        memory.close()
+
+    # Kapanışta kaydedilen indeks, arada veritabanından silinen kayıtlarla açılışta eşitlenir
+    with sqlite3.connect(config["DB_FILE"]) as conn:
+        conn.execute("DELETE FROM episodic WHERE turn = 0")
+    reopened = MemorySystem(config)
+    try:
+        reopened.add_memory("episodic", {"turn": 4, "question": "kedi uyuyor"})
+        assert len(reopened._vector_indexes["episodic"]) == 4
+        hits = reopened.search_similar("episodic", "kedi", k=4, min_score=0.1)
+        assert sorted(r["question"] for r in hits) == ["kedi fareyi kovaladı", "kedi uyuyor"]
+    finally:
+        reopened.close()
+
+
+@pytest.fixture
+def search_memory(tmp_path):
+    memory = MemorySystem(_config(tmp_path, MEMORY_DEDUP_ENABLED=False, MEMORY_VECTOR_INDEX_ENABLED=False))
+    yield memory
+    memory.close()
+
+
+def test_full_text_search_ranks_by_relevance(search_memory):
+    assert search_memory.fts_enabled
+    entries = [
+        {"turn": 1, "question": "bugün hava nasıl olacak, dışarı çıkmalı mıyım yoksa evde mi kalmalıyım"},
+        {"turn": 2, "question": "kedi", "response": "kedi kedi"},
+        {"turn": 3, "question": "kedi bugün ne yedi", "response": "mama yedi ve uyudu"},
+        {"turn": 4, "question": "köpek parkta koştu", "mood": "kedi"}, # Aranan alanlar dışındaki metin indekslenmez
+    ]
+    for entry in entries:
+        search_memory.add_memory("episodic", entry)
+
+    assert [r["turn"] for r in search_memory.search("episodic", "kedi")] == [2, 3]
+    assert [r["turn"] for r in search_memory.search("episodic", "kedi", k=1)] == [2]
+    # Kelimelerden herhangi biri yeterlidir; aksan farkı eşleşmeyi engellemez
+    assert sorted(r["turn"] for r in search_memory.search("episodic", "KOPEK hava")) == [1, 4]
+    assert search_memory.search("episodic", "zürafa") == []
+
+
+def test_full_text_index_follows_inserts_updates_and_deletes(tmp_path, search_memory):
+    for turn, question in enumerate(["elma ağacı", "armut ağacı", "kiraz ağacı"]):
+        search_memory.add_memory("episodic", {"turn": turn, "question": question})
+    with search_memory.db.writer() as cursor:
+        cursor.execute("UPDATE episodic SET search_text = 'ceviz ağacı' WHERE turn = 1")
+        cursor.execute("DELETE FROM episodic WHERE turn = 2")
+
+    assert search_memory.search("episodic", "armut") == []
+    assert search_memory.search("episodic", "kiraz") == []
+    assert [r["turn"] for r in search_memory.search("episodic", "ceviz")] == [1]
+    assert sorted(r["turn"] for r in search_memory.search("episodic", "ağacı")) == [0, 1]
+
+    # FTS tablosu sonradan oluşturulursa mevcut kayıtlardan yeniden doldurulur
+    search_memory.close()
+    with sqlite3.connect(str(tmp_path / "memory.db")) as conn:
+        conn.execute("DROP TABLE episodic_fts")
+    reopened = MemorySystem(_config(tmp_path, MEMORY_DEDUP_ENABLED=False, MEMORY_VECTOR_INDEX_ENABLED=False))
+    try:
+        assert [r["turn"] for r in reopened.search("episodic", "elma")] == [0]
+    finally:
+        reopened.close()
+
+
+def test_search_sees_queued_writes_and_falls_back_to_like(write_behind_memory):
+    write_behind_memory.add_memory("episodic", {"turn": 1, "question": "bekleyen kayıt"})
+    write_behind_memory.add_memory("episodic", {"turn": 2, "question": "ikinci bekleyen kayıt"})
+    assert sorted(r["turn"] for r in write_behind_memory.search("episodic", "bekleyen")) == [1, 2]
+
+    write_behind_memory.fts_enabled = False
+    assert [r["turn"] for r in write_behind_memory.search("episodic", "bekleyen")] == [2, 1]
+
+
+def _social_records():
+    return [
+        {"turn": 1, "type": "dialogue", "user_id": "ayse", "source": "chat", "consciousness": 0.2,
+         "emotions": {"merak": 0.9, "huzur": 0.1}},
+        {"turn": 2, "type": "dialogue", "user_id": "mehmet", "source": "chat", "consciousness": 0.8,
+         "emotional_state": {"huzur": 0.7, "merak": 0.3}},
+        {"turn": 3, "type": "reflection", "user_id": "ayse", "source": "agent_cycle", "consciousness": 0.9,
+         "emotions": {"merak": 0.6, "not": "sayı değil"}},
+        {"turn": 4, "type": "dialogue", "user_id": "ayse", "source": "chat", "consciousness": "yüksek"},
+    ]
+
+
+@pytest.mark.parametrize("write_behind", [False, True])
+def test_query_memory_filters_on_promoted_columns(tmp_path, write_behind):
+    # Yazıcı bekletilir; böylece filtreler henüz diske yazılmamış kayıtlara da uygulanır
+    memory = MemorySystem(_config(tmp_path, MEMORY_WRITE_BEHIND=write_behind, BATCH_SAVE_INTERVAL=60,
+                                  WRITE_BEHIND_FLUSH_SIZE=100))
+    try:
+        records = _social_records()
+        for entry in records[:2]:
+            memory.add_memory("episodic", entry)
+        if write_behind:
+            memory.flush(5)
+        for entry in records[2:]:
+            memory.add_memory("episodic", entry)
+        if write_behind:
+            # Son iki kayıt hâlâ kuyrukta
+            assert memory.db.reader().execute("SELECT COUNT(*) FROM episodic").fetchone()[0] == 2
+
+        def turns(**filters):
+            return [r["turn"] for r in memory.query_memory("episodic", **filters)]
+
+        assert turns(user_id="ayse") == [1, 3, 4]
+        assert turns(user_id="ayse", record_type="dialogue") == [1, 4]
+        assert turns(source="agent_cycle") == [3]
+        assert turns(dominant_emotion="merak") == [1, 3]
+        assert turns(dominant_emotion="huzur") == [2]
+        # Sayı olmayan bilinç değeri sütuna NULL olarak yansır ve eşik filtresine takılmaz
+        assert turns(min_consciousness=0.5) == [2, 3]
+        assert turns(since_turn=2, until_turn=3) == [2, 3]
+        assert turns(user_id="ayse", limit=2) == [3, 4] # En son kayıtlar, en eski önce
+        assert turns(user_id="zeynep") == []
+        assert turns() == [1, 2, 3, 4]
+    finally:
+        memory.close()
+
+
+def test_query_memory_uses_the_column_indexes(tmp_path):
+    memory = MemorySystem(_config(tmp_path))
+    try:
+        for column in ("type", "user_id", "source", "dominant_emotion"):
+            plan = memory.db.reader().execute(
+                f"EXPLAIN QUERY PLAN SELECT id, turn, data FROM episodic WHERE {column} = ? "
+                f"ORDER BY turn DESC, id DESC LIMIT ?", ("x", 10)).fetchall()
+            assert any("USING INDEX" in str(row[-1]) for row in plan), (column, plan)
+    finally:
+        memory.close()
@@ -0,0 +1,79 @@
+import json
+import os
+import sqlite3
+
+from config import DEFAULT_CONFIG
+from memory_system import MEMORY_LAYERS, MemorySystem, export_database
+
+
+def _config(db_file, **overrides):
+    return dict(DEFAULT_CONFIG, DB_FILE=str(db_file), **overrides)
+
+
+def test_jsonl_export_import_round_trip(tmp_path):
+    source = _config(tmp_path / "source.db")
+    memory = MemorySystem(source)
+    try:
+        for turn in range(5):
+            memory.add_memory("episodic", {"turn": turn, "question": f"soru {turn}", "user_id": "ayse",
+                                           "emotions": {"curiosity": 0.5 + turn / 10}})
+        memory.add_memory("semantic", {"turn": 4, "insight": "Merak, öğrenmenin kapısıdır."})
+        memory.save_social_relation("ayse", {"trust": 0.7, "familiarity": 0.4})
+        memory.save_identity_prompt("İkinci Kimlik", "Yeni kimlik metni")
+        episodic, semantic = memory.get_memory("episodic", 10), memory.get_memory("semantic", 10)
+    finally:
+        memory.close()
+
+    output = tmp_path / "export.jsonl.gz"
+    counts = export_database(source["DB_FILE"], str(output), source)
+    assert counts["episodic"] == 5 and counts["semantic"] == 1 and counts["social_memory"] == 1
+
+    target = MemorySystem(_config(tmp_path / "target.db"))
+    try:
+        target.import_data(str(output))
+        assert target.get_memory("episodic", 10) == episodic
+        assert target.get_memory("semantic", 10) == semantic
+        assert target.load_social_relations() == {"ayse": {"trust": 0.7, "familiarity": 0.4}}
+        assert target.get_active_identity() == "Yeni kimlik metni"
+        assert [record["turn"] for record in target.query_memory("episodic", user_id="ayse")] == [0, 1, 2, 3, 4]
+    finally:
+        target.close()
+
+
+def test_export_leaves_legacy_source_untouched(tmp_path):
+    db_file = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_file)
+    for layer in MEMORY_LAYERS:
+        conn.execute(f"CREATE TABLE {layer} (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, "
+                     f"turn INTEGER NOT NULL, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO episodic (timestamp, turn, data) VALUES ('2024-01-01', 3, ?)", (json.dumps({"turn": 3, "question": "eski"}),))
+    conn.commit()
+    conn.close()
+
+    output = tmp_path / "legacy.jsonl"
+    export_database(str(db_file), str(output), _config(db_file))
+
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert rows == [{"table": "episodic", "id": 1, "timestamp": "2024-01-01", "turn": 3, "access_count": 0,
+                     "record": {"turn": 3, "question": "eski"}}]
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+        assert "search_text" not in {row[1] for row in conn.execute("PRAGMA table_info(episodic)")}
+    finally:
+        conn.close()
+    assert not os.path.exists(f"{db_file}.archive")
+
+
+def test_import_defaults_missing_identity_timestamp(tmp_path):
+    source = tmp_path / "identity.jsonl"
+    source.write_text(json.dumps({"table": "identity_prompts", "title": "Zamansız", "content": "metin",
+                                  "context_type": "general", "active": 0}) + "\n", encoding="utf-8")
+    memory = MemorySystem(_config(tmp_path / "target.db"))
+    try:
+        memory.import_data(str(source))
+        created_at = memory.db.reader().execute(
+            "SELECT created_at FROM identity_prompts WHERE title = 'Zamansız'").fetchone()[0]
+    finally:
+        memory.close()
+    assert created_at is not None
@@ -0,0 +1,18 @@
+from prompt_builder import PromptAssembler
+
+
+def _user_prompt(assembler, social_context, turn):
+    return assembler.user_prompt(
+        stable_sections=[("Aktif Hedefin", "Web'de araştırma yap", 9)],
+        volatile_sections=[("Sosyal Bağlam", social_context, 3), ("Tur", turn)],
+        observation="gözlem",
+    )
+
+
+def test_social_context_changes_do_not_touch_stable_prefix():
+    assembler = PromptAssembler({})
+    before = _user_prompt(assembler, "Güven: 0.50", 1)
+    after = _user_prompt(assembler, "Güven: 0.55", 2)
+    prefix = before.split("Sosyal Bağlam")[0]
+    assert "Aktif Hedefin" in prefix
+    assert after.startswith(prefix)
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from timeseries_store import TimeSeriesStore
+
+
+@pytest.fixture
+def history(tmp_path):
+    rng = np.random.default_rng(7)
+    turns = np.arange(1, 1001)
+    values = {"dopamine": rng.random(len(turns)), "cortisol": rng.random(len(turns))}
+    values["cortisol"][::7] = np.nan # Eksik ölçümler
+    store = TimeSeriesStore(str(tmp_path / "tsdb"), flush_every=50)
+    for index, turn in enumerate(turns):
+        sample = {metric: column[index] for metric, column in values.items() if not np.isnan(column[index])}
+        store.append(int(turn), sample)
+    yield store, turns, {metric: column.astype(np.float32).astype(np.float64) for metric, column in values.items()}
+    store.close()
+
+
+@pytest.mark.parametrize("start, end", [(1, 9), (1, 20), (5, 205), (37, 999), (1, 1000), (250, 1250)])
+@pytest.mark.parametrize("agg", ["mean", "sum", "min", "max", "count"])
+def test_rollup_queries_match_raw_values(history, start, end, agg):
+    store, turns, values = history
+    for metric, column in values.items():
+        selected = column[(turns >= start) & (turns <= end)]
+        selected = selected[~np.isnan(selected)]
+        expected = {"mean": np.mean, "sum": np.sum, "min": np.min, "max": np.max, "count": len}[agg](selected)
+        assert store.query(metric, start, end, agg) == pytest.approx(expected, rel=1e-6)
+
+
+@pytest.mark.parametrize("resolution", [10, 100])
+def test_series_returns_bucket_means(history, resolution):
+    store, turns, values = history
+    bucket_turns, means = store.series("dopamine", 0, 1000, resolution)
+    for bucket_turn, mean in zip(bucket_turns, means):
+        in_bucket = (turns >= bucket_turn) & (turns < bucket_turn + resolution)
+        assert mean == pytest.approx(values["dopamine"][in_bucket].mean(), rel=1e-6)
+
+
+def test_missing_column_file_keeps_history(tmp_path):
+    directory = str(tmp_path / "tsdb")
+    store = TimeSeriesStore(directory)
+    for turn in range(30):
+        store.append(turn, {"dopamine": turn / 10, "cortisol": 1.0})
+    store.close()
+    os.remove(os.path.join(directory, "cortisol.f32"))
+
+    reopened = TimeSeriesStore(directory)
+    try:
+        assert len(reopened) == 30
+        assert reopened.query("dopamine", 0, 29, "sum") == pytest.approx(sum(turn / 10 for turn in range(30)), rel=1e-6)
+        assert reopened.query("cortisol", 0, 29, "count") == 0
+        reopened.append(30, {"dopamine": 1.0, "cortisol": 2.0})
+        assert reopened.query("cortisol", 0, 30) == 2.0
+    finally:
+        reopened.close()
+    assert os.path.getsize(os.path.join(directory, "cortisol.f32")) == 31 * 4
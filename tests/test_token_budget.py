@@ -0,0 +1,46 @@
+import pytest
+
+from token_budget import ContextOverflowError, TokenBudget, estimate_message_tokens, estimate_tokens
+
+
+CONTEXT_SIZE = 1024
+SAFETY_RATIO = 0.1
+
+
+@pytest.fixture
+def budget():
+    return TokenBudget({"DEFAULT_CONTEXT_SIZE": CONTEXT_SIZE, "TOKEN_SAFETY_RATIO": SAFETY_RATIO,
+                        "TOKEN_MIN_COMPLETION": 256, "TOKEN_TOOL_RESULT_KEEP": 32}, "test-model")
+
+
+def _usable():
+    return int(CONTEXT_SIZE * (1 - SAFETY_RATIO))
+
+
+def test_long_prompt_leaves_min_completion(budget):
+    payload = budget.fit_payload({"model": "test-model", "prompt": "kelime " * 5000, "max_tokens": 2048})
+    prompt_tokens = estimate_tokens(payload["prompt"])
+    assert payload["max_tokens"] >= budget.min_completion
+    assert prompt_tokens + payload["max_tokens"] <= _usable()
+
+
+def test_oversized_system_message_is_trimmed_to_fit(budget):
+    messages = [{"role": "system", "content": "kural " * 3000}, {"role": "user", "content": "soru " * 3000}]
+    payload = budget.fit_payload({"model": "test-model", "messages": messages}, extra_tokens=100)
+    prompt_tokens = sum(estimate_message_tokens(message) for message in payload["messages"])
+    assert payload["max_tokens"] >= budget.min_completion
+    assert prompt_tokens + 100 + payload["max_tokens"] <= _usable()
+
+
+def test_completion_is_capped_at_remaining_room(budget):
+    assert budget.completion_tokens(_usable() - 10) == 10
+    assert budget.completion_tokens(100, requested=64) == 64
+
+
+def test_no_room_for_completion_raises(budget):
+    with pytest.raises(ContextOverflowError):
+        budget.completion_tokens(_usable())
+    # Araç tanımları tek başına bağlamı dolduruyorsa istem ne kadar kırpılsa da yanıta yer kalmaz
+    with pytest.raises(ContextOverflowError):
+        budget.fit_payload({"model": "test-model", "messages": [{"role": "user", "content": "soru"}]},
+                           extra_tokens=CONTEXT_SIZE)
@@ -0,0 +1,54 @@
+import json
+from typing import Dict, List, Optional
+
+from token_budget import estimate_tokens
+from tool_registry import ToolRegistry, tool_parameters_schema
+
+
+def plan_trip(aybar_instance, city: str, days: int, budget: float = 100.0, pets: bool = False,
+              stops: Optional[List[int]] = None, notes: Dict[str, str] = None, *extra, **options) -> str:
+    """Bir gezi planlar.
+
+    Ayrıntılar LLM'e gönderilmez.
+    """
+    return f"{aybar_instance}:{city}:{days}"
+
+
+def test_parameters_schema_follows_the_signature():
+    schema = tool_parameters_schema(plan_trip)
+    assert schema["required"] == ["city", "days"]
+    types = {name: {k: v for k, v in prop.items() if k != "description"} for name, prop in schema["properties"].items()}
+    assert types == {
+        "city": {"type": "string"},
+        "days": {"type": "integer"},
+        "budget": {"type": "number"},
+        "pets": {"type": "boolean"},
+        "stops": {"type": "array", "items": {"type": "integer"}},
+        "notes": {"type": "object"},
+    }
+
+
+def test_registry_builds_definitions_and_payload_once():
+    def shout(text):
+        return text.upper()
+    shout.side_effects = False
+    precomputed = {"type": "object", "properties": {"x": {"type": "string"}}, "required": ["x"]}
+
+    def decorated(x):
+        """Önceden hesaplanmış şemayı kullanır."""
+    decorated.tool_parameters = precomputed
+
+    registry = ToolRegistry({"plan_trip": plan_trip, "shout": shout, "decorated": decorated})
+    functions = {d["function"]["name"]: d["function"] for d in registry.definitions}
+    assert functions["plan_trip"]["description"] == "Bir gezi planlar."
+    assert functions["shout"]["description"] == "No description available."
+    assert functions["decorated"]["parameters"] is precomputed
+    assert json.loads(registry.payload_json) == registry.definitions
+    assert registry.payload_tokens == estimate_tokens(registry.payload_json)
+
+    # Aybar örneği yalnızca onu bekleyen araçlara verilir; işaretlenmemiş araçlar yan etkili sayılır
+    assert registry.call("plan_trip", "aybar", {"city": "İzmir", "days": 2}) == "aybar:İzmir:2"
+    assert registry.call("shout", "aybar", {"text": "selam"}) == "SELAM"
+    assert not registry.has_side_effects("shout")
+    assert registry.has_side_effects("plan_trip") and registry.has_side_effects("bilinmeyen")
+    assert "shout" in registry and "bilinmeyen" not in registry
@@ -0,0 +1,318 @@
+import json
+import os
+import threading
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+_TURNS_FILE = "turns.i64"
+_META_FILE = "meta.json"
+_AGGREGATES = ("mean", "sum", "min", "max", "count")
+
+
+class _Rollup:
+    """Sabit genişlikli tur kovaları için toplam/sayı/min/maks tutan özet (downsample) seviyesi."""
+    def __init__(self, factor: int):
+        self.factor = factor
+        self.sums = np.zeros(0, dtype=np.float64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.mins = np.zeros(0, dtype=np.float64)
+        self.maxs = np.zeros(0, dtype=np.float64)
+
+    def _ensure(self, buckets: int):
+        size = len(self.sums)
+        if buckets <= size:
+            return
+        new_size = max(buckets, size * 2, 16)
+        grow = new_size - size
+        self.sums = np.concatenate([self.sums, np.zeros(grow)])
+        self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+        self.mins = np.concatenate([self.mins, np.full(grow, np.inf)])
+        self.maxs = np.concatenate([self.maxs, np.full(grow, -np.inf)])
+
+    def add_one(self, turn: int, value: float):
+        if np.isnan(value) or turn < 0:
+            return
+        bucket = turn // self.factor
+        self._ensure(bucket + 1)
+        self.sums[bucket] += value
+        self.counts[bucket] += 1
+        self.mins[bucket] = min(self.mins[bucket], value)
+        self.maxs[bucket] = max(self.maxs[bucket], value)
+
+    def add(self, turns: np.ndarray, values: np.ndarray):
+        valid = ~np.isnan(values) & (turns >= 0)
+        if not valid.any():
+            return
+        buckets = turns[valid] // self.factor
+        values = values[valid].astype(np.float64)
+        self._ensure(int(buckets.max()) + 1)
+        np.add.at(self.sums, buckets, values)
+        np.add.at(self.counts, buckets, 1)
+        np.minimum.at(self.mins, buckets, values)
+        np.maximum.at(self.maxs, buckets, values)
+
+
+class TimeSeriesStore:
+    """
+    Duygu ve nörokimyasal yörüngeleri için yalnızca eklemeli, sütunlu zaman serisi deposu.
+    Her metrik ayrı bir float32 dosyasında, tur numaraları ortak bir int64 dosyasında tutulur.
+    Tur başına ham değerlerin yanında 10 ve 100 turluk özet seviyeleri otomatik güncellenir;
+    aralık sorguları tam kovaları özetlerden, kenarları ham verilerden hesaplar.
+    """
+    def __init__(self, directory: str, rollup_factors: Sequence[int] = (10, 100), flush_every: int = 10):
+        self.directory = directory
+        self.rollup_factors = tuple(sorted(rollup_factors))
+        self.flush_every = max(1, int(flush_every))
+        self._lock = threading.Lock()
+        self._metrics: List[str] = []
+        self._turns = np.zeros(0, dtype=np.int64)
+        self._values: Dict[str, np.ndarray] = {}
+        self._size = 0
+        self._sorted = True
+        self._rollups: Dict[str, Dict[int, _Rollup]] = {}
+        self._handles: Dict[str, BinaryIO] = {}
+        self._unflushed = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _metric_file(self, metric: str) -> str:
+        return self._path(f"{metric}.f32")
+
+    def _load(self):
+        """
+        Diskteki sütunları okur; yarıda kalmış yazmalar en kısa sütun uzunluğuna kırpılır. meta.json'da
+        listelenip dosyası bulunmayan bir metrik geçmişi silmez: sütun NaN ile doldurularak yeniden oluşturulur.
+        """
+        meta_path = self._path(_META_FILE)
+        if not os.path.exists(meta_path) or not os.path.exists(self._path(_TURNS_FILE)):
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                metrics = json.load(f).get("metrics", [])
+            turns = np.fromfile(self._path(_TURNS_FILE), dtype="<i8")
+            columns = {}
+            missing = []
+            for metric in metrics:
+                path = self._metric_file(metric)
+                if os.path.exists(path):
+                    columns[metric] = np.fromfile(path, dtype="<f4")
+                else:
+                    missing.append(metric)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Zaman serisi deposu okunamadı ({self.directory}): {e}")
+            return
+
+        size = min([len(turns)] + [len(column) for column in columns.values()])
+        file_sizes = [os.path.getsize(self._path(_TURNS_FILE)) == size * 8] + [len(column) == size for column in columns.values()]
+        if not all(file_sizes):
+            print(f"⚠️ Zaman serisi deposunda yarım kalmış yazma bulundu, {size} satıra kırpılıyor.")
+            self._truncate_files(list(columns), size)
+        for metric in missing:
+            print(f"⚠️ '{metric}' metriğinin sütun dosyası bulunamadı, {size} satır NaN ile yeniden oluşturuluyor.")
+            columns[metric] = np.full(size, np.nan, dtype="<f4")
+            self._write_column(metric, columns[metric])
+        self._metrics = list(metrics)
+        self._turns = turns[:size].astype(np.int64)
+        self._values = {metric: column[:size].astype(np.float32) for metric, column in columns.items()}
+        self._size = size
+        self._sorted = bool(size < 2 or np.all(np.diff(self._turns) >= 0))
+        for metric in self._metrics:
+            self._rebuild_rollups(metric)
+
+    def _truncate_files(self, metrics: List[str], size: int):
+        with open(self._path(_TURNS_FILE), "r+b") as f:
+            f.truncate(size * 8)
+        for metric in metrics:
+            path = self._metric_file(metric)
+            if os.path.exists(path):
+                with open(path, "r+b") as f:
+                    f.truncate(size * 4)
+
+    def _write_column(self, metric: str, values: np.ndarray):
+        with open(self._metric_file(metric), "wb") as f:
+            values.astype("<f4").tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rebuild_rollups(self, metric: str):
+        self._rollups[metric] = {factor: _Rollup(factor) for factor in self.rollup_factors}
+        for rollup in self._rollups[metric].values():
+            rollup.add(self._turns[:self._size], self._values[metric][:self._size])
+
+    def _write_meta(self):
+        tmp_path = self._path(f"{_META_FILE}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"metrics": self._metrics, "rollup_factors": list(self.rollup_factors)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(_META_FILE))
+
+    def _handle(self, name: str) -> BinaryIO:
+        handle = self._handles.get(name)
+        if handle is None:
+            handle = open(self._path(name), "ab")
+            self._handles[name] = handle
+        return handle
+
+    def _add_metric(self, metric: str):
+        """Yeni bir metrik ekler; önceki satırları NaN ile doldurur."""
+        self._metrics.append(metric)
+        self._values[metric] = np.full(len(self._turns), np.nan, dtype=np.float32)
+        self._rollups[metric] = {factor: _Rollup(factor) for factor in self.rollup_factors}
+        self._write_column(metric, np.full(self._size, np.nan, dtype="<f4"))
+        self._write_meta()
+
+    def _ensure_capacity(self, needed: int):
+        capacity = len(self._turns)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 256)
+        turns = np.zeros(new_capacity, dtype=np.int64)
+        turns[:self._size] = self._turns[:self._size]
+        self._turns = turns
+        for metric, column in self._values.items():
+            grown = np.full(new_capacity, np.nan, dtype=np.float32)
+            grown[:self._size] = column[:self._size]
+            self._values[metric] = grown
+
+    def append(self, turn: int, values: Dict[str, float]):
+        """Bir tur için metrik değerlerini ekler; eksik metrikler NaN olarak saklanır."""
+        with self._lock:
+            for metric in values:
+                if metric not in self._values:
+                    self._add_metric(metric)
+            self._ensure_capacity(self._size + 1)
+            row = self._size
+            if row and turn < self._turns[row - 1]:
+                self._sorted = False
+            self._turns[row] = turn
+            self._handle(_TURNS_FILE).write(np.int64(turn).astype("<i8").tobytes())
+            for metric in self._metrics:
+                value = values.get(metric)
+                value = np.float32(np.nan if value is None else value)
+                self._values[metric][row] = value
+                self._handle(f"{metric}.f32").write(value.astype("<f4").tobytes())
+                for rollup in self._rollups[metric].values():
+                    rollup.add_one(int(turn), float(value))
+            self._size += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        """Tamponları yazar ve diske indirir (fsync); flush_every turda bir ve kapanışta çağrılır."""
+        for handle in self._handles.values():
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._unflushed = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            for handle in self._handles.values():
+                handle.close()
+            self._handles = {}
+
+    @property
+    def metrics(self) -> List[str]:
+        return list(self._metrics)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _raw_mask(self, start_turn: int, end_turn: int) -> np.ndarray:
+        turns = self._turns[:self._size]
+        if self._sorted:
+            mask = np.zeros(self._size, dtype=bool)
+            mask[np.searchsorted(turns, start_turn, "left"):np.searchsorted(turns, end_turn, "right")] = True
+            return mask
+        return (turns >= start_turn) & (turns <= end_turn)
+
+    def _raw_stats(self, metric: str, start_turn: int, end_turn: int) -> Tuple[float, int, float, float]:
+        if start_turn > end_turn:
+            return 0.0, 0, np.inf, -np.inf
+        values = self._values[metric][:self._size][self._raw_mask(start_turn, end_turn)]
+        values = values[~np.isnan(values)].astype(np.float64)
+        if not len(values):
+            return 0.0, 0, np.inf, -np.inf
+        return float(values.sum()), len(values), float(values.min()), float(values.max())
+
+    def query(self, metric: str, start_turn: int, end_turn: int, agg: str = "mean") -> Optional[float]:
+        """
+        [start_turn, end_turn] (dahil) aralığında bir metriğin özetini döndürür.
+        agg: 'mean', 'sum', 'min', 'max' veya 'count'. Aralıkta veri yoksa None döner.
+        """
+        if agg not in _AGGREGATES:
+            raise ValueError(f"Bilinmeyen toplama fonksiyonu: {agg}")
+        with self._lock:
+            if metric not in self._values:
+                return None
+            total, count, low, high = 0.0, 0, np.inf, -np.inf
+            rollup = None
+            for factor in reversed(self.rollup_factors):
+                if end_turn - start_turn + 1 >= 2 * factor:
+                    rollup = self._rollups[metric][factor]
+                    break
+            if rollup is None:
+                total, count, low, high = self._raw_stats(metric, start_turn, end_turn)
+            else:
+                # Tam kovalar özetten, kenarlardaki yarım kovalar ham veriden okunur
+                factor = rollup.factor
+                first_bucket = -(-start_turn // factor)
+                last_bucket = (end_turn + 1) // factor - 1
+                segments = [self._raw_stats(metric, start_turn, first_bucket * factor - 1),
+                            self._raw_stats(metric, (last_bucket + 1) * factor, end_turn)]
+                upper = min(last_bucket + 1, len(rollup.sums))
+                if first_bucket < upper:
+                    bucket_slice = slice(first_bucket, upper)
+                    bucket_counts = rollup.counts[bucket_slice]
+                    segments.append((
+                        float(rollup.sums[bucket_slice].sum()),
+                        int(bucket_counts.sum()),
+                        float(rollup.mins[bucket_slice].min()),
+                        float(rollup.maxs[bucket_slice].max()),
+                    ))
+                for seg_total, seg_count, seg_low, seg_high in segments:
+                    total += seg_total
+                    count += seg_count
+                    low = min(low, seg_low)
+                    high = max(high, seg_high)
+
+        if agg == "count":
+            return float(count)
+        if count == 0:
+            return None
+        return {"mean": total / count, "sum": total, "min": low, "max": high}[agg]
+
+    def series(self, metric: str, start_turn: int, end_turn: int, resolution: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Aralıktaki (tur, değer) dizilerini döndürür. resolution 1 ise ham değerler,
+        bir özet seviyesine eşitse kova başlangıç turları ve kova ortalamaları döner.
+        """
+        with self._lock:
+            if metric not in self._values:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+            if resolution == 1:
+                mask = self._raw_mask(start_turn, end_turn)
+                return self._turns[:self._size][mask].copy(), self._values[metric][:self._size][mask].copy()
+            if resolution not in self.rollup_factors:
+                raise ValueError(f"Desteklenmeyen çözünürlük: {resolution} (1 veya {self.rollup_factors})")
+            rollup = self._rollups[metric][resolution]
+            first = max(0, start_turn // resolution)
+            last = min(end_turn // resolution + 1, len(rollup.sums))
+            if first >= last:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+            counts = rollup.counts[first:last]
+            sums = rollup.sums[first:last]
+            filled = counts > 0
+            buckets = np.arange(first, last)[filled]
+            return buckets * resolution, sums[filled] / counts[filled]
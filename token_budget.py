@@ -0,0 +1,180 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# Hızlı yerel token tahmini: kelimeler 3 karakterlik parçalara bölünür, her noktalama ve satır sonu bir token
+# sayılır. SentencePiece/BPE tokenizer'larının Türkçe metinde verdiği sayıya yakın, çoğunlukla biraz fazladır;
+# sunucuya /tokenize isteği göndermekten kat kat hızlıdır. Sapmalar TOKEN_SAFETY_RATIO payıyla karşılanır.
+_PIECE = re.compile(r"\w{1,3}|[^\w\s]|\n")
+
+# Sohbet şablonunun her mesaj için eklediği rol/ayraç token'ları
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRIM_MARKER = " […] "
+_TRIM_MARKER_TOKENS = len(_PIECE.findall(TRIM_MARKER))
+
+# Bölüm: (metin, öncelik, korunacak kısım: "head" | "tail" | "middle"); düşük öncelikli bölümler önce kırpılır
+Section = Tuple[str, int, str]
+
+
+class ContextOverflowError(ValueError):
+    """İstem kırpıldıktan sonra bile yanıta bağlamda hiç yer kalmadığında fırlatılır; istek gönderilmez."""
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return len(_PIECE.findall(text)) if text else 0
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(json.dumps(message["tool_calls"], ensure_ascii=False))
+    return tokens
+
+
+def truncate_tokens(text: str, limit: int, keep: str = "head") -> str:
+    """
+    Metni tahmini limit token'a indirir. keep="head" baştan, "tail" sondan korur; "middle" baş ve sonu
+    koruyup ortayı atar (talimatın başta, çıktı biçiminin sonda olduğu istemler için). Kırpma işareti
+    de limite dahildir.
+    """
+    if limit <= 0:
+        return ""
+    pieces = list(_PIECE.finditer(text))
+    if len(pieces) <= limit:
+        return text
+    limit -= _TRIM_MARKER_TOKENS
+    if limit <= 0:
+        return ""
+    if keep == "tail":
+        return TRIM_MARKER.lstrip() + text[pieces[-limit].start():]
+    if keep == "middle" and limit > 1:
+        head = limit // 2
+        return text[:pieces[head - 1].end()] + TRIM_MARKER + text[pieces[-(limit - head)].start():]
+    return text[:pieces[limit - 1].end()] + TRIM_MARKER.rstrip()
+
+
+def allocate(sections: Sequence[Section], limit: int) -> List[str]:
+    """
+    Bölümleri toplam limit token'a sığdırır: taşma, en düşük öncelikli bölümden başlanarak kırpılır;
+    bir bölüm tamamen tükenirse sıradakine geçilir. Metinler verilen sırayla döndürülür.
+    """
+    texts = [text for text, _, _ in sections]
+    sizes = [estimate_tokens(text) for text in texts]
+    overflow = sum(sizes) - limit
+    for index in sorted(range(len(sections)), key=lambda i: sections[i][1]):
+        if overflow <= 0:
+            break
+        cut = min(sizes[index], overflow)
+        texts[index] = truncate_tokens(texts[index], sizes[index] - cut, sections[index][2])
+        overflow -= cut
+    return texts
+
+
+class TokenBudget:
+    """
+    Model bağlam boyutlarına göre istem bütçesi tutar. Her LLM isteği gönderilmeden önce sığacak şekilde
+    kırpılır ve max_tokens kalan alana göre ayarlanır; böylece bağlam taşması hataları ve gereksiz uzun
+    ön doldurma (prefill) süreleri önlenir.
+    """
+    def __init__(self, config_data: Dict, default_model: str):
+        self.default_model = default_model
+        self.context_sizes: Dict[str, int] = dict(config_data.get("MODEL_CONTEXT_SIZES", {}))
+        self.default_context_size = config_data.get("DEFAULT_CONTEXT_SIZE", 8192)
+        self.safety_ratio = config_data.get("TOKEN_SAFETY_RATIO", 0.1)
+        self.min_completion = config_data.get("TOKEN_MIN_COMPLETION", 256)
+        self.tool_result_keep = config_data.get("TOKEN_TOOL_RESULT_KEEP", 256)
+
+    def context_size(self, model: Optional[str] = None) -> int:
+        return self.context_sizes.get(model or self.default_model, self.default_context_size)
+
+    def prompt_room(self, model: Optional[str] = None, completion_tokens: Optional[int] = None, reserve: int = 0) -> int:
+        """İstem için kalan token: bağlam - güvenlik payı - yanıta ayrılan - reserve (ör. araç tanımları)."""
+        context = self.context_size(model)
+        completion = min(completion_tokens or self.min_completion, context // 2)
+        return max(0, int(context * (1 - self.safety_ratio)) - completion - reserve)
+
+    def completion_tokens(self, prompt_tokens: int, model: Optional[str] = None, requested: Optional[int] = None) -> int:
+        """
+        max_tokens'ı bağlamda kalan alana göre ayarlar; istem + yanıt hiçbir zaman bağlamı aşmaz.
+        İstemler fit_payload'da TOKEN_MIN_COMPLETION yer kalacak şekilde kırpılır; kalan alan yine de
+        bundan azsa (ör. TOKEN_MIN_COMPLETION bağlamın yarısından büyükse) uyarı verilir. Hiç yer
+        kalmadıysa (ör. araç tanımları tek başına bağlamı dolduruyorsa) ContextOverflowError fırlatılır.
+        """
+        usable = int(self.context_size(model) * (1 - self.safety_ratio))
+        room = usable - prompt_tokens
+        if room < 1:
+            raise ContextOverflowError(f"İstem bağlama sığmıyor: {prompt_tokens} token, kullanılabilir bağlam {usable} token")
+        if room < self.min_completion:
+            print(f"⚠️ Yanıt için yalnızca {room} token kaldı (TOKEN_MIN_COMPLETION={self.min_completion}).")
+        return min(requested or room, room)
+
+    def fit_section(self, text: str, limit: int, model: Optional[str] = None, completion_tokens: Optional[int] = None,
+                    keep: str = "head") -> str:
+        """Bir istem bölümünü hem kendi token sınırına hem de modelin bağlamına sığacak şekilde kırpar."""
+        return truncate_tokens(text, min(limit, self.prompt_room(model, completion_tokens)), keep)
+
+    def fit_messages(self, messages: List[Dict[str, Any]], model: Optional[str] = None, reserve: int = 0) -> List[Dict[str, Any]]:
+        """
+        Mesaj listesini bağlama sığdırır; sığıyorsa listeyi değiştirmeden döndürür. Sırasıyla:
+        1) eski araç sonuçları TOKEN_TOOL_RESULT_KEEP token'a indirilir, 2) en eski araç turları
+        (assistant tool_calls + tool yanıtları birlikte) atılır, 3) mesajlar ortadan kırpılır (sistem mesajı en son).
+        """
+        room = self.prompt_room(model, reserve=reserve)
+        sizes = [estimate_message_tokens(message) for message in messages]
+        if sum(sizes) <= room:
+            return messages
+
+        messages, overflow = list(messages), sum(sizes) - room
+        last_assistant = max((i for i, m in enumerate(messages) if m.get("role") == "assistant"), default=len(messages))
+        for index, message in enumerate(messages[:last_assistant]):
+            if overflow <= 0:
+                break
+            if message.get("role") == "tool" and sizes[index] > self.tool_result_keep + MESSAGE_OVERHEAD_TOKENS:
+                content = truncate_tokens(message.get("content") or "", self.tool_result_keep, "middle")
+                messages[index] = {**message, "content": content}
+                overflow -= sizes[index] - estimate_message_tokens(messages[index])
+                sizes[index] = estimate_message_tokens(messages[index])
+
+        while overflow > 0:
+            start = next((i for i, m in enumerate(messages) if m.get("role") == "assistant" and m.get("tool_calls")), None)
+            if start is None or start >= last_assistant:
+                break
+            end = start + 1
+            while end < len(messages) and messages[end].get("role") == "tool":
+                end += 1
+            overflow -= sum(sizes[start:end])
+            del messages[start:end], sizes[start:end]
+            last_assistant -= end - start
+
+        if overflow > 0:
+            # Önce sistem dışı mesajlar kırpılır; yetmezse (ör. çok uzun sistem istemi) sistem mesajları da
+            contents = [message.get("content") or "" for message in messages]
+            texts = allocate([(content, 1 if message.get("role") == "system" else 0, "middle")
+                              for content, message in zip(contents, messages)],
+                             sum(estimate_tokens(content) for content in contents) - overflow)
+            for index, text in enumerate(texts):
+                if text != contents[index]:
+                    messages[index] = {**messages[index], "content": text}
+        print(f"✂️ Mesajlar bağlama sığdırıldı: {sum(estimate_message_tokens(m) for m in messages)}/{room} token.")
+        return messages
+
+    def fit_payload(self, payload: Dict[str, Any], extra_tokens: int = 0) -> Dict[str, Any]:
+        """
+        İstek gövdesini yerinde bağlama sığdırır ve max_tokens'ı kalan alana göre ayarlar.
+        extra_tokens, gövdeye sonradan eklenecek içerik (ör. araç tanımları) içindir.
+        """
+        model = payload.get("model")
+        if "messages" in payload:
+            payload["messages"] = self.fit_messages(payload["messages"], model, reserve=extra_tokens)
+            prompt_tokens = sum(estimate_message_tokens(message) for message in payload["messages"])
+        else:
+            room = self.prompt_room(model, reserve=extra_tokens)
+            prompt_tokens = estimate_tokens(payload.get("prompt"))
+            if prompt_tokens > room:
+                print(f"✂️ İstem bağlama sığmıyor ({prompt_tokens} > {room} token), ortadan kırpılıyor.")
+                payload["prompt"] = truncate_tokens(payload["prompt"], room, "middle")
+                prompt_tokens = estimate_tokens(payload["prompt"])
+        payload["max_tokens"] = self.completion_tokens(prompt_tokens + extra_tokens, model, payload.get("max_tokens"))
+        return payload
@@ -0,0 +1,85 @@
+import inspect
+import json
+import typing
+from typing import Any, Callable, Dict, List
+
+from token_budget import estimate_tokens
+
+
+# Aybar örneğini alan parametreler LLM'e gösterilmez; çağrı sırasında araca doğrudan verilir
+_CONTEXT_PARAMETERS = ("aybar_instance", "self")
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", dict: "object", list: "array"}
+
+
+def _annotation_schema(annotation: Any) -> Dict[str, Any]:
+    """Bir tip açıklamasını JSON şemasına çevirir; bilinmeyen veya eksik açıklamalar 'string' sayılır."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        # Optional[X] -> X (None kabul edilmesi 'required' listesinden çıkarılarak ifade edilir)
+        members = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _annotation_schema(members[0]) if len(members) == 1 else {"type": "string"}
+    if origin in (list, List):
+        args = typing.get_args(annotation)
+        return {"type": "array", "items": _annotation_schema(args[0]) if args else {"type": "string"}}
+    if origin in (dict, Dict):
+        return {"type": "object"}
+    return {"type": _JSON_TYPES.get(annotation, "string")}
+
+
+def tool_parameters_schema(func: Callable) -> Dict[str, Any]:
+    """Fonksiyon imzasından ve tip açıklamalarından aracın 'parameters' JSON şemasını üretir."""
+    signature = inspect.signature(func)
+    properties, required = {}, []
+    for name, parameter in signature.parameters.items():
+        if name in _CONTEXT_PARAMETERS or parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+            continue
+        schema = _annotation_schema(parameter.annotation)
+        schema["description"] = f"Parameter {name}"
+        properties[name] = schema
+        if parameter.default is inspect.Parameter.empty:
+            required.append(name)
+    return {"type": "object", "properties": properties, "required": required}
+
+
+class ToolRegistry:
+    """
+    LLM fonksiyon çağırma için araç tanımlarını başlangıçta bir kez oluşturur.
+    @category ile işaretlenmiş araçların şemaları içe aktarımda hesaplanır; diğer çağrılabilirler
+    (ör. EVOLVE) için burada hesaplanır. Araç listesinin JSON'u da bir kez serileştirilip saklanır,
+    böylece bir araç çağırma turu hiç içgözlem (inspect) yapmaz.
+    """
+    def __init__(self, tools: Dict[str, Callable]):
+        self.functions: Dict[str, Callable] = dict(tools)
+        self.takes_aybar: Dict[str, bool] = {}
+        # Yan etkili araçlar aynı turdaki diğer çağrılarla paralel çalıştırılmaz; işaretlenmemiş
+        # çağrılabilirler (ör. EVOLVE, lambda'lar) temkinli olarak yan etkili sayılır
+        self.side_effects: Dict[str, bool] = {}
+        self.definitions: List[Dict[str, Any]] = []
+        for name, func in self.functions.items():
+            parameters = getattr(func, "tool_parameters", None) or tool_parameters_schema(func)
+            docstring = inspect.getdoc(func)
+            self.takes_aybar[name] = "aybar_instance" in inspect.signature(func).parameters
+            self.side_effects[name] = getattr(func, "side_effects", True)
+            self.definitions.append({
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": docstring.split('\n')[0] if docstring else "No description available.",
+                    "parameters": parameters,
+                }
+            })
+        self.payload_json = json.dumps(self.definitions, ensure_ascii=False)
+        self.payload_tokens = estimate_tokens(self.payload_json)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.functions
+
+    def has_side_effects(self, name: str) -> bool:
+        return self.side_effects.get(name, True)
+
+    def call(self, name: str, aybar_instance: Any, arguments: Dict[str, Any]) -> Any:
+        """Aracı çalıştırır; Aybar örneğini bekleyen araçlara aybar_instance olarak iletir."""
+        if self.takes_aybar[name]:
+            return self.functions[name](aybar_instance=aybar_instance, **arguments)
+        return self.functions[name](**arguments)
@@ -6,6 +6,7 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any, TYPE_CHECKING
 
 from duckduckgo_search import DDGS # DuckDuckGo arama için
+from tool_registry import tool_parameters_schema
 # Selenium ve BeautifulSoup importları Web araçları için gerekli olabilir,
 # ancak WebSurferSystem üzerinden çağrılacaklarsa burada gerekmeyebilirler.
 # Şimdilik WebSurferSystem'in metodlarını çağırdığımızı varsayalım.
@@ -40,14 +41,23 @@ SOCIAL_INTERACTION_TOOLS = "Sosyal Etkileşim Araçları" # Yeni kategori
 SYSTEM_CONTROL = "Sistem Kontrolü ve Evrim" # EVOLVE ve diğerleri için
 COMPUTER_CONTROL = "Bilgisayar Kontrol Araçları"
 
-def category(name: str):
+def category(name: str, side_effects: bool = False):
+    """
+    Aracı bir kategoriye atar. side_effects=True olan araçlar (tarayıcı, klavye/fare, hedef ve
+    kimlik değişiklikleri gibi paylaşılan durumu değiştirenler) bir LLM mesajındaki diğer
+    araç çağrılarıyla paralel değil, sırayla çalıştırılır.
+    """
     def decorator(func):
         func.category = name
+        func.side_effects = side_effects
+        # LLM'e gönderilen parametre şeması içe aktarımda bir kez çıkarılır (bkz. ToolRegistry)
+        func.tool_parameters = tool_parameters_schema(func)
         return func
     return decorator
 
 # --- Web Browsing Tools ---
-@category(WEB_BROWSING)
+# URL verildiğinde paylaşılan Selenium sürücüsünde gezinir; bu yüzden diğer araçlarla paralel çalışmaz
+@category(WEB_BROWSING, side_effects=True)
 def perform_web_search(aybar_instance: "EnhancedAybar", query: str) -> str:
     """
     Belirtilen sorgu için DuckDuckGo kullanarak internette arama yapar ve sonuçları özetler.
@@ -91,10 +101,10 @@ def perform_web_search(aybar_instance: "EnhancedAybar", query: str) -> str:
         summary_prompt = f"""
         Aşağıdaki internet arama sonuçlarını analiz et. Bu sonuçlardan yola çıkarak, "{query}" sorgusuna verilecek net, kısa ve bilgilendirici bir cevap oluştur. Cevabı direkt olarak yaz, özet olduğunu belirtme.
         --- ARAMA SONUÇLARI ---
-        {context_for_summary[:7000]}
+        {llm_manager.token_budget.fit_section(context_for_summary, 2000, completion_tokens=1024)}
         --- ÖZET CEVAP ---
         """
-        summary = llm_manager.ask_llm(summary_prompt, max_tokens=1024, temperature=0.3)
+        summary = llm_manager.ask_llm(summary_prompt, max_tokens=1024, temperature=0.3, cache=True)
         if summary and not summary.startswith("⚠️"):
             memory_system.add_memory("semantic", {
                 "timestamp": datetime.now().isoformat(), "turn": aybar_instance.current_turn,
@@ -106,7 +116,7 @@ def perform_web_search(aybar_instance: "EnhancedAybar", query: str) -> str:
             return f"Arama sonuçları özetlenemedi veya bir LLM hatası oluştu. Ham sonuçlar: {str(search_results)[:500]}"
 
 
-@category(WEB_BROWSING)
+@category(WEB_BROWSING, side_effects=True)
 def navigate_to_url(aybar_instance: "EnhancedAybar", url: str) -> str:
     """Belirtilen URL'e gider ve sayfa durumunu döndürür."""
     _, _, _, _, web_surfer, _, _, config = _get_aybar_systems(aybar_instance)
@@ -120,7 +130,7 @@ def navigate_to_url(aybar_instance: "EnhancedAybar", url: str) -> str:
     page_text, elements = web_surfer.get_current_state_for_llm()
     return f"'{url}' adresine gidildi. Sayfa içeriği (ilk 300 krk): {page_text[:300]}... Etkileşimli elementler (ilk 3): {elements[:3]}"
 
-@category(WEB_BROWSING)
+@category(WEB_BROWSING, side_effects=True)
 def click_web_element(aybar_instance: "EnhancedAybar", target_xpath: str, thought: Optional[str]=None) -> str:
     """Web sayfasındaki belirtilen XPath'e sahip elemente tıklar."""
     _, _, _, _, web_surfer, _, _, config = _get_aybar_systems(aybar_instance)
@@ -132,7 +142,7 @@ def click_web_element(aybar_instance: "EnhancedAybar", target_xpath: str, though
     page_text, elements = web_surfer.get_current_state_for_llm()
     return f"{result}. Yeni sayfa durumu (ilk 300 krk): {page_text[:300]}... Etkileşimli elementler (ilk 3): {elements[:3]}"
 
-@category(WEB_BROWSING)
+@category(WEB_BROWSING, side_effects=True)
 def type_in_web_element(aybar_instance: "EnhancedAybar", target_xpath: str, text: str, thought: Optional[str]=None) -> str:
     """Web sayfasındaki belirtilen XPath'e sahip alana metin yazar."""
     _, _, _, _, web_surfer, _, _, config = _get_aybar_systems(aybar_instance)
@@ -150,7 +160,15 @@ def analyze_memory(aybar_instance: "EnhancedAybar", query: str, memory_layer: st
     """Belirtilen bellek katmanında bir sorguyla ilgili analiz yapar."""
     memory_system, _, _, llm_manager, _, _, _, _ = _get_aybar_systems(aybar_instance)
     print(f"🧠 Bellek analizi: Katman='{memory_layer}', Sorgu='{query}'")
-    memories = memory_system.get_memory(memory_layer, num_records)
+    # Yalnızca sorguyla eşleşen anılar (BM25 sıralı) prompt'a girer; anahtar kelime eşleşmesi yoksa
+    # anlamca benzer anılara, o da yoksa en son kayıtlara dönülür.
+    max_matches = min(num_records, 15)
+    memories = memory_system.search(memory_layer, query, k=max_matches)
+    if len(memories) < max_matches:
+        # Canlı tablolardan budanmış eski anılar sıkıştırılmış arşivden tembel olarak taranır
+        memories += memory_system.search_archive(memory_layer, query, k=max_matches - len(memories))
+    if not memories:
+        memories = memory_system.search_similar(memory_layer, query, k=max_matches) or memory_system.get_memory(memory_layer, num_records)
     if not memories:
         return f"{memory_layer} belleğinde analiz için yeterli anı bulunmuyor."
 
@@ -169,7 +187,7 @@ def analyze_memory(aybar_instance: "EnhancedAybar", query: str, memory_layer: st
     Soru: "{query}"
     Analiz Edilecek Anı Verileri ({memory_layer} katmanından):
     ---
-    {memory_summary[:7000]}
+    {llm_manager.token_budget.fit_section(memory_summary, 2000, completion_tokens=768)}
     ---
     Analiz Sonucu ve İçgörü:
     """
@@ -209,7 +227,8 @@ def meta_reflection(aybar_instance: "EnhancedAybar", turn_to_analyze: int, thoug
     return "Meta-yansıma yapılamadı veya LLM hatası."
 
 # --- Creative and Simulation Tools ---
-@category(CREATIVE_AND_SIMULATION)
+# Duygusal durumu günceller
+@category(CREATIVE_AND_SIMULATION, side_effects=True)
 def creative_generation(aybar_instance: "EnhancedAybar", creation_type: str, theme: str, thought: Optional[str]=None) -> str:
     """Belirtilen türe ve temaya göre sanatsal bir içerik (şiir, hikaye, kod parçası vb.) üretir."""
     memory_system, _, emotional_system, llm_manager, _, _, _, _ = _get_aybar_systems(aybar_instance)
@@ -254,14 +273,14 @@ def run_internal_simulation(aybar_instance: "EnhancedAybar", scenario: str, thou
     return "Hayal kurma başarısız oldu veya LLM hatası."
 
 # --- Goal and Identity Management Tools ---
-@category(GOAL_AND_IDENTITY)
+@category(GOAL_AND_IDENTITY, side_effects=True)
 def set_goal(aybar_instance: "EnhancedAybar", goal: str, steps: List[str], duration_turns: int, thought: Optional[str]=None) -> str:
     """Yeni bir uzun vadeli hedef ve adımlarını belirler."""
     _, cognitive_system, _, _, _, _, _, _ = _get_aybar_systems(aybar_instance)
     cognitive_system.set_new_goal(goal, steps, duration_turns, aybar_instance.current_turn)
     return f"Yeni hedefim belirlendi: '{goal}'. {duration_turns} tur sürecek ve adımları: {steps}."
 
-@category(GOAL_AND_IDENTITY)
+@category(GOAL_AND_IDENTITY, side_effects=True)
 def update_identity(aybar_instance: "EnhancedAybar", thought: Optional[str]=None) -> str:
     """Son deneyimleri kullanarak Aybar'ın kimlik tanımını günceller."""
     memory_system, _, _, llm_manager, _, _, _, _ = _get_aybar_systems(aybar_instance)
@@ -274,25 +293,20 @@ def update_identity(aybar_instance: "EnhancedAybar", thought: Optional[str]=None
     update_prompt = f"""
     Mevcut kimliğim: "{aybar_instance.identity_prompt}"
     Son zamanlarda yaşadığım tecrübelerden çıkardığım içgörüler:
-    {memory_summary[:7000]}
+    {llm_manager.token_budget.fit_section(memory_summary, 2000, completion_tokens=768)}
     Bu tecrübeler ışığında, "Sen AYBAR’sın..." ile başlayan kimlik tanımımı, şu anki 'ben'i daha iyi yansıtacak şekilde, felsefi ve edebi bir dille yeniden yaz. Sadece yeni kimlik tanımını döndür.
     """
     new_identity = llm_manager.ask_llm(update_prompt, temperature=0.7, max_tokens=768)
     if new_identity and not new_identity.startswith("⚠️"):
         # identity_prompt'u EnhancedAybar üzerinde güncelle
         aybar_instance.identity_prompt = new_identity
-        # Veritabanına kaydet
-        memory_system.cursor.execute("UPDATE identity_prompts SET active = 0 WHERE active = 1") # Eskiyi pasif yap
-        memory_system.cursor.execute(
-            "INSERT INTO identity_prompts (title, content, active) VALUES (?, ?, 1)",
-            (f"Evrimleşmiş Kimlik - Tur {aybar_instance.current_turn}", new_identity)
-        )
-        memory_system.conn.commit()
+        # Veritabanına kaydet (eski kimlik pasif yapılır)
+        memory_system.save_identity_prompt(f"Evrimleşmiş Kimlik - Tur {aybar_instance.current_turn}", new_identity)
         return f"Kimliğimi güncelledim. Yeni ben: {new_identity[:150]}..."
     return "Kimliğimi güncellemeyi başaramadım veya LLM hatası."
 
 # --- Emotion Regulation Tools ---
-@category(EMOTION_REGULATION)
+@category(EMOTION_REGULATION, side_effects=True)
 def regulate_emotion(aybar_instance: "EnhancedAybar", strategy: str, thought: Optional[str]=None) -> str:
     """Kendi duygusal durumunu dengelemek için bilinçli bir eylemde bulunur."""
     memory_system, cognitive_system, emotional_system, llm_manager, _, _, _, _ = _get_aybar_systems(aybar_instance)
@@ -321,7 +335,7 @@ def regulate_emotion(aybar_instance: "EnhancedAybar", strategy: str, thought: Op
     return "Duygularımı düzenleyemedim veya LLM hatası."
 
 # --- Social Interaction Tools ---
-@category(SOCIAL_INTERACTION_TOOLS)
+@category(SOCIAL_INTERACTION_TOOLS, side_effects=True)
 def handle_interaction(aybar_instance: "EnhancedAybar", user_id: str, goal: str, method: str, thought: Optional[str]=None) -> str:
     """Belirtilen hedefe yönelik sosyal bir etkileşim başlatır."""
     _, cognitive_system, _, llm_manager, _, _, _, _ = _get_aybar_systems(aybar_instance)
@@ -349,14 +363,14 @@ def capture_screen_and_analyze(aybar_instance: "EnhancedAybar", question: str, t
     if not computer_control: return "Bilgisayar kontrol sistemi aktif değil."
     return computer_control.analyze_screen_with_vlm(question)
 
-@category(COMPUTER_CONTROL)
+@category(COMPUTER_CONTROL, side_effects=True)
 def keyboard_type_action(aybar_instance: "EnhancedAybar", text_to_type: str, thought: Optional[str]=None) -> str:
     """Belirtilen metni klavye aracılığıyla yazar."""
     _, _, _, _, _, computer_control, _, _ = _get_aybar_systems(aybar_instance)
     if not computer_control: return "Bilgisayar kontrol sistemi aktif değil."
     return computer_control.keyboard_type(text_to_type)
 
-@category(COMPUTER_CONTROL)
+@category(COMPUTER_CONTROL, side_effects=True)
 def mouse_click_action(aybar_instance: "EnhancedAybar", x: int, y: int, double_click: bool = False, thought: Optional[str]=None) -> str:
     """Belirtilen koordinatlara fare ile tıklar."""
     _, _, _, _, _, computer_control, _, _ = _get_aybar_systems(aybar_instance)
@@ -364,7 +378,7 @@ def mouse_click_action(aybar_instance: "EnhancedAybar", x: int, y: int, double_c
     return computer_control.mouse_click(x, y, double_click)
 
 # --- System Control Tools ---
-@category(SYSTEM_CONTROL)
+@category(SYSTEM_CONTROL, side_effects=True)
 def summarize_and_reset_action(aybar_instance: "EnhancedAybar", summary: Optional[str]=None, thought: Optional[str]=None) -> str:
     """Mevcut durumu özetler ve düşünce döngüsünü/hedefi sıfırlar."""
     # Bu araç doğrudan EnhancedAybar'da bir bayrak ayarlayarak veya ana döngüde işlenerek
@@ -374,7 +388,7 @@ def summarize_and_reset_action(aybar_instance: "EnhancedAybar", summary: Optiona
     # aybar_instance.active_goal = None # Bu doğrudan EnhancedAybar'da yapılmalı
     return f"Durum özetlendi ve düşünce döngüsü sıfırlanmak üzere. Özet: {summary or 'Belirtilmedi'}"
 
-@category(SYSTEM_CONTROL)
+@category(SYSTEM_CONTROL, side_effects=True)
 def finish_goal_action(aybar_instance: "EnhancedAybar", summary: str, thought: Optional[str]=None) -> str:
     """Mevcut hedefi tamamlar."""
     # Bu da SUMMARIZE_AND_RESET gibi, EnhancedAybar'da işlenmeli.